@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# 由Ansible服务器管理面板生成：一次读取/proc中的资源数据并以JSON输出
+import json
+import os
+import time
+
+SAMPLE_SECONDS = 0.5
+TOP_PROCESSES = 10
+
+
+def read_cpu():
+    with open('/proc/stat') as f:
+        values = [int(v) for v in f.readline().split()[1:]]
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    return idle, sum(values)
+
+
+def read_processes():
+    processes = {}
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open('/proc/%s/stat' % pid) as f:
+                data = f.read()
+        except (IOError, OSError):
+            continue
+        name = data[data.index('(') + 1:data.rindex(')')]
+        fields = data[data.rindex(')') + 2:].split()
+        processes[pid] = (name, int(fields[11]) + int(fields[12]), int(fields[21]))
+    return processes
+
+
+def read_network():
+    counters = {}
+    with open('/proc/net/dev') as f:
+        for line in f.readlines()[2:]:
+            iface, data = line.split(':', 1)
+            fields = data.split()
+            counters[iface.strip()] = (int(fields[0]), int(fields[8]))
+    return counters
+
+
+def read_meminfo():
+    meminfo = {}
+    with open('/proc/meminfo') as f:
+        for line in f:
+            key, value = line.split(':', 1)
+            meminfo[key] = int(value.split()[0])
+    return meminfo
+
+
+def read_disks():
+    disks = []
+    seen = set()
+    with open('/proc/mounts') as f:
+        for line in f:
+            device, mount = line.split()[:2]
+            if not device.startswith('/dev/') or device.startswith('/dev/loop') or device in seen:
+                continue
+            seen.add(device)
+            try:
+                st = os.statvfs(mount)
+            except OSError:
+                continue
+            total = st.f_blocks * st.f_frsize
+            free = st.f_bavail * st.f_frsize
+            used = total - st.f_bfree * st.f_frsize
+            if total:
+                disks.append({"mount": mount, "device": device, "total": total, "used": used, "free": free})
+    return disks
+
+
+def main():
+    cpu_idle_1, cpu_total_1 = read_cpu()
+    processes_1 = read_processes()
+    network_1 = read_network()
+    started = time.time()
+
+    time.sleep(SAMPLE_SECONDS)
+
+    cpu_idle_2, cpu_total_2 = read_cpu()
+    processes_2 = read_processes()
+    network_2 = read_network()
+    elapsed = time.time() - started
+
+    cpu_count = os.sysconf('SC_NPROCESSORS_ONLN')
+    cpu_delta = max(cpu_total_2 - cpu_total_1, 1)
+    page_size = os.sysconf('SC_PAGE_SIZE')
+
+    top = []
+    for pid, (name, ticks, rss_pages) in processes_2.items():
+        previous = processes_1.get(pid)
+        busy = ticks - previous[1] if previous else 0
+        top.append({
+            "pid": int(pid),
+            "name": name,
+            "cpu_percent": round(100.0 * busy * cpu_count / cpu_delta, 1),
+            "rss": rss_pages * page_size
+        })
+    top.sort(key=lambda p: (p["cpu_percent"], p["rss"]), reverse=True)
+
+    rx = tx = 0
+    for iface, (rx_2, tx_2) in network_2.items():
+        if iface == 'lo' or iface not in network_1:
+            continue
+        rx += rx_2 - network_1[iface][0]
+        tx += tx_2 - network_1[iface][1]
+
+    meminfo = read_meminfo()
+    with open('/proc/loadavg') as f:
+        load = [float(v) for v in f.read().split()[:3]]
+    with open('/proc/uptime') as f:
+        uptime = float(f.read().split()[0])
+
+    print(json.dumps({
+        "timestamp": time.time(),
+        "cpu_count": cpu_count,
+        "cpu_percent": round(100.0 * (1 - float(cpu_idle_2 - cpu_idle_1) / cpu_delta), 1),
+        "load": load,
+        "memory": {
+            "total": meminfo.get("MemTotal", 0) * 1024,
+            "available": meminfo.get("MemAvailable", meminfo.get("MemFree", 0)) * 1024,
+            "swap_total": meminfo.get("SwapTotal", 0) * 1024,
+            "swap_free": meminfo.get("SwapFree", 0) * 1024
+        },
+        "disks": read_disks(),
+        "network": {"rx_bytes_per_sec": rx / elapsed, "tx_bytes_per_sec": tx / elapsed},
+        "uptime_seconds": uptime,
+        "processes": top[:TOP_PROCESSES]
+    }))
+
+
+if __name__ == '__main__':
+    main()
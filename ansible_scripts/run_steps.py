@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# 由Ansible服务器管理面板生成：在一次执行中按顺序运行多条命令，以JSON输出每一步的结果
+#
+# 参数为base64编码的JSON列表，每项包含 name、cmd，可选 always（前面的步骤失败后仍然执行）。
+# 任一非always步骤失败时，后续普通步骤跳过，退出码为该步骤的返回码。
+# 参数无法解析时输出 {"error": ...}，退出码为2。
+import base64
+import json
+import subprocess
+import sys
+import time
+
+OUTPUT_LIMIT = 64 * 1024
+
+
+def run_step(step):
+    started = time.time()
+    process = subprocess.Popen(
+        step["cmd"], shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    stdout, stderr = process.communicate()
+    return {
+        "name": step["name"],
+        "cmd": step["cmd"],
+        "rc": process.returncode,
+        "stdout": stdout[-OUTPUT_LIMIT:].decode("utf-8", "replace"),
+        "stderr": stderr[-OUTPUT_LIMIT:].decode("utf-8", "replace"),
+        "duration": round(time.time() - started, 3)
+    }
+
+
+def main():
+    try:
+        steps = json.loads(base64.b64decode(sys.argv[1]).decode("utf-8"))
+    except (IndexError, ValueError) as e:
+        print(json.dumps({"error": f"无效的步骤参数: {e}"}))
+        sys.exit(2)
+    results = []
+    failed_rc = 0
+
+    for step in steps:
+        if failed_rc and not step.get("always"):
+            results.append({"name": step["name"], "cmd": step["cmd"], "skipped": True})
+            continue
+        result = run_step(step)
+        results.append(result)
+        if result["rc"] != 0 and not step.get("always") and not failed_rc:
+            failed_rc = result["rc"]
+
+    print(json.dumps({"steps": results}))
+    sys.exit(failed_rc)
+
+
+if __name__ == '__main__':
+    main()
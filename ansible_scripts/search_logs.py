@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# 由Ansible服务器管理面板生成：在服务器本地过滤日志，只返回匹配的行（JSON输出）
+#
+# 参数为base64编码的JSON查询：
+#   source     "file" 或 "journal"
+#   path       日志文件路径（source=file）
+#   unit       systemd单元，可选（source=journal）
+#   pattern    匹配内容，可选；regex=true 时为正则表达式
+#   since/until  时间范围（Unix时间戳），可选
+#   severity   最低级别（0-7，与syslog优先级一致），可选
+#   limit      最多返回的匹配行数（保留最新的）
+#   scan_bytes 文件只扫描末尾的字节数
+import base64
+import json
+import re
+import subprocess
+import sys
+import time
+from collections import deque
+
+LINE_LIMIT = 2000
+
+LEVELS = [
+    (0, re.compile(r"\b(emerg|emergency|panic)\b", re.I)),
+    (1, re.compile(r"\balert\b", re.I)),
+    (2, re.compile(r"\b(crit|critical|fatal)\b", re.I)),
+    (3, re.compile(r"\b(err|error|failed|failure)\b", re.I)),
+    (4, re.compile(r"\b(warn|warning)\b", re.I)),
+    (5, re.compile(r"\bnotice\b", re.I)),
+    (6, re.compile(r"\binfo\b", re.I)),
+    (7, re.compile(r"\bdebug\b", re.I)),
+]
+
+MONTHS = {m: i for i, m in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1)}
+
+TIMESTAMP_FORMATS = [
+    # 2024-05-01T12:00:01 / 2024-05-01 12:00:01
+    (re.compile(r"^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})"), "ymd"),
+    # nginx error.log: 2024/05/01 12:00:01
+    (re.compile(r"^(\d{4})/(\d{2})/(\d{2}) (\d{2}):(\d{2}):(\d{2})"), "ymd"),
+    # syslog: May  1 12:00:01
+    (re.compile(r"^([A-Z][a-z]{2}) +(\d{1,2}) (\d{2}):(\d{2}):(\d{2})"), "syslog"),
+    # 访问日志: [01/May/2024:12:00:01 +0000]
+    (re.compile(r"\[(\d{2})/([A-Z][a-z]{2})/(\d{4}):(\d{2}):(\d{2}):(\d{2})"), "clf"),
+]
+
+
+def parse_timestamp(line, now):
+    for pattern, kind in TIMESTAMP_FORMATS:
+        match = pattern.search(line) if kind == "clf" else pattern.match(line)
+        if not match:
+            continue
+        g = match.groups()
+        try:
+            if kind == "ymd":
+                parts = (int(g[0]), int(g[1]), int(g[2]), int(g[3]), int(g[4]), int(g[5]))
+            elif kind == "clf":
+                parts = (int(g[2]), MONTHS[g[1]], int(g[0]), int(g[3]), int(g[4]), int(g[5]))
+            else:
+                year = time.localtime(now).tm_year
+                parts = (year, MONTHS[g[0]], int(g[1]), int(g[2]), int(g[3]), int(g[4]))
+            ts = time.mktime(parts + (0, 0, -1))
+        except (KeyError, ValueError, OverflowError):
+            return None
+        # syslog格式没有年份，跨年时日期会落在未来
+        if kind == "syslog" and ts > now + 86400:
+            ts = time.mktime((parts[0] - 1,) + parts[1:] + (0, 0, -1))
+        return ts
+    return None
+
+
+def detect_level(line):
+    for level, pattern in LEVELS:
+        if pattern.search(line):
+            return level
+    return None
+
+
+def search_file(query, matcher, now):
+    # 先用tail限制扫描范围，再在本地逐行过滤，只有匹配的行被保留
+    process = subprocess.Popen(
+        ["tail", "-c", str(query.get("scan_bytes", 50 * 1024 * 1024)), query["path"]],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    matches = deque(maxlen=query.get("limit", 200))
+    total = scanned = 0
+    since, until, severity = query.get("since"), query.get("until"), query.get("severity")
+
+    for raw in process.stdout:
+        scanned += len(raw)
+        line = raw.decode("utf-8", "replace").rstrip("\r\n")
+        if matcher and not matcher.search(line):
+            continue
+        ts = parse_timestamp(line, now)
+        if since is not None and (ts is None or ts < since):
+            continue
+        if until is not None and (ts is None or ts >= until):
+            continue
+        level = detect_level(line)
+        if severity is not None and (level is None or level > severity):
+            continue
+        total += 1
+        matches.append({"ts": ts, "level": level, "line": line[:LINE_LIMIT]})
+
+    error = process.stderr.read().decode("utf-8", "replace").strip()
+    if process.wait() != 0:
+        raise RuntimeError(error or "无法读取日志文件")
+    return list(matches), total, scanned
+
+
+def search_journal(query, matcher):
+    base = ["journalctl", "--no-pager", "-o", "json", "-n", str(query.get("scan_lines", 100000))]
+    if query.get("unit"):
+        base += ["-u", query["unit"]]
+    if query.get("since") is not None:
+        base += ["--since", "@%d" % query["since"]]
+    if query.get("until") is not None:
+        base += ["--until", "@%d" % query["until"]]
+    if query.get("severity") is not None:
+        base += ["-p", str(query["severity"])]
+
+    # 优先由journalctl按内容过滤（需要PCRE2支持），不支持时取回范围内的日志后在本地过滤。
+    # 没有匹配时journalctl返回1且没有错误输出；不支持 --grep（编译时没有PCRE2、旧版本不认识该选项）时
+    # 同样返回1，但会输出错误信息，这时改为本地过滤
+    process = None
+    if matcher:
+        pattern = query["pattern"] if query.get("regex") else re.escape(query["pattern"])
+        grep = ["--grep", pattern, "--case-sensitive=%s" % ("false" if query.get("ignore_case", True) else "true")]
+        process = subprocess.Popen(base + grep, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, stderr = process.communicate()
+        if process.returncode == 0 or (process.returncode == 1 and not stderr.strip()):
+            matcher = None
+    if process is None or matcher:
+        process = subprocess.Popen(base, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, stderr = process.communicate()
+    if process.returncode != 0 and (process.returncode != 1 or stderr.strip()):
+        raise RuntimeError(stderr.decode("utf-8", "replace").strip() or "journalctl执行失败")
+
+    matches = deque(maxlen=query.get("limit", 200))
+    total = 0
+    for raw in stdout.splitlines():
+        try:
+            entry = json.loads(raw.decode("utf-8", "replace"))
+        except ValueError:
+            continue
+        message = entry.get("MESSAGE") or ""
+        if isinstance(message, list):
+            message = bytes(message).decode("utf-8", "replace")
+        line = "%s: %s" % (entry.get("SYSLOG_IDENTIFIER") or entry.get("_SYSTEMD_UNIT", ""), message)
+        if matcher and not matcher.search(line):
+            continue
+        total += 1
+        matches.append({
+            "ts": int(entry.get("__REALTIME_TIMESTAMP", 0)) / 1e6,
+            "level": int(entry["PRIORITY"]) if str(entry.get("PRIORITY", "")).isdigit() else None,
+            "line": line[:LINE_LIMIT]
+        })
+    return list(matches), total, len(stdout)
+
+
+def main():
+    query = json.loads(base64.b64decode(sys.argv[1]).decode("utf-8"))
+    matcher = None
+    if query.get("pattern"):
+        flags = re.I if query.get("ignore_case", True) else 0
+        matcher = re.compile(query["pattern"] if query.get("regex") else re.escape(query["pattern"]), flags)
+
+    try:
+        if query.get("source") == "journal":
+            matches, total, scanned = search_journal(query, matcher)
+        else:
+            matches, total, scanned = search_file(query, matcher, time.time())
+    except (OSError, RuntimeError) as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
+
+    print(json.dumps({"matches": matches, "total": total, "scanned_bytes": scanned}))
+
+
+if __name__ == '__main__':
+    main()
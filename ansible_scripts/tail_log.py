@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# 由Ansible服务器管理面板生成：从上次读取的位置继续读取日志文件，只返回新增的内容（JSON输出）
+#
+# 第一个参数为base64编码的JSON：
+#   path       日志文件路径
+#   lines      首次读取时返回末尾的行数
+#   max_bytes  单次最多返回的字节数，超出部分跳过（保留最新的内容）
+# 第二个参数为本主机的游标 "inode:offset"，上次读取的文件inode和读到的字节位置（只计算完整的行）；
+# 为 "-" 或省略时视为首次读取
+#
+# 文件被轮转（inode变化）时，先从轮转后的旧文件（path.1 或 path-YYYYMMDD）读完剩余内容，再从新文件开头读取；
+# 文件被截断（大小小于offset）时从开头读取。
+import base64
+import glob
+import json
+import os
+import sys
+
+INITIAL_SCAN = 64 * 1024
+
+
+def find_rotated(path, inode):
+    for candidate in glob.glob(path + ".*") + glob.glob(path + "-*"):
+        if candidate.endswith((".gz", ".bz2", ".xz", ".zst")):
+            continue
+        try:
+            if os.stat(candidate).st_ino == inode:
+                return candidate
+        except OSError:
+            continue
+    return None
+
+
+# 读取 [start, end) 中的完整行，最多 limit 字节，返回 (内容, 读到的位置, 跳过的字节数)
+# 超出 limit 时先定位到 end - limit 再读取（不把跳过的部分读入内存），然后对齐到下一行开头；
+# 后面没有完整的行（单行超过 limit）时直接从 end - limit 截断
+def read_lines(f, start, end, limit):
+    if start >= end:
+        return b"", start, 0
+    if limit <= 0:
+        return b"", end, end - start
+    if end - start <= limit:
+        f.seek(start)
+        data = f.read(end - start)
+        cut = data.rfind(b"\n")
+        if cut == -1:
+            return b"", start, 0
+        return data[:cut + 1], start + cut + 1, 0
+
+    skipped = end - limit - start
+    f.seek(end - limit - 1)
+    previous = f.read(1)
+    data = f.read(limit)
+    if previous != b"\n":
+        newline = data.find(b"\n", 0, len(data) - 1)
+        if newline != -1:
+            data = data[newline + 1:]
+            skipped += newline + 1
+    cut = data.rfind(b"\n")
+    if cut == -1:
+        # 截断后仍没有换行符：返回这一段，避免游标停在超长的行上
+        return data, end, skipped
+    return data[:cut + 1], start + skipped + cut + 1, skipped
+
+
+def tail_start(f, size, lines):
+    start = max(0, size - INITIAL_SCAN)
+    f.seek(start)
+    data = f.read(size - start)
+    # 最后一行可能尚未写完，从最后一个换行符往前数
+    position = data.rfind(b"\n")
+    for _ in range(lines):
+        if position == -1:
+            break
+        position = data.rfind(b"\n", 0, position)
+    if position == -1:
+        # 扫描范围不是从文件开头开始时，第一行可能不完整
+        return start if start == 0 else start + data.find(b"\n") + 1
+    return start + position + 1
+
+
+def main():
+    query = json.loads(base64.b64decode(sys.argv[1]).decode("utf-8"))
+    path, max_bytes = query["path"], query.get("max_bytes", 1024 * 1024)
+    cursor = sys.argv[2] if len(sys.argv) > 2 else "-"
+    inode, offset = (int(value) for value in cursor.split(":")) if cursor != "-" else (None, 0)
+    result = {"rotated": False, "truncated": False, "skipped": 0}
+    rotated = None
+
+    try:
+        st = os.stat(path)
+        if inode is not None and st.st_ino != inode:
+            result["rotated"] = True
+            rotated, rotated_offset = find_rotated(path, inode), offset
+            offset = 0
+        elif inode is not None and st.st_size < offset:
+            result["truncated"] = True
+            offset = 0
+
+        # 先读当前文件，max_bytes 不够时优先保留最新的内容，剩余的额度再读轮转前的旧文件
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if inode is None:
+                offset = tail_start(f, size, query.get("lines", 50))
+            data, offset, skipped = read_lines(f, offset, size, max_bytes)
+        result["skipped"] += skipped
+        if rotated:
+            with open(rotated, "rb") as f:
+                old, _, skipped = read_lines(f, rotated_offset, os.fstat(f.fileno()).st_size, max_bytes - len(data))
+            result["skipped"] += skipped
+            data = old + data
+    except OSError as e:
+        print(json.dumps({"error": "%s: %s" % (e.strerror, path)}))
+        sys.exit(1)
+
+    result.update({"inode": st.st_ino, "offset": offset, "data": data.decode("utf-8", "replace")})
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
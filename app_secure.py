@@ -1,20 +1,43 @@
 import streamlit as st
-import ansible_runner
-import json
-import yaml
 import os
+import re
+import time
+import uuid
 from datetime import datetime
+import altair as alt
 import pandas as pd
-from pathlib import Path
 from dotenv import load_dotenv
 
-# 加载环境变量
+# 加载环境变量（需在导入server_manager之前，其模块级配置读取环境变量）
 load_dotenv()
 
+from server_manager.composite import CompositeResult, step, submit_composite
+from server_manager.config import DEFAULT_FORKS, host_alias
+from server_manager.connections import connection_manager_from_env
+from server_manager.facts import FACT_CACHE_TTL, gather_system_info, invalidate_cached_facts, load_cached_facts
+from server_manager.fleet import INVENTORY_SOURCE, current_fleet, fleet_signature, load_fleet
+from server_manager.history import job_history_from_env
+from server_manager.inventory import INVENTORY_PATH, InventoryManager
+from server_manager.jobs import JOB_HISTORY_LIMIT, JobManager
+from server_manager.logsearch import LOG_LEVELS, HostSearchResult, log_query, log_search_results, submit_log_search
+from server_manager.logtail import LogFollower
+from server_manager.metrics import collect_metrics
+from server_manager.output import OutputStore
+from server_manager.perf import JOB_PHASES, PERF_METRICS_BIND, PERF_METRICS_FILE, PERF_METRICS_PORT, perf_recorder_from_env
+from server_manager.overview import OVERVIEW_METRICS, OVERVIEW_METRICS_MAX_AGE, build_overview, group_summary, heatmap_frame, outliers, status_counts, top_n
+from server_manager.resultcache import RESULT_CACHE_TTL, ResultCache
+from server_manager.rollout import plan_batches, run_rollout
+from server_manager.runner import collect_host_results, run_ansible_batch, submit_ansible_adhoc
+from server_manager.scheduler import FLEET_POLL_INTERVAL, METRICS_POLL_INTERVAL, FleetPoller
+from server_manager.tsdb import metrics_store_from_env
+from server_manager.workspace import workspace_pool_from_env
+
 # 创建必要的目录
 os.makedirs('ansible_inventory', exist_ok=True)
 os.makedirs('ansible_playbooks', exist_ok=True)
 os.makedirs('ansible_logs', exist_ok=True)
+os.makedirs('ansible_facts_cache', exist_ok=True)
+os.makedirs('ansible_metrics', exist_ok=True)
 
 # 页面配置
 st.set_page_config(
@@ -23,30 +46,23 @@ st.set_page_config(
     layout="wide"
 )
 
-# 从环境变量读取服务器配置
-def load_servers_from_env():
-    servers = {}
-    
-    # 查找所有SERVER_*_HOST环境变量
-    for key in os.environ:
-        if key.endswith('_HOST') and key.startswith('SERVER_'):
-            server_name = key.replace('_HOST', '').replace('SERVER_', 'Server ')
-            server_prefix = key.replace('_HOST', '')
-            
-            servers[server_name] = {
-                "host": os.getenv(f"{server_prefix}_HOST"),
-                "user": os.getenv(f"{server_prefix}_USER", "root"),
-                "password": os.getenv(f"{server_prefix}_PASSWORD")
-            }
-    
-    return servers
+# 本次页面运行的开始时间（页面渲染耗时记入性能统计）
+page_started = time.perf_counter()
+
+# 加载服务器清单；来源未变化时复用已加载的清单和分组索引
+@st.cache_resource(max_entries=2)
+def get_fleet(source, signature):
+    return load_fleet(source)
 
-# 加载服务器配置
-SERVERS = load_servers_from_env()
+try:
+    SERVERS = get_fleet(INVENTORY_SOURCE, fleet_signature(INVENTORY_SOURCE))
+except Exception as e:
+    st.error(f"❌ 无法加载服务器清单 {INVENTORY_SOURCE}: {e}")
+    st.stop()
 
 # 如果没有配置服务器，显示警告
 if not SERVERS:
-    st.error("❌ 未找到服务器配置！请创建 .env 文件并配置服务器信息。")
+    st.error("❌ 未找到服务器配置！请创建 .env 文件并配置服务器信息，或通过 INVENTORY_SOURCE 指定inventory文件。")
     st.code("""
 # .env 文件示例
 SERVER_A_HOST=192.168.1.100
@@ -59,75 +75,305 @@ SERVER_B_PASSWORD=your_password
     """)
     st.stop()
 
-# 生成Ansible inventory文件
-def generate_inventory():
-    inventory = {
-        "all": {
-            "hosts": {},
-            "vars": {
-                "ansible_connection": "ssh",
-                "ansible_ssh_common_args": "-o StrictHostKeyChecking=no",
-                "ansible_python_interpreter": "/usr/bin/python3"
-            }
-        }
-    }
+# 进程内所有会话共享同一个inventory管理器
+@st.cache_resource
+def get_inventory_manager():
+    return InventoryManager(INVENTORY_PATH)
+
+# 进程内共享的SSH连接管理器，进程退出时关闭所有复用连接
+@st.cache_resource
+def get_ssh_connection_manager():
+    return connection_manager_from_env(close_on_exit=True)
+
+# 执行历史：任务结束后归档事件并建立索引，artifacts目录按宽限期清理
+@st.cache_resource
+def get_job_history():
+    return job_history_from_env()
+
+# 任务工作目录池：每个任务使用独立的 private_data_dir，并发执行互不干扰
+@st.cache_resource
+def get_workspace_pool():
+    return workspace_pool_from_env()
+
+# 进程内共享的性能统计：任务各阶段、每台主机和页面渲染的耗时
+@st.cache_resource
+def get_perf_recorder():
+    return perf_recorder_from_env()
+
+# 进程内所有会话共享同一个任务注册表
+@st.cache_resource
+def get_job_manager():
+    return JobManager(
+        get_inventory_manager(),
+        get_ssh_connection_manager(),
+        max_jobs=JOB_HISTORY_LIMIT,
+        history=get_job_history(),
+        workspaces=get_workspace_pool(),
+        perf=get_perf_recorder()
+    )
+
+# 本次会话执行Ansible时使用的服务器配置和任务注册表
+run_options = {"servers": SERVERS, "job_manager": get_job_manager()}
+
+# 流式展示：任务运行期间把每个主机的结果写入对应的占位符，不等待最慢的主机
+# 没有占位符的主机（不在当前页）交给 collect 只保存结果；渲染耗时（不含等待）记入性能统计
+def stream_host_results(job, placeholders, render, collect=None, poll_interval=0.2):
+    seen = 0
+    render_seconds = 0.0
     
-    for name, config in SERVERS.items():
-        if config["host"] and config["password"]:  # 确保必要信息存在
-            inventory["all"]["hosts"][name.replace(" ", "_")] = {
-                "ansible_host": config["host"],
-                "ansible_user": config["user"],
-                "ansible_password": config["password"]
-            }
+    while True:
+        finished = job.done()
+        new_events = job.events[seen:]
+        seen += len(new_events)
+        
+        render_started = time.perf_counter()
+        for event in new_events:
+            if event.host in placeholders:
+                with placeholders.pop(event.host).container():
+                    render(event.host, event.status, event.res)
+            elif collect is not None:
+                collect(event.host, event.status, event.res)
+        render_seconds += time.perf_counter() - render_started
+        
+        if finished:
+            break
+        time.sleep(poll_interval)
+    
+    get_perf_recorder().observe("render", render_seconds)
     
-    with open('ansible_inventory/hosts.yml', 'w') as f:
-        yaml.dump(inventory, f)
+    # 剩余的占位符对应没有返回任何事件的主机
+    for host, placeholder in placeholders.items():
+        placeholder.warning(f"⚠️ {host}: 无执行结果")
+
+# 命令输出：完整内容保存在服务端，页面只展示有限的行数
+OUTPUT_PREVIEW_LINES = 40        # 不超过该行数的输出直接完整展示
+OUTPUT_PREVIEW_BYTES = 16 * 1024
+OUTPUT_PAGE_LINES = 200
+OUTPUT_LINE_WIDTH = 1000         # 单行超过该长度时截断展示
+
+@st.cache_resource
+def get_output_store():
+    return OutputStore()
+
+# 只读命令（快捷查看命令、资源指标）的结果缓存，所有会话共享，相同请求合并执行
+@st.cache_resource
+def get_result_cache():
+    return ResultCache()
+
+# 将输出放入输出存储，会话中只保存引用；同一key的输出只保存一次。run 为输出所属的执行，存储按执行整组淘汰
+def store_output(key, server, text, label="", run=None):
+    refs = st.session_state.setdefault("output_refs", {})
+    store = get_output_store()
+    if key not in refs or store.get(refs[key]) is None:
+        refs[key] = store.put(server, text, label, run=run).id
+    return refs[key]
 
-# 执行Ansible命令
-def run_ansible_adhoc(hosts, module, args=""):
-    generate_inventory()
+def clip_lines(lines):
+    return "\n".join(line if len(line) <= OUTPUT_LINE_WIDTH else line[:OUTPUT_LINE_WIDTH] + " …" for line in lines)
+
+# 有界展示：小输出直接显示；大输出默认只显示首尾，可分页、搜索，完整内容通过下载获取
+def render_output(buffer_id, language='bash'):
+    buffer = get_output_store().get(buffer_id)
+    if buffer is None:
+        st.caption("输出已过期，请重新执行")
+        return
+    
+    if buffer.line_count <= OUTPUT_PREVIEW_LINES and buffer.size <= OUTPUT_PREVIEW_BYTES:
+        st.code(clip_lines(buffer.lines(0, buffer.line_count)), language=language)
+        return
     
-    runner = ansible_runner.run(
-        private_data_dir='.',
-        inventory='ansible_inventory/hosts.yml',
-        host_pattern=hosts,
-        module=module,
-        module_args=args,
-        quiet=True
+    st.caption(f"共 {buffer.line_count} 行，{buffer.size / 1024:.1f} KB")
+    mode = st.radio(
+        "显示方式", ["首尾", "分页", "搜索"], horizontal=True, key=f"output_mode_{buffer.id}", label_visibility="collapsed"
     )
     
-    return runner
+    if mode == "首尾":
+        half = OUTPUT_PREVIEW_LINES // 2
+        omitted = buffer.line_count - 2 * half
+        text = clip_lines(buffer.head(half))
+        if omitted > 0:
+            text += f"\n… 省略 {omitted} 行 …\n" + clip_lines(buffer.tail(half))
+        else:
+            text = clip_lines(buffer.lines(0, buffer.line_count))
+        st.code(text, language=language)
+    elif mode == "分页":
+        page_count = (buffer.line_count + OUTPUT_PAGE_LINES - 1) // OUTPUT_PAGE_LINES
+        page = st.number_input(f"页码（共 {page_count} 页）", min_value=1, max_value=page_count, value=1, key=f"output_page_{buffer.id}")
+        start = (page - 1) * OUTPUT_PAGE_LINES
+        st.code(clip_lines(buffer.lines(start, start + OUTPUT_PAGE_LINES)), language=language)
+    else:
+        col1, col2 = st.columns([3, 1])
+        pattern = col1.text_input("搜索内容", key=f"output_search_{buffer.id}")
+        use_regex = col2.checkbox("正则表达式", key=f"output_regex_{buffer.id}")
+        if pattern:
+            try:
+                matches, truncated = buffer.search(pattern, regex=use_regex, limit=OUTPUT_PAGE_LINES)
+            except re.error as e:
+                st.error(f"正则表达式错误: {e}")
+            else:
+                st.caption(f"{'前 ' if truncated else ''}{len(matches)} 处匹配")
+                if matches:
+                    st.code(clip_lines(f"{number}: {line}" for number, line in matches), language=language)
+    
+    # 完整内容只在需要时读取，避免每次刷新都把大输出发送到浏览器
+    if st.checkbox("⬇️ 下载完整输出", key=f"output_download_{buffer.id}"):
+        st.download_button(
+            "保存到本地",
+            buffer.read_bytes(),
+            file_name=f"{host_alias(buffer.server)}_{buffer.label or 'output'}.log",
+            key=f"output_save_{buffer.id}"
+        )
+
+# 保存一台主机的执行结果（输出放入输出存储），用于翻页、搜索时重新展示而不重新执行
+def save_host_result(key, server, status, res, label=""):
+    item = {
+        "server": server,
+        "status": status,
+        "rc": res.get("rc"),
+        "msg": res.get("msg", ""),
+        "stderr": (res.get("stderr") or "")[:OUTPUT_PREVIEW_BYTES],
+        "output": None
+    }
+    if res.get("stdout"):
+        item["output"] = store_output(f"{key}:{server}", server, res["stdout"], label, run=key)
+    return item
+
+# nested=True 时用标题代替折叠框（Streamlit不支持嵌套折叠框）
+def render_host_result(item, title, language='bash', expanded=False, nested=False):
+    if item["status"] == "ok":
+        if nested:
+            st.markdown(f"**{title}**")
+        with st.container() if nested else st.expander(title, expanded=expanded):
+            if item["output"]:
+                render_output(item["output"], language)
+            if item["stderr"]:
+                st.error(item["stderr"])
+    else:
+        st.error(f"❌ {item['server']}: 命令执行失败 {item['msg']}")
+
+HOST_RESULTS_PAGE_SIZE = 20
+NO_RESULT = {"status": "unreachable", "res": {"msg": "无执行结果"}}
+
+# 分页：不超过一页时直接返回；否则显示页码（failed 指定时可只看失败的元素），只返回当前页
+def page_items(items, key, failed=None):
+    if len(items) <= HOST_RESULTS_PAGE_SIZE:
+        return items
+    col1, col2 = st.columns(2)
+    if failed is not None and col1.checkbox("只显示失败的主机", key=f"{key}_failed_only"):
+        items = [item for item in items if failed(item)]
+    page_count = max(1, -(-len(items) // HOST_RESULTS_PAGE_SIZE))
+    page = col2.number_input(f"页码（共 {page_count} 页）", min_value=1, max_value=page_count, value=1, key=f"{key}_page")
+    return items[(page - 1) * HOST_RESULTS_PAGE_SIZE:page * HOST_RESULTS_PAGE_SIZE]
+
+# 失败的主机（{服务器: 错误信息}）汇总为一行，展开后分页列出
+def render_host_errors(errors, key):
+    if not errors:
+        return
+    with st.expander(f"❌ {len(errors)} 台服务器失败"):
+        page = page_items(list(errors), key)
+        st.dataframe(pd.DataFrame([{"服务器": name, "错误": errors[name]} for name in page]), use_container_width=True, hide_index=True)
+
+# 任务的主机结果：任务仍在注册表中时读取内存中的事件，否则从执行历史的归档读取；
+# hosts 指定时按该顺序返回，没有结果的主机视为不可达
+def load_job_results(job_id, hosts=None):
+    job = get_job_manager().get(job_id)
+    events = list(job.events) if job is not None else get_job_history().load_events(job_id)
+    results = collect_host_results(events)
+    if hosts is None:
+        return results
+    return {host: results.get(host, NO_RESULT) for host in hosts}
+
+# 多台主机的结果（{主机: {"status", "res"}}）按页展示：汇总表和输出都只包含当前页的主机，
+# 只有当前页主机的输出放入输出存储（key 同时作为输出所属的执行）
+def render_host_results(results, key, expanded=False, nested=False, label=""):
+    hosts = list(results)
+    if len(hosts) > HOST_RESULTS_PAGE_SIZE:
+        failed = sum(1 for result in results.values() if result["status"] != "ok")
+        st.caption(f"共 {len(hosts)} 台主机，{len(hosts) - failed} 台成功，{failed} 台失败")
+    page = page_items(hosts, key, failed=lambda host: results[host]["status"] != "ok")
+    if len(hosts) > HOST_RESULTS_PAGE_SIZE:
+        st.dataframe(pd.DataFrame([{
+            "服务器": host,
+            "状态": results[host]["status"],
+            "返回码": results[host]["res"].get("rc"),
+            "信息": (results[host]["res"].get("msg") or "")[:200]
+        } for host in page]), use_container_width=True, hide_index=True)
+    
+    for host in page:
+        item = save_host_result(key, host, results[host]["status"], results[host]["res"], label)
+        render_host_result(item, f"📍 {host}", expanded=expanded, nested=nested)
+
+# 滚动执行参数（软件包管理和服务管理共用）
+def rollout_settings(key):
+    with st.expander("滚动执行设置"):
+        col1, col2, col3, col4 = st.columns(4)
+        serial = col1.text_input("批次大小", value="25%", key=f"{key}_serial", help="主机数或百分比；多个批次用逗号分隔，如 1,10%,50%")
+        max_parallel = col2.number_input("批内并发上限", min_value=1, max_value=500, value=DEFAULT_FORKS, key=f"{key}_parallel")
+        max_fail = col3.slider("最大失败比例(%)", 0, 100, 0, key=f"{key}_max_fail", help="单批失败比例超过该值时中止后续批次")
+        batch_timeout = col4.number_input("单批超时(秒)", min_value=0, value=300, key=f"{key}_timeout", help="0 表示不限制")
+    serial = [item.strip() for item in serial.split(",") if item.strip()] or ["100%"]
+    try:
+        batches = plan_batches(TARGETS, serial)
+    except ValueError:
+        st.error("批次大小格式错误，已改为一次执行全部服务器")
+        serial = ["100%"]
+        batches = plan_batches(TARGETS, serial)
+    st.caption(f"共 {len(TARGETS)} 台服务器，分 {len(batches)} 批执行：{' / '.join(str(len(b)) for b in batches)}")
+    return {
+        "serial": serial,
+        "max_parallel": max_parallel,
+        "max_fail_percentage": max_fail,
+        "batch_timeout": batch_timeout or None
+    }
 
-# 执行Ansible Playbook
-def run_ansible_playbook(playbook_path, hosts="all"):
-    generate_inventory()
+# 滚动执行并逐批展示结果
+def run_rollout_with_progress(command, health_check=None, report=None, **settings):
+    progress = st.progress(0.0)
     
-    runner = ansible_runner.run(
-        private_data_dir='.',
-        inventory='ansible_inventory/hosts.yml',
-        playbook=playbook_path,
-        limit=hosts,
-        quiet=True
+    def on_batch(batch, total):
+        progress.progress((batch.index + 1) / total, text=f"第 {batch.index + 1}/{total} 批完成，用时 {batch.duration:.1f} 秒")
+        with st.expander(f"第 {batch.index + 1} 批：{len(batch.hosts) - len(batch.failed)}/{len(batch.hosts)} 成功", expanded=bool(batch.failed)):
+            for name, result in batch.results.items():
+                details = [s.stdout.strip() for s in result.steps if s.name in ("health", "report") and s.stdout.strip()]
+                suffix = f"（{' / '.join(details)}）" if details else ""
+                if result.status == "ok":
+                    st.success(f"✅ {name}: 操作完成{suffix}")
+                elif result.status == "unhealthy":
+                    st.error(f"❌ {name}: 健康检查未通过{suffix}")
+                else:
+                    st.error(f"❌ {name}: {result.error}{suffix}")
+    
+    rollout = run_rollout(
+        TARGETS, command, health_check=health_check, report=report, on_batch=on_batch, **settings, **run_options
     )
+    if rollout.aborted:
+        st.warning(f"⚠️ 失败比例超过上限，已中止；{len(rollout.skipped)} 台服务器未执行: {', '.join(rollout.skipped)}")
+    return rollout
+
+# 进程内共享的指标存储
+@st.cache_resource
+def get_metrics_store():
+    return metrics_store_from_env()
+
+# 进程内唯一的轮询器，跟踪整个清单，各会话只显示自己的目标主机
+# 依赖的共享资源在此处解析，后台线程不直接访问Streamlit缓存；服务器清单在每次检查时按来源的变化标记重新解析
+@st.cache_resource
+def get_fleet_poller():
+    store = get_metrics_store()
+    cache = get_result_cache()
+    job_manager = get_job_manager()
     
-    return runner
-
-# 创建系统信息收集playbook
-def create_system_info_playbook():
-    playbook = [{
-        "name": "收集系统信息",
-        "hosts": "all",
-        "gather_facts": True,
-        "tasks": [
-            {
-                "name": "获取系统信息",
-                "setup": None
-            }
-        ]
-    }]
+    def options():
+        return {"servers": current_fleet(INVENTORY_SOURCE), "job_manager": job_manager}
     
-    with open('ansible_playbooks/system_info.yml', 'w') as f:
-        yaml.dump(playbook, f)
+    poller = FleetPoller(
+        check=lambda names: run_ansible_batch(names, "ping", **options()),
+        collect=lambda names: collect_metrics(names, store=store, cache=cache, **options()),
+        interval=FLEET_POLL_INTERVAL,
+        metrics_interval=METRICS_POLL_INTERVAL
+    )
+    poller.start()
+    return poller
 
 # 主程序开始
 
@@ -135,17 +381,54 @@ def create_system_info_playbook():
 st.title("🖥️ Ansible服务器管理面板")
 st.markdown("---")
 
+# 侧边栏中列出的分组和标签数量上限
+SIDEBAR_LIST_LIMIT = 30
+
 # 侧边栏
 with st.sidebar:
     st.header("服务器列表")
     
-    # 显示服务器状态
-    st.subheader("服务器概览")
-    for name, config in SERVERS.items():
-        with st.expander(f"{name} ({config['host']})"):
-            st.text(f"IP: {config['host']}")
-            st.text(f"用户: {config['user']}")
-            st.text("密码: ********")
+    # 目标主机：各功能只在匹配的服务器上执行
+    target_pattern = st.text_input(
+        "目标主机",
+        value="all",
+        help="Ansible主机模式：分组、标签、服务器名、通配符或 ~正则，用 : 或 , 分隔，& 表示交集，! 表示排除，例如 web:&prod、db*:!db03"
+    )
+    try:
+        TARGETS = SERVERS.select(target_pattern)
+    except re.error as e:
+        st.error(f"主机模式中的正则表达式无效: {e}")
+        TARGETS = []
+    st.caption(f"匹配 {len(TARGETS)} / {len(SERVERS)} 台服务器")
+    if SERVERS.groups:
+        st.caption(f"分组: {', '.join(SERVERS.groups[:SIDEBAR_LIST_LIMIT])}{' …' if len(SERVERS.groups) > SIDEBAR_LIST_LIMIT else ''}")
+    if SERVERS.tags:
+        st.caption(f"标签: {', '.join(SERVERS.tags[:SIDEBAR_LIST_LIMIT])}{' …' if len(SERVERS.tags) > SIDEBAR_LIST_LIMIT else ''}")
+    
+    # 选择在「服务器状态」中修改，数量在表格处理完后填入
+    selection_summary = st.empty()
+    
+    st.markdown("---")
+    
+    # 执行设置
+    forks = st.number_input(
+        "并发数 (forks)",
+        min_value=1,
+        max_value=500,
+        value=DEFAULT_FORKS,
+        help="单次Ansible执行中同时处理的主机数"
+    )
+    
+    # SSH连接复用状态
+    ssh_manager = get_ssh_connection_manager()
+    if st.button("断开复用连接"):
+        ssh_manager.close_all()
+    st.caption(f"🔗 SSH复用连接: {len(ssh_manager.sockets())} 个（保持 {ssh_manager.persist_seconds} 秒）")
+    
+    # 只读命令结果缓存；统计在页面执行完后填入，包含本次刷新中的请求
+    if st.button("清空结果缓存"):
+        get_result_cache().clear()
+    cache_summary = st.empty()
     
     st.markdown("---")
     
@@ -162,51 +445,183 @@ with st.sidebar:
     # 应用信息
     st.info("💡 Ansible服务器管理工具 v1.0")
 
+if not TARGETS:
+    st.warning("没有服务器匹配当前的目标主机模式，请在侧边栏修改「目标主机」。")
+    st.stop()
+
 # 主要功能标签页
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
+tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs([
     "📊 服务器状态", 
     "🔧 执行命令", 
     "📋 系统信息", 
     "📈 监控面板",
-    "⚙️ 高级操作"
+    "⚙️ 高级操作",
+    "🗂️ 后台任务",
+    "📜 执行历史",
+    "⏱️ 性能"
 ])
 
 # Tab 1: 服务器状态
 with tab1:
     st.header("服务器连接状态")
     
+    poller = get_fleet_poller()
+    poller.track(SERVERS)
+    
     col1, col2 = st.columns([3, 1])
     
+    with col1:
+        if poller.interval:
+            st.caption(f"后台每 {poller.interval} 秒检查一次（离线服务器逐步延长间隔），所有会话共享检查结果")
+        else:
+            st.caption("后台轮询已关闭，点击按钮手动检查")
+    
     with col2:
         auto_refresh = st.checkbox("自动刷新 (30秒)")
     
-    if st.button("🔄 检查所有服务器连接") or auto_refresh:
+    if st.button("🔄 检查所有服务器连接"):
         with st.spinner("正在检查服务器连接..."):
-            results = []
-            
-            for name in SERVERS.keys():
-                host_pattern = name.replace(" ", "_")
-                runner = run_ansible_adhoc(host_pattern, "ping")
-                
-                status = "✅ 在线" if runner.status == "successful" else "❌ 离线"
-                results.append({
-                    "服务器": name,
-                    "IP地址": SERVERS[name]["host"],
-                    "状态": status,
-                    "检查时间": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-            
-            df = pd.DataFrame(results)
-            st.dataframe(df, use_container_width=True)
+            poller.poll_now(timeout=300)
+    
+    status_labels = {"online": "✅ 在线", "offline": "❌ 离线", "unknown": "⏳ 检查中"}
+    
+    def format_check_time(timestamp):
+        if pd.isna(timestamp) or not timestamp or timestamp == float("inf"):
+            return "-"
+        return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+    
+    # 服务器表格：状态来自后台轮询的快照，指标取每台主机最近一次采集；筛选在DataFrame上完成，页面只渲染当前页
+    overview_start = time.perf_counter()
+    now = time.time()
+    overview = build_overview(
+        TARGETS, poller.snapshot(), get_metrics_store().latest(now - OVERVIEW_METRICS_MAX_AGE), now
+    )
+    fleet_df = SERVERS.frame().loc[TARGETS].assign(
+        状态=overview["status"].map(status_labels).astype(str),
+        连续失败=overview["failures"],
+        **{"CPU%": overview["cpu"], "内存%": overview["mem"], "磁盘%": overview["disk"]},
+        检查时间=overview["last_checked"],
+        下次检查=overview["next_check"]
+    )
+    
+    counts = status_counts(overview)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("总服务器数", len(fleet_df))
+    col2.metric("在线服务器", int(counts["online"]))
+    col3.metric("离线服务器", int(counts["offline"]))
+    
+    # 集群概览：按分组的指标分位数、排名、异常和热力图，全部在概览表上向量化计算
+    with st.expander("📊 集群概览", expanded=len(TARGETS) > 50):
+        memberships = SERVERS.memberships()
+        overview_metrics = {"CPU%": "cpu", "内存%": "mem", "磁盘%": "disk", "负载(1m)": "load1"}
+        col1, col2 = st.columns(2)
+        overview_label = col1.selectbox("指标", list(overview_metrics.keys()), key="overview_metric")
+        overview_metric = overview_metrics[overview_label]
+        heatmap_stat = col2.selectbox("热力图统计", ["p50", "p90", "p99", "max", "mean"], index=1, key="overview_stat")
+        
+        reporting = int(overview[overview_metric].notna().sum())
+        if not reporting:
+            st.info(f"最近 {OVERVIEW_METRICS_MAX_AGE // 60} 分钟内没有指标数据，等待后台采集（「资源监控」页可手动采集）")
+        else:
+            st.markdown("**分组统计**")
+            st.dataframe(
+                group_summary(overview, memberships, overview_metric).rename(columns={
+                    "hosts": "主机数", "online": "在线", "offline": "离线", "reporting": "有数据"
+                }),
+                use_container_width=True
+            )
             
-            # 显示统计信息
-            online_count = len([r for r in results if "✅" in r["状态"]])
-            total_count = len(results)
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown(f"**{overview_label} 最高的 10 台**")
+                st.dataframe(
+                    top_n(overview, overview_metric).assign(status=lambda df: df["status"].map(status_labels)),
+                    use_container_width=True
+                )
+            with col2:
+                st.markdown("**分组内异常主机**（相对分组中位数的稳健z分数）")
+                anomalies = outliers(overview, memberships, overview_metric)
+                if anomalies.empty:
+                    st.caption("没有异常主机")
+                else:
+                    st.dataframe(anomalies.rename(columns={"group": "分组", "median": "分组中位数", "score": "z分数"}),
+                                 use_container_width=True)
             
-            col1, col2, col3 = st.columns(3)
-            col1.metric("总服务器数", total_count)
-            col2.metric("在线服务器", online_count)
-            col3.metric("离线服务器", total_count - online_count)
+            heatmap = heatmap_frame(overview, memberships, heatmap_stat)
+            st.altair_chart(
+                alt.Chart(heatmap).mark_rect().encode(
+                    x=alt.X("metric:N", title="指标", sort=OVERVIEW_METRICS),
+                    y=alt.Y("group:N", title="分组"),
+                    color=alt.Color("value:Q", title=heatmap_stat, scale=alt.Scale(scheme="orangered")),
+                    tooltip=["group", "metric", alt.Tooltip("value:Q", format=".1f")]
+                ),
+                use_container_width=True
+            )
+        st.caption(f"{len(overview)} 台服务器，{reporting} 台有最近指标 | 计算耗时 {(time.perf_counter() - overview_start) * 1000:.0f} ms")
+    
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    fleet_search = col1.text_input("搜索服务器", placeholder="名称或IP地址")
+    fleet_groups = col2.multiselect("分组", SERVERS.groups)
+    fleet_tags = col3.multiselect("标签", SERVERS.tags)
+    fleet_status = col4.multiselect("状态", list(status_labels.values()))
+    
+    selection = st.session_state.setdefault("selected_servers", set())
+    only_selected = st.checkbox(f"只显示已选择的服务器（{len(selection)} 台）")
+    
+    mask = pd.Series(True, index=fleet_df.index)
+    if fleet_search:
+        mask &= (
+            fleet_df["服务器"].str.contains(fleet_search, case=False, regex=False)
+            | fleet_df["IP地址"].str.contains(fleet_search, case=False, regex=False)
+        )
+    if fleet_groups:
+        mask &= fleet_df.index.isin(set().union(*(SERVERS.members(g) for g in fleet_groups)))
+    if fleet_tags:
+        mask &= fleet_df.index.isin(set().union(*(SERVERS.tagged(t) for t in fleet_tags)))
+    if fleet_status:
+        mask &= fleet_df["状态"].isin(fleet_status)
+    if only_selected:
+        mask &= fleet_df.index.isin(selection)
+    filtered = fleet_df[mask]
+    
+    # 批量选择作用于全部筛选结果，而不只是当前页
+    col1, col2, col3 = st.columns(3)
+    if col1.button(f"☑️ 选择筛选结果（{len(filtered)} 台）"):
+        selection.update(filtered.index)
+        st.session_state.selection_version = st.session_state.get("selection_version", 0) + 1
+    if col2.button("⬜ 取消选择筛选结果"):
+        selection.difference_update(filtered.index)
+        st.session_state.selection_version = st.session_state.get("selection_version", 0) + 1
+    if col3.button("🗑️ 清空选择"):
+        selection.clear()
+        st.session_state.selection_version = st.session_state.get("selection_version", 0) + 1
+    
+    col1, col2 = st.columns([1, 3])
+    page_size = col1.selectbox("每页行数", [25, 50, 100, 200], index=1)
+    page_count = max(1, -(-len(filtered) // page_size))
+    page = col2.number_input(f"页码（共 {page_count} 页）", min_value=1, max_value=page_count, value=1)
+    
+    page_df = filtered.iloc[(page - 1) * page_size:page * page_size].copy()
+    page_df["检查时间"] = page_df["检查时间"].map(format_check_time)
+    page_df["下次检查"] = page_df["下次检查"].map(format_check_time)
+    page_df.insert(0, "选择", page_df.index.isin(selection))
+    
+    # 表格的编辑状态与选择版本绑定，批量操作后重新按当前选择渲染
+    edited = st.data_editor(
+        page_df,
+        key=f"fleet_table_{st.session_state.get('selection_version', 0)}_{page}_{page_size}",
+        use_container_width=True,
+        hide_index=True,
+        disabled=[column for column in page_df.columns if column != "选择"],
+        column_config={"选择": st.column_config.CheckboxColumn("选择", width="small")}
+    )
+    for name, checked in zip(page_df.index, edited["选择"]):
+        if checked:
+            selection.add(name)
+        else:
+            selection.discard(name)
+    st.caption(f"筛选结果 {len(filtered)} 台，第 {page}/{page_count} 页 | 已选择 {len(selection)} 台，可在「执行命令」中对已选择的服务器执行")
+    selection_summary.caption(f"已选择 {len(selection)} 台（在「服务器状态」中筛选和选择）")
 
 # Tab 2: 执行命令
 with tab2:
@@ -245,95 +660,182 @@ with tab2:
     col1, col2 = st.columns([1, 2])
     
     with col1:
-        selected_servers = st.multiselect(
-            "选择服务器",
-            options=list(SERVERS.keys()),
-            default=list(SERVERS.keys())
+        selection = st.session_state.get("selected_servers", set())
+        chosen = [name for name in TARGETS if name in selection]
+        scope = st.radio(
+            "执行范围",
+            [f"全部目标主机（{len(TARGETS)} 台）", f"已选择的服务器（{len(chosen)} 台）"],
+            index=1 if chosen else 0
         )
+        selected_servers = chosen if scope.startswith("已选择") else TARGETS
     
     with col2:
+        # 快捷命令写入输入框的状态，点击「执行命令」触发的刷新中仍然保留
         if selected_quick_cmd:
-            command = st.text_input("输入要执行的命令", value=selected_quick_cmd)
-        else:
-            command = st.text_input("输入要执行的命令", placeholder="例如: ls -la, df -h, free -m")
+            st.session_state.command_input = selected_quick_cmd
+        command = st.text_input("输入要执行的命令", key="command_input", placeholder="例如: ls -la, df -h, free -m")
     
     # 危险命令警告
     dangerous_commands = ['rm -rf', 'shutdown', 'reboot', 'mkfs', 'dd if=']
     if any(dc in command.lower() for dc in dangerous_commands):
         st.warning("⚠️ 警告：您正在执行可能有危险的命令！")
     
+    run_in_background = st.checkbox("后台执行", help="提交为后台任务，可在「后台任务」标签页查看进度或取消")
+    use_cache = command in quick_commands.values() and st.checkbox(
+        f"使用 {RESULT_CACHE_TTL} 秒内的缓存结果",
+        value=True,
+        help="快捷命令只读取服务器状态：有效期内直接返回缓存结果，其他会话正在执行的相同命令会合并为一次执行"
+    )
+    
     if st.button("执行命令", type="primary") and command and selected_servers:
-        hosts = ",".join([s.replace(" ", "_") for s in selected_servers])
+        hosts = ",".join([host_alias(s) for s in selected_servers])
         
-        with st.spinner(f"正在执行命令: {command}"):
-            runner = run_ansible_adhoc(hosts, "shell", command)
-            
+        if run_in_background:
+            job = submit_ansible_adhoc(hosts, "shell", command, forks=forks, description=command, **run_options)
+            st.session_state.setdefault("job_ids", []).append(job.id)
+            st.info(f"📋 已提交后台任务 {job.id}，可在「后台任务」标签页查看进度")
+        else:
             st.subheader("执行结果")
             
-            for event in runner.events:
-                if event['event'] == 'runner_on_ok':
-                    host = event['event_data']['host']
-                    result = event['event_data']['res']
-                    
-                    with st.expander(f"📍 {host}", expanded=True):
-                        if 'stdout' in result:
-                            st.code(result['stdout'], language='bash')
-                        if 'stderr' in result and result['stderr']:
-                            st.error(result['stderr'])
-                
-                elif event['event'] == 'runner_on_failed':
-                    host = event['event_data']['host']
-                    st.error(f"❌ {host}: 命令执行失败")
+            # 第一页的每台服务器一个占位符，结果到达后立即替换；其余主机的结果保留在任务中，执行结束后分页展示
+            placeholders = {}
+            for server in selected_servers[:HOST_RESULTS_PAGE_SIZE]:
+                placeholders[host_alias(server)] = st.empty()
+                placeholders[host_alias(server)].info(f"⏳ {host_alias(server)}: 等待结果...")
+            if len(selected_servers) > HOST_RESULTS_PAGE_SIZE:
+                st.caption(f"其余 {len(selected_servers) - HOST_RESULTS_PAGE_SIZE} 台服务器的结果在执行结束后分页展示")
+            
+            run_id = uuid.uuid4().hex[:8]
+            command_results = {"command": command, "id": run_id, "hosts": [host_alias(s) for s in selected_servers]}
+            
+            def render_command_result(host, status, result):
+                item = save_host_result(f"command:{run_id}", host, status, result, "command")
+                render_host_result(item, f"📍 {host}", expanded=True)
+            
+            def render_cached_result(name, result):
+                if host_alias(name) not in placeholders:
+                    return
+                with placeholders.pop(host_alias(name)).container():
+                    render_command_result(host_alias(name), result["status"], result["res"])
+                    if result["cached_at"]:
+                        st.caption(f"🗃️ 缓存结果（{time.time() - result['cached_at']:.0f} 秒前）")
+            
+            with st.spinner(f"正在执行命令: {command}"):
+                if use_cache:
+                    # 缓存命中的结果不属于任何任务，保存在会话中（快捷命令的输出都很短）
+                    cached = get_result_cache().run(
+                        selected_servers, "shell", command, forks=forks, description=command,
+                        on_result=render_cached_result, **run_options
+                    )
+                    command_results["results"] = {host_alias(name): result for name, result in cached.items()}
+                else:
+                    job = submit_ansible_adhoc(hosts, "shell", command, forks=forks, description=command, **run_options)
+                    stream_host_results(job, placeholders, render_command_result)
+                    command_results["job_id"] = job.id
+            st.session_state.command_results = command_results
+            if len(selected_servers) > HOST_RESULTS_PAGE_SIZE:
+                st.rerun()
+    
+    # 翻页、搜索等操作触发刷新时，展示上次的执行结果（不重新执行）
+    elif "command_results" in st.session_state:
+        command_results = st.session_state.command_results
+        st.subheader(f"执行结果：{command_results['command']}")
+        if "results" in command_results:
+            results = command_results["results"]
+        else:
+            results = load_job_results(command_results["job_id"], command_results["hosts"])
+        render_host_results(results, f"command:{command_results['id']}", expanded=True, label="command")
 
 # Tab 3: 系统信息
 with tab3:
     st.header("系统详细信息")
     
+    col1, col2 = st.columns([3, 1])
+    
+    with col1:
+        ttl_minutes = st.number_input(
+            "缓存有效期（分钟）",
+            min_value=1,
+            max_value=1440,
+            value=max(FACT_CACHE_TTL // 60, 1)
+        )
+        fact_ttl = ttl_minutes * 60
+    
+    with col2:
+        if st.button("🗑️ 清空缓存"):
+            invalidate_cached_facts()
+    
+    fact_hosts = [host_alias(name) for name in TARGETS]
+    
     if st.button("🔍 收集系统信息"):
-        create_system_info_playbook()
-        
         with st.spinner("正在收集系统信息..."):
-            runner = run_ansible_playbook('ansible_playbooks/system_info.yml')
-            
-            for event in runner.events:
-                if event['event'] == 'runner_on_ok' and 'ansible_facts' in event['event_data']['res']:
-                    host = event['event_data']['host']
-                    facts = event['event_data']['res']['ansible_facts']
-                    
-                    with st.expander(f"🖥️ {host} 系统信息", expanded=True):
-                        # 基本信息
-                        st.subheader("基本信息")
-                        col1, col2, col3 = st.columns(3)
-                        
-                        with col1:
-                            st.metric("操作系统", f"{facts.get('ansible_distribution', 'N/A')} {facts.get('ansible_distribution_version', '')}")
-                            st.metric("内核版本", facts.get('ansible_kernel', 'N/A'))
-                            st.metric("架构", facts.get('ansible_architecture', 'N/A'))
-                        
-                        with col2:
-                            st.metric("CPU核心数", facts.get('ansible_processor_cores', 'N/A'))
-                            st.metric("CPU型号", facts.get('ansible_processor', ['N/A'])[-1] if facts.get('ansible_processor') else 'N/A')
-                            total_mem = facts.get('ansible_memtotal_mb', 0)
-                            st.metric("总内存", f"{total_mem:,} MB")
-                        
-                        with col3:
-                            st.metric("主机名", facts.get('ansible_hostname', 'N/A'))
-                            st.metric("IP地址", facts.get('ansible_default_ipv4', {}).get('address', 'N/A'))
-                            uptime_days = facts.get('ansible_uptime_seconds', 0) // 86400
-                            st.metric("运行时间", f"{uptime_days} 天")
-                        
-                        # 网络接口
-                        st.subheader("网络接口")
-                        interfaces = facts.get('ansible_interfaces', [])
-                        if interfaces:
-                            for iface in interfaces[:5]:  # 限制显示前5个
-                                iface_data = facts.get(f'ansible_{iface}', {})
-                                if iface_data.get('ipv4'):
-                                    st.text(f"{iface}: {iface_data['ipv4'].get('address', 'N/A')}")
+            gather_system_info(fact_hosts, fact_ttl, forks=forks, **run_options)
+    
+    # 直接从缓存渲染，只有缺失或过期的主机才需要重新收集；汇总表只包含当前页的主机，详细信息一次只展示一台
+    page_hosts = page_items(fact_hosts, "facts")
+    entries = {host: load_cached_facts(host, ttl=float("inf")) for host in page_hosts}
+    entries = {host: entry for host, entry in entries.items() if entry is not None}
+    
+    if entries:
+        now = time.time()
+        st.dataframe(pd.DataFrame([{
+            "主机": host,
+            "操作系统": f"{entry['facts']['distribution']} {entry['facts']['distribution_version']}",
+            "内核版本": entry["facts"]["kernel"],
+            "CPU核心数": entry["facts"]["processor_cores"],
+            "总内存(MB)": entry["facts"]["memtotal_mb"],
+            "IP地址": entry["facts"]["ipv4"],
+            "缓存(秒前)": int(now - entry["gathered_at"])
+        } for host, entry in entries.items()]), use_container_width=True, hide_index=True)
+        
+        host = st.selectbox("查看主机详情", list(entries))
+        entry = entries[host]
+        
+        with st.container():
+            col_age, col_refresh = st.columns([3, 1])
+            
+            if col_refresh.button("🔄 刷新此主机", key=f"refresh_facts_{host}"):
+                invalidate_cached_facts(host)
+                with st.spinner(f"正在刷新 {host} 的系统信息..."):
+                    entry = gather_system_info([host], fact_ttl, forks=forks, **run_options)[host]
+            
+            if entry is None:
+                st.error(f"❌ {host}: 系统信息收集失败")
+            else:
+                age = int(time.time() - entry["gathered_at"])
+                col_age.caption(f"🖥️ {host} | 缓存于 {age} 秒前" + ("（已过期）" if age > fact_ttl else ""))
+                facts = entry["facts"]
+                
+                # 基本信息
+                st.subheader("基本信息")
+                col1, col2, col3 = st.columns(3)
+                
+                with col1:
+                    st.metric("操作系统", f"{facts['distribution']} {facts['distribution_version']}")
+                    st.metric("内核版本", facts['kernel'])
+                    st.metric("架构", facts['architecture'])
+                
+                with col2:
+                    st.metric("CPU核心数", facts['processor_cores'])
+                    st.metric("CPU型号", facts['processor'])
+                    st.metric("总内存", f"{facts['memtotal_mb']:,} MB")
+                
+                with col3:
+                    st.metric("主机名", facts['hostname'])
+                    st.metric("IP地址", facts['ipv4'])
+                    st.metric("运行时间", f"{facts['uptime_seconds'] // 86400} 天")
+                
+                # 网络接口
+                st.subheader("网络接口")
+                for iface, address in list(facts['interfaces'].items())[:5]:  # 限制显示前5个
+                    st.text(f"{iface}: {address}")
+    else:
+        st.info("当前页的主机暂无缓存的系统信息，点击「收集系统信息」开始收集。")
 
 # Tab 4: 监控面板
 with tab4:
     st.header("实时监控")
+    follow_refresh = None
     
     # 选择监控类型
     monitor_type = st.selectbox(
@@ -344,32 +846,83 @@ with tab4:
     if monitor_type == "资源使用率":
         st.subheader("资源使用监控")
         
-        monitoring_commands = {
-            "CPU使用率": "top -bn1 | head -20",
-            "内存详情": "free -m",
-            "磁盘使用": "df -h",
-            "系统负载": "uptime",
-            "网络流量": "ifconfig | grep -A 1 'inet'",
-            "进程统计": "ps aux --sort=-%cpu | head -10"
-        }
+        if st.button("📊 获取监控数据"):
+            with st.spinner("正在采集资源指标..."):
+                metrics, errors = collect_metrics(
+                    TARGETS, forks=forks, store=get_metrics_store(), cache=get_result_cache(), **run_options
+                )
+                st.session_state["latest_metrics"] = metrics
+                st.session_state["latest_metric_errors"] = errors
         
-        selected_metric = st.selectbox("选择监控指标", list(monitoring_commands.keys()))
+        metrics = st.session_state.get("latest_metrics", {})
         
-        if st.button("📊 获取监控数据"):
-            command = monitoring_commands[selected_metric]
-            
-            with st.spinner(f"正在获取{selected_metric}数据..."):
-                for name in SERVERS.keys():
-                    host_pattern = name.replace(" ", "_")
-                    runner = run_ansible_adhoc(host_pattern, "shell", command)
-                    
-                    for event in runner.events:
-                        if event['event'] == 'runner_on_ok':
-                            result = event['event_data']['res']
-                            
-                            with st.expander(f"📊 {name}", expanded=True):
-                                if 'stdout' in result:
-                                    st.code(result['stdout'], language='bash')
+        render_host_errors(st.session_state.get("latest_metric_errors", {}), "metric_errors")
+        
+        if metrics:
+            # 汇总表按CPU使用率排序并分页，图表只显示CPU或磁盘使用率最高的服务器，详细信息一次只展示一台
+            ranked = sorted(metrics.values(), key=lambda m: m.cpu_percent, reverse=True)
+            if len(ranked) > HOST_RESULTS_PAGE_SIZE:
+                st.caption(
+                    f"共 {len(ranked)} 台服务器，CPU平均 {sum(m.cpu_percent for m in ranked) / len(ranked):.1f}%，"
+                    f"最高 {ranked[0].cpu_percent}%（{ranked[0].server}）"
+                )
+            df = pd.DataFrame([{
+                "服务器": m.server,
+                "CPU%": m.cpu_percent,
+                "内存%": m.mem_percent,
+                "磁盘%": m.disk_percent,
+                "负载(1m)": m.load_1,
+                "CPU核心": m.cpu_count,
+                "下行KB/s": m.net_rx_kbps,
+                "上行KB/s": m.net_tx_kbps,
+                "采集时间": datetime.fromtimestamp(m.timestamp).strftime("%H:%M:%S")
+            } for m in page_items(ranked, "metrics")])
+            st.dataframe(df, use_container_width=True, hide_index=True)
+            
+            chart_sort = st.radio("图表显示", ["CPU最高", "磁盘最高"], horizontal=True)
+            top = sorted(ranked, key=lambda m: m.cpu_percent if chart_sort == "CPU最高" else m.disk_percent, reverse=True)[:HOST_RESULTS_PAGE_SIZE]
+            st.bar_chart(pd.DataFrame(
+                [{"CPU%": m.cpu_percent, "内存%": m.mem_percent, "磁盘%": m.disk_percent} for m in top],
+                index=[m.server for m in top]
+            ))
+            
+            name = st.selectbox("查看服务器详情", [m.server for m in ranked])
+            m = metrics[name]
+            with st.container():
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("CPU使用率", f"{m.cpu_percent}%")
+                col2.metric("内存", f"{m.mem_used_mb:,}/{m.mem_total_mb:,} MB")
+                col3.metric("系统负载", f"{m.load_1} / {m.load_5} / {m.load_15}")
+                col4.metric("运行时间", f"{int(m.uptime_seconds // 86400)} 天")
+                
+                st.markdown("**磁盘使用**")
+                st.dataframe(pd.DataFrame([vars(d) for d in m.disks]), use_container_width=True, hide_index=True)
+                
+                st.markdown("**进程统计（按CPU排序）**")
+                st.dataframe(pd.DataFrame([vars(p) for p in m.processes]), use_container_width=True, hide_index=True)
+        
+        # 历史趋势（从本地时序存储读取，每次采集的数据都会写入）
+        st.subheader("📈 历史趋势")
+        
+        history_ranges = {"1小时": 3600, "6小时": 6 * 3600, "24小时": 86400, "7天": 7 * 86400, "30天": 30 * 86400}
+        history_metrics = {"CPU%": "cpu", "内存%": "mem", "磁盘%": "disk", "负载(1m)": "load1", "下行KB/s": "net_rx", "上行KB/s": "net_tx"}
+        
+        col1, col2 = st.columns(2)
+        history_range = col1.selectbox("时间范围", list(history_ranges.keys()))
+        history_metric = col2.selectbox("指标", list(history_metrics.keys()))
+        
+        query_start = time.perf_counter()
+        history, level = get_metrics_store().query(
+            history_metrics[history_metric],
+            time.time() - history_ranges[history_range]
+        )
+        query_ms = (time.perf_counter() - query_start) * 1000
+        
+        if history.empty:
+            st.info("暂无历史数据，点击「获取监控数据」开始记录。")
+        else:
+            st.line_chart(history)
+            st.caption(f"数据粒度: {level} | {history.shape[1]} 台服务器 | {len(history)} 个时间点 | 查询耗时 {query_ms:.0f} ms")
     
     elif monitor_type == "服务状态":
         st.subheader("服务状态检查")
@@ -378,28 +931,48 @@ with tab4:
         selected_service = st.selectbox("选择服务", common_services)
         
         if st.button("🔍 检查服务状态"):
-            command = f"systemctl status {selected_service} --no-pager"
+            # 运行状态、开机启动和详细状态在每台主机上一次执行
+            steps = [
+                step("active", f"systemctl is-active {selected_service}", always=True),
+                step("enabled", f"systemctl is-enabled {selected_service}", always=True),
+                step("status", f"systemctl status {selected_service} --no-pager", always=True)
+            ]
             
             with st.spinner(f"正在检查 {selected_service} 服务状态..."):
-                for name in SERVERS.keys():
-                    host_pattern = name.replace(" ", "_")
-                    runner = run_ansible_adhoc(host_pattern, "shell", command)
-                    
-                    for event in runner.events:
-                        if event['event'] == 'runner_on_ok':
-                            result = event['event_data']['res']
-                            
-                            with st.expander(f"🔧 {name}"):
-                                if 'stdout' in result:
-                                    output = result['stdout']
-                                    if "active (running)" in output:
-                                        st.success(f"✅ {selected_service} 正在运行")
-                                    else:
-                                        st.error(f"❌ {selected_service} 未运行")
-                                    st.code(output, language='bash')
+                job = submit_composite(TARGETS, steps, forks=forks, **run_options)
+                job.wait()
+            # 会话中只保存任务ID，翻页时只解析和保存当前页主机的结果
+            st.session_state.service_results = {"service": selected_service, "job_id": job.id, "servers": list(TARGETS)}
+        
+        # 结果保存在任务中，翻页、搜索时不重新检查
+        service_results = st.session_state.get("service_results")
+        if service_results:
+            service, job_id = service_results["service"], service_results["job_id"]
+            host_results = load_job_results(job_id, [host_alias(name) for name in service_results["servers"]])
+            servers = service_results["servers"]
+            if len(servers) > HOST_RESULTS_PAGE_SIZE:
+                st.caption(f"共 {len(servers)} 台主机")
+            page = page_items(servers, f"service:{job_id}", failed=lambda name: host_results[host_alias(name)]["status"] != "ok")
+            for name in page:
+                result = CompositeResult.from_host_result(name, host_results[host_alias(name)])
+                if not result.steps:
+                    st.error(f"❌ {name}: {result.error}")
+                    continue
+                
+                active = result.step("active").stdout.strip() or "unknown"
+                enabled = result.step("enabled").stdout.strip() or "unknown"
+                with st.expander(f"🔧 {name}"):
+                    if active == "active":
+                        st.success(f"✅ {service} 正在运行（开机启动: {enabled}）")
+                    else:
+                        st.error(f"❌ {service} 未运行: {active}（开机启动: {enabled}）")
+                    render_output(store_output(
+                        f"service:{job_id}:{name}", name, result.step("status").stdout, f"{service}_status",
+                        run=f"service:{job_id}"
+                    ))
     
     elif monitor_type == "日志查看":
-        st.subheader("系统日志查看")
+        st.subheader("系统日志")
         
         log_files = {
             "系统日志": "/var/log/syslog",
@@ -409,28 +982,166 @@ with tab4:
             "Apache访问日志": "/var/log/apache2/access.log",
             "Apache错误日志": "/var/log/apache2/error.log"
         }
+        log_mode = st.radio("查看方式", ["搜索日志", "跟踪日志"], horizontal=True)
         
-        selected_log = st.selectbox("选择日志文件", list(log_files.keys()))
-        lines = st.slider("显示行数", 10, 100, 20)
+        if log_mode == "搜索日志":
+            log_ranges = {"不限": None, "15分钟": 900, "1小时": 3600, "6小时": 6 * 3600, "24小时": 86400, "7天": 7 * 86400}
         
-        if st.button("📄 查看日志"):
-            log_path = log_files[selected_log]
-            command = f"tail -n {lines} {log_path}"
-            
-            with st.spinner(f"正在读取日志文件..."):
-                for name in SERVERS.keys():
-                    host_pattern = name.replace(" ", "_")
-                    runner = run_ansible_adhoc(host_pattern, "shell", command)
-                    
-                    for event in runner.events:
-                        if event['event'] == 'runner_on_ok':
-                            result = event['event_data']['res']
-                            
-                            with st.expander(f"📄 {name} - {selected_log}"):
-                                if 'stdout' in result:
-                                    st.code(result['stdout'], language='log')
-                                if 'stderr' in result and "No such file" in result['stderr']:
-                                    st.warning(f"日志文件不存在: {log_path}")
+            col1, col2 = st.columns(2)
+            selected_log = col1.selectbox("日志来源", list(log_files.keys()) + ["systemd journal", "自定义路径"])
+            log_path, log_unit = log_files.get(selected_log), None
+            if selected_log == "systemd journal":
+                log_unit = col2.text_input("服务单元（可选）", placeholder="例如 nginx.service")
+            elif selected_log == "自定义路径":
+                log_path = col2.text_input("日志文件路径", "/var/log/")
+        
+            col1, col2, col3 = st.columns([3, 1, 1])
+            log_pattern = col1.text_input("搜索内容", placeholder="留空则返回最新的日志")
+            log_regex = col2.checkbox("正则表达式")
+            log_ignore_case = col3.checkbox("忽略大小写", value=True)
+        
+            col1, col2, col3, col4 = st.columns(4)
+            log_range = col1.selectbox("时间范围", list(log_ranges.keys()), key="log_range")
+            log_severity = col2.selectbox("最低级别", ["全部"] + LOG_LEVELS)
+            host_limit = col3.number_input("每台最多返回", min_value=10, max_value=2000, value=200, step=10)
+            total_limit = col4.number_input("合计最多显示", min_value=100, max_value=10000, value=1000, step=100)
+        
+            if st.button("🔎 搜索日志"):
+                if log_regex:
+                    try:
+                        re.compile(log_pattern)
+                    except re.error as e:
+                        st.error(f"正则表达式无效: {e}")
+                        st.stop()
+            
+                since = time.time() - log_ranges[log_range] if log_ranges[log_range] else None
+                query = log_query(
+                    log_path, log_pattern, regex=log_regex, ignore_case=log_ignore_case, since=since,
+                    severity=LOG_LEVELS.index(log_severity) if log_severity != "全部" else None,
+                    source="journal" if selected_log == "systemd journal" else "file", unit=log_unit,
+                    limit=int(host_limit)
+                )
+            
+                # 过滤在各主机本地完成：第一页的主机返回后立即显示匹配数，其余主机只计入进度
+                placeholders = {}
+                for server in TARGETS[:HOST_RESULTS_PAGE_SIZE]:
+                    placeholders[host_alias(server)] = st.empty()
+                    placeholders[host_alias(server)].info(f"⏳ {host_alias(server)}: 搜索中...")
+                progress_bar = st.progress(0.0) if len(TARGETS) > HOST_RESULTS_PAGE_SIZE else None
+                returned = [0]
+            
+                def count_search_result(host, status, res):
+                    returned[0] += 1
+                    if progress_bar is not None:
+                        progress_bar.progress(returned[0] / len(TARGETS), text=f"已返回 {returned[0]}/{len(TARGETS)} 台服务器")
+            
+                def render_search_progress(host, status, res):
+                    result = HostSearchResult.from_host_result(host, {"status": status, "res": res})
+                    if result.error:
+                        st.error(f"❌ {host}: {result.error}")
+                    else:
+                        st.success(f"✅ {host}: {result.total} 条匹配")
+                    count_search_result(host, status, res)
+            
+                progress = list(placeholders.values()) + ([progress_bar] if progress_bar is not None else [])
+                job = submit_log_search(TARGETS, query, forks=forks, **run_options)
+                stream_host_results(job, placeholders, render_search_progress, collect=count_search_result)
+                for placeholder in progress:
+                    placeholder.empty()
+            
+                matches, host_results = log_search_results(job, TARGETS, int(total_limit))
+                st.session_state.log_results = {
+                    "log": selected_log if selected_log != "systemd journal" else f"journal {log_unit or ''}".strip(),
+                    "path": log_path,
+                    "hosts": list(host_results.values()),
+                    "matches": matches
+                }
+        
+            # 结果保存在会话中，排序、筛选时不重新搜索
+            log_results = st.session_state.get("log_results")
+            if log_results:
+                hosts = log_results["hosts"]
+                total = sum(r.total for r in hosts)
+            
+                col1, col2, col3 = st.columns(3)
+                col1.metric("匹配总数", f"{total:,}")
+                col2.metric("显示条数", f"{len(log_results['matches']):,}")
+                col3.metric("扫描数据", f"{sum(r.scanned_bytes for r in hosts) / 1024 / 1024:.1f} MB")
+            
+                render_host_errors({
+                    result.server: f"日志文件不存在: {log_results['path']}" if "No such file" in result.error else result.error
+                    for result in hosts if result.error
+                }, "log_search_errors")
+            
+                if log_results["matches"]:
+                    if total > len(log_results["matches"]):
+                        st.caption(f"各主机只返回最新的匹配，按时间合并后显示最新的 {len(log_results['matches'])} 条")
+                    df = pd.DataFrame([{
+                        "时间": datetime.fromtimestamp(m.ts).strftime("%Y-%m-%d %H:%M:%S") if m.ts else "",
+                        "服务器": m.server,
+                        "级别": m.level_name,
+                        "内容": m.line
+                    } for m in log_results["matches"]])
+                    st.dataframe(df, use_container_width=True, hide_index=True)
+                    st.download_button(
+                        "⬇️ 下载结果（CSV）",
+                        df.to_csv(index=False).encode("utf-8-sig"),
+                        file_name=f"{host_alias(log_results['log'])}_search.csv",
+                        mime="text/csv"
+                    )
+                elif not any(r.error for r in hosts):
+                    st.info(f"{log_results['log']} 中没有匹配的日志")
+    
+        else:
+            col1, col2 = st.columns(2)
+            selected_log = col1.selectbox("日志文件", list(log_files.keys()) + ["自定义路径"])
+            log_path = log_files.get(selected_log)
+            if selected_log == "自定义路径":
+                log_path = col2.text_input("日志文件路径", "/var/log/", key="follow_path")
+            
+            col1, col2 = st.columns(2)
+            initial_lines = col1.slider("首次显示行数", 10, 500, 50)
+            follow_interval = col2.selectbox("自动获取", ["关闭", "5秒", "10秒", "30秒"])
+            
+            follower = st.session_state.get("log_follower")
+            col1, col2, col3 = st.columns(3)
+            if col1.button("▶️ 开始跟踪"):
+                follower = st.session_state.log_follower = LogFollower(log_path, TARGETS, initial_lines=initial_lines)
+                st.session_state.log_follow_label = selected_log
+            fetch = col2.button("🔄 获取新内容", disabled=follower is None)
+            if col3.button("⏹️ 停止跟踪", disabled=follower is None):
+                st.session_state.pop("log_follower", None)
+                follower = None
+            
+            # 首次读取末尾的行，之后每次只传输上次读取位置之后新增的内容
+            if follower is not None and (fetch or follower.polls == 0 or follow_interval != "关闭"):
+                with st.spinner("正在读取新增日志..."):
+                    chunks = follower.poll(forks=forks, **run_options)
+                for name, chunk in chunks.items():
+                    if chunk.rotated:
+                        st.info(f"🔁 {name}: 日志已轮转，已读完旧文件的剩余内容")
+                    elif chunk.truncated:
+                        st.info(f"✂️ {name}: 日志被截断，从头读取")
+                    if chunk.skipped:
+                        st.warning(f"{name}: 新增内容过多，跳过了较早的 {chunk.skipped / 1024:.0f} KB")
+            
+            if follower is not None:
+                st.caption(
+                    f"正在跟踪 {st.session_state.log_follow_label}（{follower.path}）| 已读取 {follower.polls} 次，"
+                    f"共传输 {follower.bytes_transferred / 1024:.1f} KB | "
+                    f"上次读取 {datetime.fromtimestamp(follower.last_poll).strftime('%H:%M:%S')}"
+                )
+                # 按页展示，每次刷新只发送当前页主机的内容
+                for name in page_items(follower.server_names, "log_follow", failed=lambda name: name in follower.errors):
+                    if name in follower.errors:
+                        st.error(f"❌ {name}: {follower.errors[name]}")
+                        continue
+                    lines = follower.lines(name)
+                    with st.expander(f"📄 {name}（{len(lines)} 行）", expanded=True):
+                        st.code(clip_lines(lines[-OUTPUT_PAGE_LINES:]) or "（暂无内容）", language='log')
+                
+                if follow_interval != "关闭":
+                    follow_refresh = int(follow_interval.rstrip("秒"))
 
 # Tab 5: 高级操作
 with tab5:
@@ -447,35 +1158,54 @@ with tab5:
         action = st.radio("选择操作", ["安装", "更新", "删除", "搜索"])
         package_name = st.text_input("软件包名称")
         
-        if st.button("执行操作") and package_name:
-            if action == "安装":
-                command = f"apt-get install -y {package_name}"
-            elif action == "更新":
-                command = f"apt-get update && apt-get upgrade -y {package_name}"
-            elif action == "删除":
-                command = f"apt-get remove -y {package_name}"
-            else:
-                command = f"apt-cache search {package_name}"
-            
-            st.warning(f"即将执行: {command}")
-            
-            if st.button("确认执行", key="confirm_package"):
-                with st.spinner(f"正在{action}软件包 {package_name}..."):
-                    for name in SERVERS.keys():
-                        host_pattern = name.replace(" ", "_")
-                        runner = run_ansible_adhoc(host_pattern, "shell", command)
-                        
-                        for event in runner.events:
-                            if event['event'] == 'runner_on_ok':
-                                st.success(f"✅ {name}: 操作完成")
-                            elif event['event'] == 'runner_on_failed':
-                                st.error(f"❌ {name}: 操作失败")
+        if action == "搜索":
+            if st.button("执行操作") and package_name:
+                with st.spinner(f"正在搜索软件包 {package_name}..."):
+                    job = submit_ansible_adhoc(
+                        ",".join(host_alias(name) for name in TARGETS), "shell", f"apt-cache search {package_name}",
+                        forks=forks, **run_options
+                    )
+                    job.wait()
+                # 会话中只保存任务ID，翻页时从任务读取当前页的结果
+                st.session_state.package_search = {"job_id": job.id, "hosts": [host_alias(name) for name in TARGETS]}
+            
+            package_search = st.session_state.get("package_search")
+            if package_search:
+                render_host_results(
+                    load_job_results(package_search["job_id"], package_search["hosts"]),
+                    f"package:{package_search['job_id']}", expanded=True, label="apt_search"
+                )
+        else:
+            settings = rollout_settings("package")
+            health_service = st.text_input("健康检查服务（可选）", placeholder="每批执行后检查该服务是否运行，例如: nginx")
+            
+            if st.button("执行操作") and package_name:
+                if action == "安装":
+                    command = f"apt-get install -y {package_name}"
+                elif action == "更新":
+                    command = f"apt-get update && apt-get upgrade -y {package_name}"
+                else:
+                    command = f"apt-get remove -y {package_name}"
+                st.session_state.pending_package_command = command
+            
+            command = st.session_state.get("pending_package_command")
+            if command:
+                st.warning(f"即将执行: {command}")
+                
+                if st.button("确认执行", key="confirm_package"):
+                    del st.session_state.pending_package_command
+                    health_check = f"systemctl is-active {health_service}" if health_service else None
+                    # 同一次执行中查询执行后的安装状态
+                    report = f"dpkg-query -W -f='${{Status}} ${{Version}}' {package_name} 2>/dev/null || echo 未安装"
+                    with st.spinner(f"正在{action}软件包 {package_name}..."):
+                        run_rollout_with_progress(command, health_check=health_check, report=report, **settings)
     
     elif operation == "服务管理":
         st.subheader("🔧 服务管理")
         
         service_name = st.text_input("服务名称", placeholder="例如: nginx, mysql, docker")
         action = st.radio("选择操作", ["启动", "停止", "重启", "重载"])
+        settings = rollout_settings("service")
         
         if st.button("执行操作") and service_name:
             action_map = {
@@ -486,23 +1216,210 @@ with tab5:
             }
             
             command = f"systemctl {action_map[action]} {service_name}"
+            # 操作和状态检查在每台主机上一次执行；停止后服务本应不再运行，只展示状态不做健康检查
+            if action == "停止":
+                health_check, report = None, f"systemctl is-active {service_name}"
+            else:
+                health_check, report = f"systemctl is-active {service_name}", None
             
             with st.spinner(f"正在{action}服务 {service_name}..."):
-                for name in SERVERS.keys():
-                    host_pattern = name.replace(" ", "_")
-                    runner = run_ansible_adhoc(host_pattern, "shell", command)
-                    
-                    for event in runner.events:
-                        if event['event'] == 'runner_on_ok':
-                            st.success(f"✅ {name}: 服务{action}成功")
-                            # 检查服务状态
-                            status_runner = run_ansible_adhoc(host_pattern, "shell", f"systemctl is-active {service_name}")
-                            for status_event in status_runner.events:
-                                if status_event['event'] == 'runner_on_ok':
-                                    status = status_event['event_data']['res']['stdout'].strip()
-                                    st.info(f"服务状态: {status}")
+                run_rollout_with_progress(command, health_check=health_check, report=report, **settings)
+
+# Tab 6: 后台任务
+with tab6:
+    st.header("后台任务")
+    
+    job_manager = get_job_manager()
+    jobs = job_manager.list(st.session_state.get("job_ids", []))
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        workspace_stats = get_workspace_pool().stats()
+        st.caption(
+            f"任务工作目录 {workspace_stats['root']}：执行中 {workspace_stats['busy']} 个，空闲 {workspace_stats['idle']} 个，"
+            f"已创建 {workspace_stats['created']} 个，复用 {workspace_stats['reused']} 次"
+        )
+    with col2:
+        st.button("🔄 刷新状态")
+    
+    if not jobs:
+        st.info("当前会话没有后台任务。在「执行命令」中勾选「后台执行」即可提交。")
+    
+    status_labels = {
+        "pending": "⏳ 等待中",
+        "starting": "⏳ 启动中",
+        "running": "🔄 运行中",
+        "canceling": "⏹️ 取消中",
+        "successful": "✅ 成功",
+        "failed": "❌ 失败",
+        "canceled": "⏹️ 已取消",
+        "timeout": "⌛ 超时"
+    }
+    
+    for job in reversed(jobs):
+        status = job.status
+        label = f"{status_labels.get(status, status)} | {job.id} | {job.description}"
+        
+        with st.expander(label, expanded=not job.done()):
+            st.caption(f"提交时间: {job.created.strftime('%Y-%m-%d %H:%M:%S')}")
+            shards = getattr(job, "shards", None)
+            if shards:
+                finished_shards = sum(shard.done() for shard in shards)
+                st.caption(f"按主机拆分为 {len(shards)} 个分片并行执行，已完成 {finished_shards} 个（执行历史中记录为一个任务）")
+            
+            if not job.done():
+                if st.button("⏹️ 取消任务", key=f"cancel_{job.id}"):
+                    job_manager.cancel(job.id)
+                    st.rerun()
+            
+            # 任务运行中也可以展示已返回的主机结果
+            host_results = collect_host_results(list(job.events))
+            if not host_results and not job.done():
+                st.text("等待主机返回结果...")
+            
+            with get_perf_recorder().timer("render"):
+                render_host_results(host_results, f"job:{job.id}", nested=True, label=job.id)
+
+# Tab 7: 执行历史（查询索引，不扫描artifacts目录）
+with tab7:
+    st.header("执行历史")
+    
+    job_history = get_job_history()
+    job_history_stats = job_history.stats()
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        oldest = datetime.fromtimestamp(job_history_stats["oldest"]).strftime("%Y-%m-%d %H:%M") if job_history_stats["oldest"] else "-"
+        st.caption(
+            f"已归档 {job_history_stats['jobs']} 个任务，占用 {job_history_stats['archive_bytes'] / 1024 / 1024:.1f} MB，"
+            f"最早 {oldest}；待整理的artifacts目录 {job_history_stats['artifact_dirs']} 个"
+        )
+    with col2:
+        if st.button("🧹 立即整理"):
+            result = job_history.maintain()
+            st.success(f"已整理 {result['compacted']} 个目录，清理 {result['removed']} 条过期记录")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        job_time_ranges = {"最近1小时": 3600, "最近24小时": 86400, "最近7天": 7 * 86400, "全部": None}
+        job_time_range = st.selectbox("结束时间", list(job_time_ranges), index=1)
+    with col2:
+        job_host = st.selectbox("主机", ["全部"] + job_history.distinct("host"))
+    with col3:
+        job_target = st.selectbox("模块/Playbook", ["全部"] + job_history.distinct("target"))
+    with col4:
+        job_status = st.selectbox("状态", ["全部", "successful", "failed", "canceled", "timeout"])
+    
+    job_page_size = 50
+    since = time.time() - job_time_ranges[job_time_range] if job_time_ranges[job_time_range] else None
+    job_filters = {
+        "since": since,
+        "host": None if job_host == "全部" else job_host,
+        "target": None if job_target == "全部" else job_target,
+        "status": None if job_status == "全部" else job_status
+    }
+    _, job_total = job_history.query(limit=0, **job_filters)
+    job_page_count = max((job_total + job_page_size - 1) // job_page_size, 1)
+    job_page = st.number_input("页码", min_value=1, max_value=job_page_count, value=1, step=1)
+    job_records, _ = job_history.query(limit=job_page_size, offset=(job_page - 1) * job_page_size, **job_filters)
+    
+    if not job_records:
+        st.info("没有符合条件的执行记录。")
+    else:
+        st.caption(f"共 {job_total} 条，第 {job_page}/{job_page_count} 页")
+        st.dataframe(pd.DataFrame([{
+            "任务ID": r["id"],
+            "描述": r["description"],
+            "状态": r["status"],
+            "主机数": r["hosts"],
+            "成功": r["ok"],
+            "失败": r["failed"],
+            "不可达": r["unreachable"],
+            "结束时间": datetime.fromtimestamp(r["finished"]).strftime("%Y-%m-%d %H:%M:%S"),
+            "耗时(s)": round(r["finished"] - r["started"], 1) if r["started"] else None
+        } for r in job_records]), use_container_width=True, hide_index=True)
+        
+        selected_job_id = st.selectbox("查看任务详情", [r["id"] for r in job_records])
+        with get_perf_recorder().timer("render"):
+            render_host_results(
+                collect_host_results(job_history.load_events(selected_job_id)),
+                f"history:{selected_job_id}", nested=True, label=selected_job_id
+            )
+
+# Tab 8: 性能（任务各阶段、每台主机和页面渲染的耗时，统计最近的任务）
+with tab8:
+    st.header("性能统计")
+    
+    perf = get_perf_recorder()
+    phase_labels = {
+        "inventory": "生成inventory", "startup": "启动（首个事件）", "execution": "执行（SSH连接与远程执行）",
+        "finish": "收尾（汇总与归档）", "total": "任务总耗时", "host": "单台主机", "render": "结果渲染", "page": "页面运行"
+    }
+    st.caption(
+        f"统计最近 {perf.window} 个样本；单台主机的耗时取自 ansible-runner 事件（该主机上任务开始到返回结果），"
+        "其他阶段为本地计时"
+    )
+    
+    perf_summary = perf.summary()
+    if not perf_summary:
+        st.info("还没有已结束的任务。执行任意命令后在此查看各阶段耗时。")
+    else:
+        st.dataframe(pd.DataFrame([{
+            "阶段": phase_labels.get(row["phase"], row["phase"]),
+            "次数": row["count"],
+            "p50 (ms)": round(row["p50"] * 1000, 1),
+            "p95 (ms)": round(row["p95"] * 1000, 1),
+            "最大 (ms)": round(row["max"] * 1000, 1)
+        } for row in perf_summary]), use_container_width=True, hide_index=True)
+    
+    recent_timings = perf.recent_jobs()
+    if recent_timings:
+        st.subheader("最近的任务")
+        phase_columns = {"inventory": "inventory", "startup": "启动", "execution": "执行", "finish": "收尾", "total": "总计"}
+        rows = []
+        for timing in recent_timings:
+            slowest_host, slowest_seconds = timing.slowest_host
+            host_p50, host_p95 = timing.host_percentile(0.5), timing.host_percentile(0.95)
+            rows.append({
+                "任务ID": timing.job_id,
+                "描述": timing.description,
+                "状态": timing.status,
+                "结束时间": datetime.fromtimestamp(timing.finished).strftime("%H:%M:%S"),
+                "主机数": len(timing.host_durations),
+                **{f"{phase_columns[phase]} (ms)": round(timing.phases[phase] * 1000) if phase in timing.phases else None
+                   for phase in JOB_PHASES},
+                "主机 p50 (ms)": round(host_p50 * 1000) if host_p50 is not None else None,
+                "主机 p95 (ms)": round(host_p95 * 1000) if host_p95 is not None else None,
+                "最慢主机": f"{slowest_host} ({slowest_seconds:.1f}s)" if slowest_host else "-"
+            })
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    
+    with st.expander("Prometheus 格式"):
+        prometheus_text = perf.prometheus()
+        exported = []
+        if PERF_METRICS_FILE:
+            exported.append(f"每个任务结束后写入 {PERF_METRICS_FILE}")
+        if PERF_METRICS_PORT:
+            exported.append(f"http://{PERF_METRICS_BIND}:{PERF_METRICS_PORT}/metrics")
+        st.caption("；".join(exported) if exported else "设置 PERF_METRICS_FILE 或 PERF_METRICS_PORT 后可由 Prometheus 采集")
+        st.code(prometheus_text, language="text")
+        st.download_button("⬇️ 下载", prometheus_text, file_name="ansible_manager.prom", mime="text/plain")
 
 # 页脚
 st.markdown("---")
 st.markdown("💡 **提示**: 这是一个基于Ansible的服务器管理工具。请谨慎执行操作，特别是在生产环境中。")
-st.markdown("🔒 **安全**: 所有密码信息都从环境变量读取，不会在代码中硬编码。")
\ No newline at end of file
+st.markdown("🔒 **安全**: 所有密码信息都从环境变量读取，不会在代码中硬编码。")
+
+cache_stats = get_result_cache().stats()
+cache_summary.caption(
+    f"🗃️ 结果缓存: 命中 {cache_stats['hits']} · 合并 {cache_stats['coalesced']} · 未命中 {cache_stats['misses']}"
+    f"（命中率 {cache_stats['hit_rate']:.0%}），缓存 {cache_stats['entries']} 条，执行中 {cache_stats['in_flight']} 条"
+)
+
+get_perf_recorder().observe("page", time.perf_counter() - page_started)
+
+# 自动刷新：只重新读取后台轮询的共享快照，不会额外触发服务器检查；
+# 跟踪日志时按选择的间隔刷新（不超过30秒），每次只读取新增的内容
+if auto_refresh or follow_refresh:
+    time.sleep(follow_refresh or 30)
+    st.rerun()
\ No newline at end of file
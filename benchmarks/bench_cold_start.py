@@ -0,0 +1,57 @@
+"""
+命令行冷启动耗时
+
+对比 server_manager 命令行（按需导入依赖）与一次性导入Web界面全部依赖的启动耗时，
+每项在新的Python进程中运行多次取中位数。
+
+    python benchmarks/bench_cold_start.py --repeat 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    "cli --help": [sys.executable, "-m", "server_manager", "--help"],
+    "import server_manager": [sys.executable, "-c", "import server_manager"],
+    "import server_manager.runner": [sys.executable, "-c", "import server_manager.runner"],
+    "import ansible_runner": [sys.executable, "-c", "import ansible_runner"],
+    "import web deps": [sys.executable, "-c", "import streamlit, pandas, ansible_runner, yaml"],
+}
+
+
+def measure(command, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="命令行冷启动耗时")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'case':<30} {'median(ms)':>10}")
+
+    for name, command in CASES.items():
+        seconds = measure(command, args.repeat)
+        print(f"{name:<30} {seconds * 1000:>10.0f}")
+        results.append({"case": name, "repeat": args.repeat, "median_s": seconds})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
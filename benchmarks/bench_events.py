@@ -0,0 +1,160 @@
+"""
+事件读取的峰值内存和耗时
+
+为N台主机生成一个收集事实的ansible-runner artifacts目录（每台主机 runner_on_start、带完整 ansible_facts 的
+runner_on_ok 等事件），对比两种读取方式：
+  full       解码全部事件文件并保留完整的事件（与 runner.events 相同）
+  projected  先按事件类型过滤再解码，只保留事实摘要（HostEvent）
+以及任务运行期间（event_handler 逐个收到完整事件）到达时投影的方式。峰值内存由 tracemalloc 统计。
+
+    python benchmarks/bench_events.py --hosts 100 500 1000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from server_manager.events import iter_artifact_events  # noqa: E402
+from server_manager.facts import FACT_EVENT_FILTER  # noqa: E402
+from server_manager.runner import collect_host_results  # noqa: E402
+
+
+# 与真实主机大小相近的 ansible_facts（约 60KB：网卡、挂载点、环境变量、设备信息）
+def make_facts(index):
+    rng = random.Random(index)
+    facts = {
+        "ansible_hostname": f"host{index:05d}",
+        "ansible_distribution": "Ubuntu",
+        "ansible_distribution_version": "22.04",
+        "ansible_kernel": "5.15.0-91-generic",
+        "ansible_architecture": "x86_64",
+        "ansible_processor_cores": 8,
+        "ansible_processor": ["0", "GenuineIntel", "Intel(R) Xeon(R) CPU E5-2680 v4 @ 2.40GHz"] * 8,
+        "ansible_memtotal_mb": 32000,
+        "ansible_uptime_seconds": rng.randint(1, 10 ** 7),
+        "ansible_default_ipv4": {"address": f"10.0.{index // 256 % 256}.{index % 256}", "interface": "eth0"},
+        "ansible_interfaces": [f"eth{i}" for i in range(4)] + ["lo"],
+        "ansible_env": {f"VAR_{i}": "x" * rng.randint(10, 80) for i in range(60)},
+        "ansible_mounts": [{
+            "mount": f"/data{i}", "device": f"/dev/sd{chr(97 + i)}1", "fstype": "ext4",
+            "options": "rw,relatime", "size_total": rng.randint(10 ** 9, 10 ** 12), "uuid": str(uuid.uuid4())
+        } for i in range(20)],
+        "ansible_devices": {f"sd{chr(97 + i)}": {
+            "model": "Virtual disk", "sectors": str(rng.randint(10 ** 6, 10 ** 9)),
+            "partitions": {f"sd{chr(97 + i)}{p}": {"sectors": str(rng.randint(1, 10 ** 8)), "uuid": str(uuid.uuid4())}
+                           for p in range(1, 5)}
+        } for i in range(12)}
+    }
+    for i in range(4):
+        facts[f"ansible_eth{i}"] = {
+            "device": f"eth{i}", "macaddress": "52:54:00:12:34:56", "mtu": 1500,
+            "ipv4": {"address": f"10.{i}.{index // 256 % 256}.{index % 256}", "netmask": "255.255.0.0"},
+            "ipv6": [{"address": f"fe80::{i}:{index}", "prefix": "64", "scope": "link"}],
+            "features": {f"feature_{f}": "off [fixed]" for f in range(60)}
+        }
+    return facts
+
+
+# 写入artifacts目录，文件名与ansible-runner相同（<序号>-<uuid>.json）
+def make_artifacts(path, count):
+    events_dir = os.path.join(path, "job_events")
+    os.makedirs(events_dir)
+    counter = 0
+
+    def write(event, **data):
+        nonlocal counter
+        counter += 1
+        with open(os.path.join(events_dir, f"{counter}-{uuid.uuid4()}.json"), "w") as f:
+            json.dump({"uuid": str(uuid.uuid4()), "counter": counter, "event": event, "stdout": "",
+                       "event_data": dict(data, playbook="system_info.yml", task="获取系统信息")}, f)
+
+    write("playbook_on_start")
+    write("playbook_on_task_start")
+    for i in range(count):
+        write("runner_on_start", host=f"host{i:05d}")
+    for i in range(count):
+        write("runner_on_ok", host=f"host{i:05d}", res={
+            "ansible_facts": make_facts(i), "changed": False,
+            "invocation": {"module_args": {"gather_subset": ["all"], "filter": [], "gather_timeout": 10}}
+        })
+    write("playbook_on_stats")
+
+
+def iter_full(path):
+    events_dir = os.path.join(path, "job_events")
+    for name in sorted(os.listdir(events_dir), key=lambda name: int(name.split("-", 1)[0])):
+        with open(os.path.join(events_dir, name)) as f:
+            yield json.load(f)
+
+
+def read_full(path):
+    return list(iter_full(path))
+
+
+def read_projected(path):
+    return list(iter_artifact_events(path, FACT_EVENT_FILTER))
+
+
+# 任务运行期间逐个收到完整事件（event_handler），到达时投影后保留
+def stream_projected(path):
+    events = []
+    for event in iter_full(path):
+        record = FACT_EVENT_FILTER.project(event)
+        if record is not None:
+            events.append(record)
+    return events
+
+
+def measure(func, path, count):
+    tracemalloc.start()
+    start = time.perf_counter()
+    events = func(path)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if func is read_full:
+        hosts = len({e["event_data"]["host"] for e in events if e["event"] == "runner_on_ok"})
+    else:
+        hosts = len(collect_host_results(events))
+    assert hosts == count, (func.__name__, hosts)
+    return {"seconds": elapsed, "peak_mb": peak / 1024 / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="事件读取的峰值内存和耗时")
+    parser.add_argument("--hosts", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    cases = {
+        "full": read_full,
+        "projected (files)": read_projected,
+        "projected (stream)": stream_projected
+    }
+    results = []
+    print(f"{'hosts':>6} {'case':<20} {'peak(MB)':>9} {'seconds':>8}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for count in args.hosts:
+            path = os.path.join(workdir, f"artifacts_{count}")
+            make_artifacts(path, count)
+            for name, func in cases.items():
+                result = measure(func, path, count)
+                print(f"{count:>6} {name:<20} {result['peak_mb']:>9.1f} {result['seconds']:>8.2f}")
+                results.append({"hosts": count, "case": name, **result})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+逐台执行 vs 批量执行 的耗时对比
+
+用本地替身主机模拟服务器集群：默认使用 local 连接插件，
+也可以通过 --ssh-host 指向一台本地 sshd（所有主机别名都连接到它）。
+
+    python benchmarks/bench_fanout.py --hosts 1 5 10 25 --forks 20
+    python benchmarks/bench_fanout.py --ssh-host 127.0.0.1 --ssh-user bench --ssh-key ~/.ssh/id_rsa
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import ansible_runner
+import yaml
+
+
+# 生成N台替身主机的inventory
+def build_inventory(count, args):
+    hosts = {}
+
+    for i in range(count):
+        if args.ssh_host:
+            hosts[f"bench_{i:04d}"] = {
+                "ansible_connection": "ssh",
+                "ansible_host": args.ssh_host,
+                "ansible_port": args.ssh_port,
+                "ansible_user": args.ssh_user,
+                "ansible_ssh_private_key_file": args.ssh_key,
+                "ansible_ssh_common_args": "-o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null"
+            }
+        else:
+            hosts[f"bench_{i:04d}"] = {"ansible_connection": "local"}
+
+    return {"all": {"hosts": hosts, "vars": {"ansible_python_interpreter": sys.executable}}}
+
+
+def run(workdir, inventory_path, host_pattern, forks):
+    return ansible_runner.run(
+        private_data_dir=workdir,
+        inventory=inventory_path,
+        host_pattern=host_pattern,
+        module="ping",
+        forks=forks,
+        quiet=True
+    )
+
+
+# 逐台执行：每台主机一次ansible-runner调用（原实现）
+def bench_serial(workdir, inventory_path, hosts, forks):
+    start = time.perf_counter()
+    ok = 0
+    for host in hosts:
+        runner = run(workdir, inventory_path, host, forks)
+        ok += runner.status == "successful"
+    return time.perf_counter() - start, ok
+
+
+# 批量执行：一次ansible-runner调用覆盖所有主机
+def bench_batch(workdir, inventory_path, hosts, forks):
+    start = time.perf_counter()
+    runner = run(workdir, inventory_path, ",".join(hosts), forks)
+    ok = sum(1 for event in runner.events if event["event"] == "runner_on_ok")
+    return time.perf_counter() - start, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逐台执行与批量执行的耗时对比")
+    parser.add_argument("--hosts", type=int, nargs="+", default=[1, 5, 10, 25])
+    parser.add_argument("--forks", type=int, default=20)
+    parser.add_argument("--skip-serial-above", type=int, default=50,
+                        help="主机数超过该值时跳过逐台执行")
+    parser.add_argument("--ssh-host", help="本地sshd地址，不指定则使用local连接")
+    parser.add_argument("--ssh-port", type=int, default=22)
+    parser.add_argument("--ssh-user", default=os.getenv("USER", "root"))
+    parser.add_argument("--ssh-key", default=os.path.expanduser("~/.ssh/id_rsa"))
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'hosts':>6} {'serial(s)':>10} {'batch(s)':>10} {'speedup':>8}")
+
+    for count in args.hosts:
+        with tempfile.TemporaryDirectory(prefix="bench_fanout_") as workdir:
+            inventory_path = os.path.join(workdir, "hosts.yml")
+            with open(inventory_path, "w") as f:
+                yaml.dump(build_inventory(count, args), f)
+            hosts = [f"bench_{i:04d}" for i in range(count)]
+
+            serial = None
+            if count <= args.skip_serial_above:
+                serial, _ = bench_serial(workdir, inventory_path, hosts, args.forks)
+            batch, ok = bench_batch(workdir, inventory_path, hosts, args.forks)
+
+        speedup = f"{serial / batch:.1f}x" if serial else "-"
+        serial_text = f"{serial:.2f}" if serial else "-"
+        print(f"{count:>6} {serial_text:>10} {batch:>10.2f} {speedup:>8}")
+        results.append({"hosts": count, "forks": args.forks, "serial_s": serial, "batch_s": batch, "ok": ok})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
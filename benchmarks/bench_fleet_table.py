@@ -0,0 +1,94 @@
+"""
+服务器表格重绘耗时
+
+为每个规模生成一个SQLite服务器清单（带分组和标签），在新进程中用 Streamlit AppTest 运行 app_secure.py，
+测量首次渲染和后续重绘（不触发任何Ansible执行）的耗时中位数。后台轮询在测试中关闭。
+
+    python benchmarks/bench_fleet_table.py --hosts 50 500 5000 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_fleet(path, count):
+    sys.path.insert(0, ROOT)
+    from server_manager.fleet import write_fleet_db
+
+    write_fleet_db(path, {
+        f"host{i:05d}": {
+            "host": f"10.{i // 65536}.{i // 256 % 256}.{i % 256}",
+            "password": "x",
+            "groups": ["web" if i % 3 else "db", "prod" if i % 2 else "staging"],
+            "tags": [f"rack{i % 40}"]
+        }
+        for i in range(count)
+    })
+
+
+# 子进程：加载应用并多次重绘，输出JSON
+def worker(repeat):
+    sys.path.insert(0, ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, "app_secure.py"), default_timeout=300)
+    start = time.perf_counter()
+    app.run()
+    first = time.perf_counter() - start
+    if app.exception:
+        raise SystemExit(str(app.exception))
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - start)
+    print(json.dumps({"first_s": first, "rerun_median_s": statistics.median(timings)}))
+
+
+def measure(count, repeat, workdir):
+    db_path = os.path.join(workdir, f"fleet_{count}.db")
+    make_fleet(db_path, count)
+    env = dict(os.environ, INVENTORY_SOURCE=f"sqlite:///{db_path}", FLEET_POLL_INTERVAL="0", METRICS_POLL_INTERVAL="0")
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", "--repeat", str(repeat)],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务器表格重绘耗时")
+    parser.add_argument("--hosts", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.repeat)
+        return
+
+    results = []
+    print(f"{'hosts':>6} {'first(ms)':>10} {'rerun(ms)':>10}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for count in args.hosts:
+            result = measure(count, args.repeat, workdir)
+            print(f"{count:>6} {result['first_s'] * 1000:>10.0f} {result['rerun_median_s'] * 1000:>10.0f}")
+            results.append({"hosts": count, "repeat": args.repeat, **result})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+集群概览的计算耗时
+
+生成一个合成集群（每台主机属于若干分组，带状态快照和最新指标），测量概览表构造、分组分位数、
+Top-N、分组内异常检测和热力图数据的耗时中位数。不需要Streamlit和Ansible。
+
+    python benchmarks/bench_overview.py --hosts 1000 10000 50000 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from server_manager.fleet import Fleet  # noqa: E402
+from server_manager.overview import (  # noqa: E402
+    build_overview, group_summary, heatmap_frame, outliers, status_counts, top_n
+)
+
+
+def make_fleet(count, groups, seed=0):
+    rng = np.random.default_rng(seed)
+    fleet = Fleet({
+        f"host{i:06d}": {
+            "host": f"10.{i // 65536}.{i // 256 % 256}.{i % 256}",
+            "groups": [f"group{i % groups}", "prod" if i % 2 else "staging"]
+        }
+        for i in range(count)
+    })
+    names = list(fleet)
+    now = time.time()
+    statuses = rng.choice(["online", "offline"], size=count, p=[0.95, 0.05])
+    snapshot = {name: (status, 0, now, now + 60) for name, status in zip(names, statuses)}
+    latest = pd.DataFrame({
+        "ts": now - rng.uniform(0, 300, count),
+        "cpu": rng.gamma(2, 10, count),
+        "mem": rng.uniform(10, 95, count),
+        "disk": rng.uniform(20, 90, count),
+        "load1": rng.gamma(1.5, 1, count)
+    }, index=pd.Index(names, name="host"))
+    return fleet, names, snapshot, latest, now
+
+
+def measure(count, groups, repeat):
+    fleet, names, snapshot, latest, now = make_fleet(count, groups)
+    stages = {}
+
+    def timed(stage, func):
+        start = time.perf_counter()
+        value = func()
+        stages.setdefault(stage, []).append(time.perf_counter() - start)
+        return value
+
+    for _ in range(repeat):
+        fleet.revision += 1      # 不使用分组长表的缓存
+        memberships = timed("memberships", fleet.memberships)
+        overview = timed("build", lambda: build_overview(names, snapshot, latest, now))
+        timed("status_counts", lambda: status_counts(overview))
+        timed("group_summary", lambda: group_summary(overview, memberships, "cpu"))
+        timed("top_n", lambda: top_n(overview, "cpu"))
+        timed("outliers", lambda: outliers(overview, memberships, "cpu"))
+        timed("heatmap", lambda: heatmap_frame(overview, memberships, "p90"))
+
+    result = {stage: statistics.median(values) * 1000 for stage, values in stages.items()}
+    result["total"] = sum(result.values())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="集群概览的计算耗时")
+    parser.add_argument("--hosts", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--groups", type=int, default=50, help="分组数量（另有 prod/staging 两个分组）")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    results = []
+    header = None
+    for count in args.hosts:
+        result = measure(count, args.groups, args.repeat)
+        if header is None:
+            header = list(result)
+            print(f"{'hosts':>7} " + " ".join(f"{stage:>13}" for stage in header) + "   (ms)")
+        print(f"{count:>7} " + " ".join(f"{result[stage]:>13.1f}" for stage in header))
+        results.append({"hosts": count, "groups": args.groups, "repeat": args.repeat, "ms": result})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
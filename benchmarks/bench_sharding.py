@@ -0,0 +1,91 @@
+"""
+分片并行执行的吞吐量
+
+用本地替身主机（local 连接插件）模拟服务器集群，通过 JobManager 以不同的分片数执行同一个 ad-hoc 命令，
+测量总耗时和每秒完成的主机数。总 forks 固定，在分片之间分配；多核机器上吞吐量随分片数增加。
+
+    python benchmarks/bench_sharding.py --hosts 200 1000 --shards 1 2 4 8 --forks 64
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from server_manager.jobs import JobManager  # noqa: E402
+from server_manager.runner import run_ansible_batch  # noqa: E402
+from server_manager.workspace import WorkspacePool  # noqa: E402
+
+
+# 固定的inventory文件，代替按服务器配置生成的inventory
+class StaticInventory:
+    def __init__(self, path):
+        self.path = path
+
+    def sync(self, servers):
+        return self.path
+
+
+class NoConnections:
+    def runner_envvars(self):
+        return {}
+
+
+def write_inventory(path, count):
+    with open(path, "w") as f:
+        yaml.dump({"all": {
+            "hosts": {f"bench_{i:05d}": None for i in range(count)},
+            "vars": {"ansible_connection": "local", "ansible_python_interpreter": sys.executable}
+        }}, f)
+    return [f"bench_{i:05d}" for i in range(count)]
+
+
+def measure(names, shards, forks, module, args, inventory, pool):
+    manager = JobManager(inventory, NoConnections(), workspaces=pool, shards=shards, shard_min_hosts=1)
+    start = time.perf_counter()
+    results = run_ansible_batch(names, module, args, forks=forks, servers={}, job_manager=manager)
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for result in results.values() if result["status"] == "ok")
+    return {"seconds": elapsed, "ok": ok, "hosts_per_s": len(names) / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分片并行执行的吞吐量")
+    parser.add_argument("--hosts", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--forks", type=int, default=64, help="所有分片合计的并发数")
+    parser.add_argument("--module", default="ping")
+    parser.add_argument("--args", default="")
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    shard_counts = sorted(set(args.shards))
+    results = []
+    print(f"CPU核心数: {os.cpu_count()}")
+    print(f"{'hosts':>6} {'shards':>6} {'seconds':>8} {'hosts/s':>8} {'ok':>6}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        pool = WorkspacePool(root=os.path.join(workdir, "workspaces"), project_dir=workdir,
+                             artifacts_dir=os.path.join(workdir, "artifacts"))
+        for count in args.hosts:
+            inventory_path = os.path.join(workdir, f"hosts_{count}.yml")
+            names = write_inventory(inventory_path, count)
+            for shards in shard_counts:
+                result = measure(names, shards, args.forks, args.module, args.args, StaticInventory(inventory_path), pool)
+                print(f"{count:>6} {shards:>6} {result['seconds']:>8.1f} {result['hosts_per_s']:>8.1f} {result['ok']:>6}")
+                results.append({"hosts": count, "shards": shards, "forks": args.forks, "cpus": os.cpu_count(), **result})
+        pool.close()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+执行路径的基准套件：在N台本地替身主机上测量 Web界面各功能的耗时，结果写入JSON，可与基线对比
+
+替身主机默认使用 local 连接插件；也可以通过 --ssh-host/--ssh-ports 指向本地回环地址上的 sshd
+（例如每个端口一个轻量sshd容器），主机按端口轮流分配。每个场景都通过 server_manager 中与界面相同的函数执行：
+
+    ping      连通性检查（run_ansible_batch + ping）
+    shell     ad-hoc 命令（run_ansible_batch + shell）
+    facts     收集系统信息（gather_system_info，不使用缓存）
+    logtail   跟踪日志（LogFollower：首次读取末尾若干行，追加内容后再读取新增部分）
+    service   服务状态（run_composite：is-active / is-enabled / status；成功数为服务处于 active 的主机）
+    rollout   服务管理的滚动执行（run_rollout：分批执行无害的命令和健康检查）
+
+    python benchmarks/bench_suite.py --hosts 1 10 100 1000 --json results.json
+    python benchmarks/bench_suite.py --hosts 1 10 100 --baseline results.json --tolerance 0.25
+    python benchmarks/bench_suite.py --ssh-host 127.0.0.1 --ssh-ports 2201 2202 --ssh-user bench --ssh-key ~/.ssh/id_rsa
+
+指定 --baseline 时，任何场景比基线慢 tolerance 以上（且至少慢 --min-delta 秒）都视为性能回退，退出码为1。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from server_manager.composite import run_composite, step  # noqa: E402
+from server_manager.facts import gather_system_info  # noqa: E402
+from server_manager.jobs import JOB_SHARDS, JobManager  # noqa: E402
+from server_manager.logtail import LogFollower  # noqa: E402
+from server_manager.perf import PerfRecorder  # noqa: E402
+from server_manager.rollout import run_rollout  # noqa: E402
+from server_manager.runner import run_ansible_batch  # noqa: E402
+from server_manager.workspace import WorkspacePool  # noqa: E402
+
+
+# 固定的inventory文件，代替按服务器配置生成的inventory
+class StaticInventory:
+    def __init__(self, path):
+        self.path = path
+
+    def sync(self, servers):
+        return self.path
+
+
+class NoConnections:
+    def runner_envvars(self):
+        return {}
+
+
+# 一次测量的上下文：任务注册表和各场景的参数
+class Context:
+    def __init__(self, manager, args, log_path):
+        self.manager = manager
+        self.args = args
+        self.log_path = log_path
+        self.generated_log = args.log_path is None     # 生成的日志文件在两次读取之间追加内容
+
+    @property
+    def run_options(self):
+        return {"forks": self.args.forks, "servers": {}, "job_manager": self.manager}
+
+
+# 生成N台替身主机的inventory，返回主机名列表
+def write_inventory(path, count, args):
+    names = [f"bench_{i:05d}" for i in range(count)]
+    if args.ssh_host:
+        hosts = {
+            name: {"ansible_host": args.ssh_host, "ansible_port": args.ssh_ports[i % len(args.ssh_ports)]}
+            for i, name in enumerate(names)
+        }
+        variables = {
+            "ansible_connection": "ssh",
+            "ansible_user": args.ssh_user,
+            "ansible_ssh_private_key_file": args.ssh_key,
+            "ansible_ssh_common_args": "-o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null",
+            "ansible_python_interpreter": args.python_interpreter or "auto_silent"
+        }
+    else:
+        hosts = dict.fromkeys(names)
+        variables = {"ansible_connection": "local", "ansible_python_interpreter": args.python_interpreter or sys.executable}
+
+    with open(path, "w") as f:
+        yaml.dump({"all": {"hosts": hosts, "vars": variables}}, f)
+    return names
+
+
+# 各场景返回成功的主机数
+def flow_ping(names, ctx):
+    results = run_ansible_batch(names, "ping", **ctx.run_options)
+    return sum(1 for result in results.values() if result["status"] == "ok")
+
+
+def flow_shell(names, ctx):
+    results = run_ansible_batch(names, "shell", ctx.args.shell, **ctx.run_options)
+    return sum(1 for result in results.values() if result["status"] == "ok")
+
+
+def flow_facts(names, ctx):
+    entries = gather_system_info(names, ttl=0, **ctx.run_options)
+    return sum(1 for entry in entries.values() if entry is not None)
+
+
+def flow_logtail(names, ctx):
+    follower = LogFollower(ctx.log_path, names)
+    follower.poll(**ctx.run_options)
+    if ctx.generated_log:
+        _append_log(ctx.log_path, 20)
+    chunks = follower.poll(**ctx.run_options)
+    return sum(1 for chunk in chunks.values() if chunk.error is None)
+
+
+def flow_service(names, ctx):
+    service = ctx.args.service
+    results = run_composite(names, [
+        step("active", f"systemctl is-active {service}", always=True),
+        step("enabled", f"systemctl is-enabled {service}", always=True),
+        step("status", f"systemctl status {service} --no-pager", always=True)
+    ], **ctx.run_options)
+    # 各步骤都是 always，脚本总是成功；按 is-active 的返回码判断服务是否在运行
+    return sum(1 for result in results.values() if result.step("active") and result.step("active").ok)
+
+
+# 与「高级操作」的服务管理相同的滚动执行：操作命令 + 健康检查，按批次执行
+def flow_rollout(names, ctx):
+    args = ctx.args
+    rollout = run_rollout(
+        names, args.rollout_command, serial=args.rollout_serial, max_parallel=args.forks,
+        health_check=args.rollout_health, servers={}, job_manager=ctx.manager
+    )
+    return sum(1 for result in rollout.results.values() if result.status == "ok")
+
+
+FLOWS = {
+    "ping": flow_ping,
+    "shell": flow_shell,
+    "facts": flow_facts,
+    "logtail": flow_logtail,
+    "service": flow_service,
+    "rollout": flow_rollout
+}
+
+
+def _append_log(path, lines):
+    with open(path, "a") as f:
+        for i in range(lines):
+            f.write(f"{datetime.now().isoformat()} bench[{os.getpid()}]: line {i}\n")
+
+
+# 执行一个场景 repeat 次，耗时取中位数；各阶段耗时取自 PerfRecorder（所有任务的p50）
+def measure(flow, names, args, inventory, pool, log_path):
+    runs = []
+    perf = PerfRecorder()
+    for _ in range(args.repeat):
+        manager = JobManager(inventory, NoConnections(), workspaces=pool, shards=args.shards, perf=perf)
+        start = time.perf_counter()
+        ok = FLOWS[flow](names, Context(manager, args, log_path))
+        runs.append((time.perf_counter() - start, ok))
+
+    seconds = statistics.median(elapsed for elapsed, _ in runs)
+    ok = min(count for _, count in runs)
+    return {
+        "flow": flow,
+        "hosts": len(names),
+        "seconds": round(seconds, 4),
+        "min_seconds": round(min(elapsed for elapsed, _ in runs), 4),
+        "hosts_per_s": round(len(names) / seconds, 2),
+        "ok": ok,
+        "failed": len(names) - ok,
+        "jobs": sum(row["count"] for row in perf.summary() if row["phase"] == "total"),
+        "phases": {row["phase"]: round(row["p50"], 4) for row in perf.summary()},
+        "host_p95": round(next((row["p95"] for row in perf.summary() if row["phase"] == "host"), 0.0), 4)
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _package_version(name):
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return None
+
+
+def environment(args):
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "ansible_core": _package_version("ansible-core"),
+        "ansible_runner": _package_version("ansible-runner"),
+        "connection": "ssh" if args.ssh_host else "local",
+        "forks": args.forks,
+        "shards": args.shards,
+        "repeat": args.repeat
+    }
+
+
+# 与基线对比，返回回退的场景列表
+def compare(results, baseline, tolerance, min_delta):
+    previous = {(row["flow"], row["hosts"]): row for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        old = previous.get((row["flow"], row["hosts"]))
+        if old is None:
+            continue
+        delta = row["seconds"] - old["seconds"]
+        slower = delta > min_delta and row["seconds"] > old["seconds"] * (1 + tolerance)
+        if slower or row["ok"] < old["ok"]:
+            # 基线耗时为0（跳过或瞬间完成的场景）时无法计算比例
+            change = delta / old["seconds"] if old["seconds"] else None
+            regressions.append({**row, "baseline_seconds": old["seconds"], "change": change})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="执行路径的基准套件")
+    parser.add_argument("--hosts", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--flows", nargs="+", choices=list(FLOWS), default=list(FLOWS))
+    parser.add_argument("--repeat", type=int, default=1, help="每个场景执行的次数，耗时取中位数")
+    parser.add_argument("--forks", type=int, default=50)
+    parser.add_argument("--shards", type=int, default=JOB_SHARDS)
+    parser.add_argument("--shell", default="uptime && df -h /", help="shell 场景执行的命令")
+    parser.add_argument("--service", default="ssh", help="service 场景查询的服务")
+    parser.add_argument("--rollout-command", default="true", help="rollout 场景的操作命令（默认不做任何改动）")
+    parser.add_argument("--rollout-health", default="test -d /", help="rollout 场景的健康检查命令")
+    parser.add_argument("--rollout-serial", nargs="+", default=["25%"], help="rollout 场景的批次大小")
+    parser.add_argument("--log-path", help="logtail 场景跟踪的日志文件（默认在临时目录中生成）")
+    parser.add_argument("--ssh-host", help="本地sshd地址，不指定则使用local连接")
+    parser.add_argument("--ssh-ports", type=int, nargs="+", default=[22], help="sshd端口，主机按端口轮流分配")
+    parser.add_argument("--ssh-user", default=os.getenv("USER", "root"))
+    parser.add_argument("--ssh-key", default=os.path.expanduser("~/.ssh/id_rsa"))
+    parser.add_argument("--python-interpreter", help="替身主机上的Python解释器")
+    parser.add_argument("--json", default="bench_suite.json", help="结果文件")
+    parser.add_argument("--baseline", help="基线结果文件，用于检测性能回退")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许比基线慢的比例")
+    parser.add_argument("--min-delta", type=float, default=0.5, help="忽略小于该秒数的变化")
+    args = parser.parse_args()
+
+    output_path = os.path.abspath(args.json)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = []
+    print(f"CPU核心数: {os.cpu_count()}  连接: {'ssh' if args.ssh_host else 'local'}  forks: {args.forks}  shards: {args.shards}")
+    print(f"{'flow':>8} {'hosts':>6} {'seconds':>8} {'hosts/s':>8} {'ok':>6} {'startup':>8} {'host p95':>8}")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_suite_") as workdir:
+        # 收集事实时生成的playbook和事实缓存都写在当前目录，切换到临时目录避免影响应用目录
+        os.chdir(workdir)
+        log_path = args.log_path or os.path.join(workdir, "bench.log")
+        if args.log_path is None:
+            _append_log(log_path, 200)
+        pool = WorkspacePool(root=os.path.join(workdir, "workspaces"), project_dir=workdir,
+                             artifacts_dir=os.path.join(workdir, "artifacts"))
+        try:
+            for count in args.hosts:
+                inventory_path = os.path.join(workdir, f"hosts_{count}.yml")
+                names = write_inventory(inventory_path, count, args)
+                for flow in args.flows:
+                    row = measure(flow, names, args, StaticInventory(inventory_path), pool, log_path)
+                    print(f"{flow:>8} {count:>6} {row['seconds']:>8.2f} {row['hosts_per_s']:>8.1f} {row['ok']:>6} "
+                          f"{row['phases'].get('startup', 0):>8.2f} {row['host_p95']:>8.2f}")
+                    results.append(row)
+        finally:
+            pool.close()
+            os.chdir(cwd)
+
+    with open(output_path, "w") as f:
+        json.dump({"environment": environment(args), "results": results}, f, indent=2)
+    print(f"结果已写入 {output_path}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        for row in regressions:
+            print(f"性能回退: {row['flow']} {row['hosts']}台 {row['baseline_seconds']:.2f}s -> {row['seconds']:.2f}s "
+                  f"({'基线为0' if row['change'] is None else format(row['change'], '+.0%')}), 成功 {row['ok']}/{row['hosts']}")
+        if regressions:
+            sys.exit(1)
+        print("未发现性能回退")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Ansible服务器管理核心库
+
+Web界面和命令行共用的服务器配置、inventory、任务执行、事实缓存和指标采集。
+ansible_runner、yaml、pandas 等依赖只在首次使用对应功能时导入，
+`import server_manager` 本身不加载它们。
+"""
+import importlib
+
+# 公开名称 -> 所在子模块，首次访问时才导入
+_EXPORTS = {
+    "DEFAULT_FORKS": "config",
+    "load_servers_from_env": "config",
+    "host_alias": "config",
+    "Fleet": "fleet",
+    "load_fleet": "fleet",
+    "write_fleet_db": "fleet",
+    "INVENTORY_PATH": "inventory",
+    "InventoryManager": "inventory",
+    "build_inventory": "inventory",
+    "generate_inventory": "inventory",
+    "SSHConnectionManager": "connections",
+    "connection_manager_from_env": "connections",
+    "AnsibleJob": "jobs",
+    "JobManager": "jobs",
+    "ShardedJob": "jobs",
+    "JobResult": "jobs",
+    "EventFilter": "events",
+    "HostEvent": "events",
+    "collect_host_results": "runner",
+    "submit_ansible_adhoc": "runner",
+    "run_ansible_adhoc": "runner",
+    "run_ansible_batch": "runner",
+    "submit_ansible_playbook": "runner",
+    "run_ansible_playbook": "runner",
+    "run_composite": "composite",
+    "step": "composite",
+    "plan_batches": "rollout",
+    "run_rollout": "rollout",
+    "gather_system_info": "facts",
+    "invalidate_cached_facts": "facts",
+    "JobHistory": "history",
+    "log_query": "logsearch",
+    "search_logs": "logsearch",
+    "LogFollower": "logtail",
+    "ResultCache": "resultcache",
+    "HostMetrics": "metrics",
+    "collect_metrics": "metrics",
+    "MetricsStore": "tsdb",
+    "metrics_store_from_env": "tsdb",
+    "build_overview": "overview",
+    "group_summary": "overview",
+    "FleetPoller": "scheduler",
+    "WorkspacePool": "workspace",
+    "PerfRecorder": "perf",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,148 @@
+"""命令行入口：每台主机输出一行JSON，便于脚本和定时任务处理
+
+    python -m server_manager ping
+    python -m server_manager exec "uptime" --hosts "Server 1" Server_2
+    python -m server_manager exec "nginx -t" --limit "web:&prod"
+    python -m server_manager facts --ttl 0
+    python -m server_manager metrics --store
+
+需要在项目目录下运行（与Web界面共用 .env、ansible_inventory 和缓存目录）。
+服务器清单来源由 INVENTORY_SOURCE 指定（见 server_manager.fleet）。
+任一主机失败时退出码为1。
+"""
+import argparse
+import json
+import sys
+
+
+def _select_servers(servers, requested, pattern=None):
+    names = servers.select(pattern) if pattern else list(servers)
+    if not requested:
+        return names
+
+    selected = []
+    for item in requested:
+        name = servers.resolve(item)
+        if name is None:
+            raise SystemExit(f"未知服务器: {item}")
+        selected.append(name)
+    if pattern:
+        allowed = set(names)
+        selected = [name for name in selected if name in allowed]
+    return selected
+
+
+def _emit(record):
+    print(json.dumps(record, ensure_ascii=False, default=str), flush=True)
+
+
+def _emit_results(host_results, fields):
+    failed = 0
+    for name, result in host_results.items():
+        record = {"server": name, "status": result["status"]}
+        res = result["res"]
+        if result["status"] == "ok":
+            record.update({key: res.get(key) for key in fields if key in res})
+        else:
+            failed += 1
+            record["error"] = res.get("msg") or res.get("stderr") or result["status"]
+        _emit(record)
+    return failed
+
+
+def cmd_ping(args, servers, names):
+    from .runner import run_ansible_batch
+
+    host_results = run_ansible_batch(names, "ping", forks=args.forks, servers=servers)
+    return _emit_results(host_results, ["ping"])
+
+
+def cmd_exec(args, servers, names):
+    from .runner import run_ansible_batch
+
+    host_results = run_ansible_batch(names, "shell", args.command, forks=args.forks, servers=servers)
+    return _emit_results(host_results, ["rc", "stdout", "stderr"])
+
+
+def cmd_facts(args, servers, names):
+    from .config import host_alias
+    from .facts import gather_system_info
+
+    entries = gather_system_info([host_alias(name) for name in names], ttl=args.ttl, forks=args.forks, servers=servers)
+    failed = 0
+    for name in names:
+        entry = entries.get(host_alias(name))
+        if entry is None:
+            failed += 1
+            _emit({"server": name, "status": "unreachable", "error": "未能收集系统信息"})
+        else:
+            _emit({"server": name, "status": "ok", "gathered_at": entry["gathered_at"], **entry["facts"]})
+    return failed
+
+
+def cmd_metrics(args, servers, names):
+    from dataclasses import asdict
+
+    from .metrics import collect_metrics
+
+    store = None
+    if args.store:
+        from .tsdb import metrics_store_from_env
+        store = metrics_store_from_env()
+
+    metrics, errors = collect_metrics(names, forks=args.forks, store=store, servers=servers)
+    for name in names:
+        if name in metrics:
+            _emit({"status": "ok", **asdict(metrics[name])})
+        else:
+            _emit({"server": name, "status": "failed", "error": errors.get(name, "无执行结果")})
+    return len(errors)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="server_manager", description="Ansible服务器管理命令行工具")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--hosts", nargs="+", help="服务器名称或inventory主机名，默认全部")
+    common.add_argument("--limit", help="主机模式，例如 web:&prod、db*:!db03")
+    common.add_argument("--forks", type=int, help="并发主机数，默认取 ANSIBLE_FORKS")
+
+    subparsers = parser.add_subparsers(dest="command_name", required=True)
+
+    ping = subparsers.add_parser("ping", parents=[common], help="检查服务器连通性")
+    ping.set_defaults(handler=cmd_ping)
+
+    exec_ = subparsers.add_parser("exec", parents=[common], help="在服务器上执行shell命令")
+    exec_.add_argument("command", help="要执行的命令")
+    exec_.set_defaults(handler=cmd_exec)
+
+    facts = subparsers.add_parser("facts", parents=[common], help="输出系统信息（使用事实缓存）")
+    facts.add_argument("--ttl", type=int, help="缓存有效期（秒），0 表示强制刷新")
+    facts.set_defaults(handler=cmd_facts)
+
+    metrics = subparsers.add_parser("metrics", parents=[common], help="采集资源指标")
+    metrics.add_argument("--store", action="store_true", help="同时写入指标时序存储")
+    metrics.set_defaults(handler=cmd_metrics)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    # 先加载 .env，再导入依赖环境变量的模块
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from .facts import FACT_CACHE_TTL
+    from .fleet import load_fleet
+
+    if getattr(args, "ttl", 0) is None:
+        args.ttl = FACT_CACHE_TTL
+
+    servers = load_fleet()
+    names = _select_servers(servers, args.hosts, args.limit)
+    if not names:
+        print("未找到匹配的服务器，请检查 .env 文件、INVENTORY_SOURCE 或 --limit", file=sys.stderr)
+        return 2
+
+    return 1 if args.handler(args, servers, names) else 0
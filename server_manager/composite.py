@@ -0,0 +1,100 @@
+"""组合操作：一条或多条命令（例如操作 + 验证）在每台主机上一次执行完成，返回每一步的结构化结果
+
+所有步骤通过 script 模块在一个任务中执行，每台主机只建立一次会话、启动一次远程进程，
+不再为验证步骤单独发起第二轮执行。
+"""
+import base64
+import json
+import os
+from dataclasses import dataclass, field
+
+from .config import host_alias
+from .runner import collect_host_results, submit_ansible_adhoc
+
+STEPS_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ansible_scripts', 'run_steps.py')
+
+
+# 构造一个步骤；always=True 表示前面的步骤失败后仍然执行（用于验证、收集状态）
+def step(name, cmd, always=False):
+    return {"name": name, "cmd": cmd, "always": always}
+
+
+@dataclass
+class StepResult:
+    name: str
+    cmd: str
+    rc: int = None
+    stdout: str = ""
+    stderr: str = ""
+    duration: float = 0.0
+    skipped: bool = False
+
+    @property
+    def ok(self):
+        return not self.skipped and self.rc == 0
+
+
+@dataclass
+class CompositeResult:
+    server: str
+    status: str                 # ok / failed / unreachable / timeout
+    steps: list = field(default_factory=list)
+    error: str = None
+
+    def step(self, name):
+        return next((s for s in self.steps if s.name == name), None)
+
+    @classmethod
+    def from_host_result(cls, server, host_result):
+        res = host_result["res"]
+        try:
+            payload = json.loads(res.get("stdout", ""))
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            return cls(server, host_result["status"], error=res.get("msg") or res.get("stderr") or host_result["status"])
+
+        steps = [StepResult(**s) for s in payload.get("steps", [])]
+        # 脚本本身出错（参数无法解析等）时没有步骤结果，错误作为一个失败的步骤返回
+        if payload.get("error"):
+            steps.append(StepResult("error", "", rc=res.get("rc") or 1, stderr=payload["error"]))
+        failed = next((s for s in steps if not s.skipped and s.rc != 0), None)
+        error = (failed.stderr.strip() or failed.stdout.strip() or f"返回码 {failed.rc}") if failed else None
+        return cls(server, host_result["status"], steps, error)
+
+
+def _script_args(steps):
+    encoded = base64.b64encode(json.dumps(list(steps)).encode("utf-8")).decode("ascii")
+    return f"{STEPS_SCRIPT} {encoded}"
+
+
+# 提交组合操作，立即返回任务对象
+def submit_composite(server_names, steps, forks=None, description=None, servers=None, job_manager=None):
+    steps = list(steps)
+    return submit_ansible_adhoc(
+        ",".join(host_alias(name) for name in server_names), "script", _script_args(steps), forks=forks,
+        description=description or " && ".join(s["cmd"] for s in steps), servers=servers, job_manager=job_manager
+    )
+
+
+# 从结束（或已取消）的任务中提取每台服务器的结果
+def composite_results(job, server_names, missing="unreachable"):
+    host_results = collect_host_results(job.events)
+    results = {}
+    for name in server_names:
+        host_result = host_results.get(host_alias(name))
+        if host_result is None:
+            results[name] = CompositeResult(name, missing, error="无执行结果" if missing == "unreachable" else "执行超时")
+        else:
+            results[name] = CompositeResult.from_host_result(name, host_result)
+    return results
+
+
+# 执行组合操作，返回 {服务器名: CompositeResult}
+def run_composite(server_names, steps, forks=None, description=None, servers=None, job_manager=None):
+    server_names = list(server_names)
+    if not server_names:
+        return {}
+    job = submit_composite(server_names, steps, forks, description, servers=servers, job_manager=job_manager)
+    job.wait()
+    return composite_results(job, server_names)
@@ -0,0 +1,29 @@
+"""服务器配置：从环境变量读取服务器列表和执行参数"""
+import os
+
+# 单次ansible-runner调用内的默认并发主机数
+DEFAULT_FORKS = int(os.getenv("ANSIBLE_FORKS", "20"))
+
+
+# 从环境变量读取服务器配置
+def load_servers_from_env():
+    servers = {}
+
+    # 查找所有SERVER_*_HOST环境变量
+    for key in os.environ:
+        if key.endswith('_HOST') and key.startswith('SERVER_'):
+            server_name = key.replace('_HOST', '').replace('SERVER_', 'Server ')
+            server_prefix = key.replace('_HOST', '')
+
+            servers[server_name] = {
+                "host": os.getenv(f"{server_prefix}_HOST"),
+                "user": os.getenv(f"{server_prefix}_USER", "root"),
+                "password": os.getenv(f"{server_prefix}_PASSWORD")
+            }
+
+    return servers
+
+
+# 服务器名称对应的inventory主机名
+def host_alias(name):
+    return name.replace(" ", "_")
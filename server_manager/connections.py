@@ -0,0 +1,92 @@
+"""SSH连接复用：ControlMaster套接字的目录管理、清理和关闭"""
+import atexit
+import functools
+import os
+import socket
+import stat
+import subprocess
+
+
+# SSH连接复用：ControlMaster套接字放在统一管理的目录中，跨多次执行保持连接
+class SSHConnectionManager:
+    def __init__(self, control_dir, persist_seconds, pipelining=True):
+        self.control_dir = control_dir
+        self.persist_seconds = persist_seconds
+        self.pipelining = pipelining
+        os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+
+    # 传给ansible-runner的环境变量
+    def runner_envvars(self):
+        return {
+            "ANSIBLE_SSH_CONTROL_PATH_DIR": self.control_dir,
+            "ANSIBLE_SSH_ARGS": f"-C -o ControlMaster=auto -o ControlPersist={self.persist_seconds}s",
+            "ANSIBLE_PIPELINING": str(self.pipelining)
+        }
+
+    def sockets(self):
+        try:
+            names = os.listdir(self.control_dir)
+        except OSError:
+            return []
+        # ControlPersist到期时主进程会自己删除套接字，列目录之后文件可能已经不存在
+        sockets = []
+        for name in names:
+            path = os.path.join(self.control_dir, name)
+            try:
+                if stat.S_ISSOCK(os.lstat(path).st_mode):
+                    sockets.append(path)
+            except OSError:
+                continue
+        return sockets
+
+    # 删除主进程已退出但仍残留的套接字文件
+    def cleanup_stale(self):
+        removed = 0
+        for path in self.sockets():
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+            except OSError:
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            finally:
+                probe.close()
+        return removed
+
+    # 通知所有ControlMaster退出（应用退出或手动断开时调用）
+    # 单个套接字失败（ssh不存在、主进程无响应超时）时继续处理其余的套接字
+    def close_all(self):
+        for path in self.sockets():
+            try:
+                subprocess.run(
+                    ["ssh", "-o", f"ControlPath={path}", "-O", "exit", "control-master"],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    timeout=10
+                )
+            except (subprocess.SubprocessError, OSError):
+                continue
+        return self.cleanup_stale()
+
+
+# 按环境变量创建连接管理器
+# 常驻进程（Web界面）退出时关闭所有复用连接；命令行每次运行很短，保留连接供下次复用
+def connection_manager_from_env(close_on_exit=False):
+    manager = SSHConnectionManager(
+        os.path.expanduser(os.getenv("ANSIBLE_SSH_CONTROL_DIR", "~/.ansible/asm-cp")),
+        int(os.getenv("ANSIBLE_SSH_CONTROL_PERSIST", "600")),
+        os.getenv("ANSIBLE_PIPELINING", "True").lower() not in ("0", "false", "no")
+    )
+    manager.cleanup_stale()
+    if close_on_exit:
+        atexit.register(manager.close_all)
+    return manager
+
+
+# 进程内默认的连接管理器（命令行和脚本使用）
+@functools.lru_cache(maxsize=None)
+def default_connection_manager():
+    return connection_manager_from_env()
@@ -0,0 +1,102 @@
+"""事件读取：按事件类型过滤后再解码，每个主机结果只保留需要的字段
+
+ansible-runner 的完整事件包含大量界面用不到的内容（任务参数、stdout_lines、invocation，
+收集事实时每台主机几十KB的 ansible_facts）。任务、执行历史和artifacts导入都通过 EventFilter
+把事件投影为 HostEvent（__slots__ 记录），其余内容在解码后立即丢弃。
+读取文件时先在原始文本中查找事件类型，不匹配的事件不做JSON解码。
+"""
+import gzip
+import json
+import os
+
+# 主机结果事件 -> 结果状态
+HOST_RESULT_EVENTS = {
+    "runner_on_ok": "ok",
+    "runner_on_failed": "failed",
+    "runner_on_unreachable": "unreachable",
+    "runner_on_skipped": "skipped"
+}
+
+# 默认保留的结果字段（命令输出、返回码、错误信息和ping结果）
+RESULT_FIELDS = ("rc", "stdout", "stderr", "msg", "changed", "failed", "ping", "cmd", "delta", "skip_reason")
+
+
+# 一台主机的一个结果事件
+class HostEvent:
+    __slots__ = ("event", "counter", "host", "task", "res")
+
+    def __init__(self, event, counter, host, task, res):
+        self.event = event
+        self.counter = counter
+        self.host = host
+        self.task = task
+        self.res = res
+
+    @property
+    def status(self):
+        return HOST_RESULT_EVENTS.get(self.event)
+
+    # 与ansible-runner事件相同的结构，用于归档
+    def to_dict(self):
+        return {
+            "event": self.event,
+            "counter": self.counter,
+            "event_data": {"host": self.host, "task": self.task, "res": self.res}
+        }
+
+
+# 事件过滤和字段投影：events 为保留的事件类型；
+# fields 为保留的结果字段（None 表示全部保留），也可以是 {字段: 函数} 在保留前先转换（例如提取事实摘要）
+class EventFilter:
+    def __init__(self, events=HOST_RESULT_EVENTS, fields=RESULT_FIELDS):
+        self.events = frozenset(events)
+        if fields is None or isinstance(fields, dict):
+            self.fields = fields
+        else:
+            self.fields = dict.fromkeys(fields)
+        self._markers = tuple(f'"{name}"' for name in self.events)
+
+    def project(self, event):
+        name = event.get("event")
+        if name not in self.events:
+            return None
+        data = event.get("event_data") or {}
+        res = data.get("res") or {}
+        if self.fields is not None:
+            res = {
+                key: (convert(res[key]) if convert else res[key])
+                for key, convert in self.fields.items() if key in res
+            }
+        return HostEvent(name, event.get("counter", 0), data.get("host"), data.get("task"), res)
+
+    # 原始JSON文本中不含任何保留的事件类型时直接跳过，不解码
+    def decode(self, raw):
+        if not any(marker in raw for marker in self._markers):
+            return None
+        return self.project(json.loads(raw))
+
+
+DEFAULT_FILTER = EventFilter()
+
+
+# 逐个读取 artifacts/<ident>/job_events 中的事件文件（按事件序号），只解码匹配的事件
+def iter_artifact_events(artifact_dir, event_filter=DEFAULT_FILTER):
+    events_dir = os.path.join(artifact_dir, "job_events")
+    if not os.path.isdir(events_dir):
+        return
+    names = [name for name in os.listdir(events_dir) if name.endswith(".json")]
+    names.sort(key=lambda name: int(name.split("-", 1)[0]) if name.split("-", 1)[0].isdigit() else 0)
+    for name in names:
+        with open(os.path.join(events_dir, name), encoding="utf-8") as f:
+            event = event_filter.decode(f.read())
+        if event is not None:
+            yield event
+
+
+# 逐行读取归档（gzip压缩的JSON Lines），只解码匹配的事件
+def iter_archive_events(path, event_filter=DEFAULT_FILTER):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            event = event_filter.decode(line)
+            if event is not None:
+                yield event
@@ -0,0 +1,133 @@
+"""系统信息收集：精简的事实子集和按主机的JSON文件缓存"""
+import json
+import os
+import time
+
+from .events import EventFilter
+from .runner import collect_host_results, submit_ansible_playbook
+
+SYSTEM_INFO_PLAYBOOK = 'ansible_playbooks/system_info.yml'
+
+# 系统信息页只需要这些事实子集（发行版、内核、CPU、内存、网卡、运行时间）
+FACT_GATHER_SUBSET = ["!all", "!min", "distribution", "platform", "hardware", "network"]
+
+# 事实缓存：每台主机一个JSON文件
+FACT_CACHE_DIR = 'ansible_facts_cache'
+FACT_CACHE_TTL = int(os.getenv("FACT_CACHE_TTL", "3600"))
+
+
+# 创建系统信息收集playbook（内容未变化时不重写）
+def create_system_info_playbook():
+    import yaml
+
+    playbook = [{
+        "name": "收集系统信息",
+        "hosts": "all",
+        "gather_facts": False,
+        "tasks": [
+            {
+                "name": "获取系统信息",
+                "setup": {"gather_subset": FACT_GATHER_SUBSET}
+            }
+        ]
+    }]
+    content = yaml.dump(playbook, allow_unicode=True)
+
+    if os.path.exists(SYSTEM_INFO_PLAYBOOK):
+        with open(SYSTEM_INFO_PLAYBOOK) as f:
+            if f.read() == content:
+                return SYSTEM_INFO_PLAYBOOK
+
+    os.makedirs(os.path.dirname(SYSTEM_INFO_PLAYBOOK), exist_ok=True)
+    with open(SYSTEM_INFO_PLAYBOOK, 'w') as f:
+        f.write(content)
+
+    return SYSTEM_INFO_PLAYBOOK
+
+
+# 从完整的ansible_facts中提取系统信息页展示的字段
+def summarize_facts(facts):
+    interfaces = {}
+    for iface in facts.get('ansible_interfaces', []):
+        iface_data = facts.get(f"ansible_{iface.replace('-', '_')}", {})
+        if iface_data.get('ipv4'):
+            interfaces[iface] = iface_data['ipv4'].get('address', 'N/A')
+
+    processor = facts.get('ansible_processor') or ['N/A']
+
+    return {
+        "distribution": facts.get('ansible_distribution', 'N/A'),
+        "distribution_version": facts.get('ansible_distribution_version', ''),
+        "kernel": facts.get('ansible_kernel', 'N/A'),
+        "architecture": facts.get('ansible_architecture', 'N/A'),
+        "processor_cores": facts.get('ansible_processor_cores', 'N/A'),
+        "processor": processor[-1],
+        "memtotal_mb": facts.get('ansible_memtotal_mb', 0),
+        "hostname": facts.get('ansible_hostname', 'N/A'),
+        "ipv4": facts.get('ansible_default_ipv4', {}).get('address', 'N/A'),
+        "uptime_seconds": facts.get('ansible_uptime_seconds', 0),
+        "interfaces": interfaces
+    }
+
+
+# 收集事实的任务只保留事实摘要和错误信息
+FACT_EVENT_FILTER = EventFilter(fields={"ansible_facts": summarize_facts, "msg": None})
+
+
+def fact_cache_path(host):
+    return os.path.join(FACT_CACHE_DIR, f"{host}.json")
+
+
+# 读取缓存，超过ttl秒或不存在时返回None
+def load_cached_facts(host, ttl=FACT_CACHE_TTL):
+    try:
+        with open(fact_cache_path(host)) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - entry.get("gathered_at", 0) > ttl:
+        return None
+    return entry
+
+
+def save_cached_facts(host, summary):
+    os.makedirs(FACT_CACHE_DIR, exist_ok=True)
+    entry = {"gathered_at": time.time(), "facts": summary}
+    tmp_path = f"{fact_cache_path(host)}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp_path, fact_cache_path(host))
+    return entry
+
+
+def invalidate_cached_facts(host=None):
+    if host:
+        hosts = [host]
+    elif os.path.isdir(FACT_CACHE_DIR):
+        hosts = [p[:-len(".json")] for p in os.listdir(FACT_CACHE_DIR) if p.endswith(".json")]
+    else:
+        hosts = []
+    for h in hosts:
+        if os.path.exists(fact_cache_path(h)):
+            os.remove(fact_cache_path(h))
+
+
+# 只对缓存缺失或过期的主机收集事实，返回 {主机名: 缓存条目}
+def gather_system_info(hosts, ttl=FACT_CACHE_TTL, forks=None, servers=None, job_manager=None):
+    entries = {host: load_cached_facts(host, ttl) for host in hosts}
+    stale = [host for host, entry in entries.items() if entry is None]
+
+    if stale:
+        # 事件到达时即提取摘要，任务和执行历史中不保留完整的 ansible_facts
+        job = submit_ansible_playbook(
+            create_system_info_playbook(), ",".join(stale), forks=forks, servers=servers, job_manager=job_manager,
+            shard=True, event_filter=FACT_EVENT_FILTER
+        )
+        job.wait()
+        for host, result in collect_host_results(job.events).items():
+            summary = result["res"].get('ansible_facts')
+            if result["status"] == "ok" and summary:
+                entries[host] = save_cached_facts(host, summary)
+
+    return entries
@@ -0,0 +1,542 @@
+"""服务器清单：从环境变量、inventory文件或目录、SQLite或动态inventory脚本加载服务器，支持分组、标签和主机模式
+
+INVENTORY_SOURCE 指定来源，未设置时沿用 SERVER_*_HOST 环境变量：
+    hosts.yml / hosts.ini        Ansible格式的inventory文件（YAML或INI）
+    inventory/                   目录下的所有inventory文件合并加载
+与Ansible相同，inventory所在目录中的 group_vars/、host_vars/ 按分组名和主机名合并为变量（不作为inventory文件解析）。
+    sqlite:///path/fleet.db      SQLite数据库（hosts、host_groups 表）
+    script:/path/to/inventory    动态inventory脚本（输出 --list 格式的JSON）；可执行文件同样按脚本处理
+
+分组和标签各自建立 名称 -> 主机集合 的索引，按模式选择主机时只做集合运算。
+"""
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import shlex
+import sqlite3
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Mapping
+
+from .config import host_alias, load_servers_from_env
+
+INVENTORY_SOURCE = os.getenv("INVENTORY_SOURCE", "")
+# 动态inventory脚本的结果缓存时间（秒）
+INVENTORY_SCRIPT_TTL = int(os.getenv("INVENTORY_SCRIPT_TTL", "300"))
+
+# Ansible的内置分组，不作为服务器的分组显示
+IMPLICIT_GROUPS = {"all", "ungrouped"}
+
+# inventory目录中的变量目录：<目录>/<分组名或主机名>[.yml|.yaml|.json]，或同名子目录下的多个文件
+VARS_DIRS = ("group_vars", "host_vars")
+VARS_EXTENSIONS = ("", ".yml", ".yaml", ".json")
+# 分组统计中没有分组的服务器
+UNGROUPED = "(未分组)"
+
+# 目录来源中忽略的文件
+IGNORED_EXTENSIONS = ("~", ".retry", ".md", ".bak", ".orig", ".pyc", ".db", ".sqlite", ".db-wal", ".db-shm")
+
+# 除连接信息外，其余主机变量原样写入inventory
+CONNECTION_VARS = {"ansible_host", "ansible_user", "ansible_password", "ansible_ssh_pass", "tags"}
+
+FLEET_DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    name TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    user TEXT NOT NULL DEFAULT 'root',
+    password TEXT,
+    tags TEXT NOT NULL DEFAULT '',
+    vars TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS host_groups (
+    grp TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (grp, name)
+) WITHOUT ROWID;
+"""
+
+
+def _as_list(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return [str(item) for item in value]
+
+
+# 服务器清单：名称 -> 配置（host、user、password、groups、tags、vars），可以直接替代原来的服务器字典
+class Fleet(Mapping):
+    def __init__(self, servers=None):
+        self._servers = {}
+        self._order = {}                        # 名称 -> 加载顺序，选择结果按该顺序返回
+        self._aliases = {}                      # inventory主机名 -> 名称
+        self._groups = defaultdict(set)
+        self._tags = defaultdict(set)
+        self._frame = (None, None)
+        self._memberships = (None, None)
+        self.revision = 0
+        for name, config in (servers or {}).items():
+            self.add(name, config)
+
+    def add(self, name, config):
+        config = {
+            "host": config.get("host"),
+            "user": config.get("user") or "root",
+            "password": config.get("password"),
+            "groups": sorted(set(_as_list(config.get("groups"))) - IMPLICIT_GROUPS),
+            "tags": sorted(set(_as_list(config.get("tags")))),
+            "vars": dict(config.get("vars") or {})
+        }
+        if name in self._servers:
+            self._unindex(name)
+        else:
+            self._order[name] = len(self._order)
+        self._servers[name] = config
+        self._aliases[host_alias(name)] = name
+        for group in config["groups"]:
+            self._groups[group].add(name)
+        for tag in config["tags"]:
+            self._tags[tag].add(name)
+        self.revision += 1
+
+    def _unindex(self, name):
+        old = self._servers[name]
+        for group in old["groups"]:
+            self._groups[group].discard(name)
+        for tag in old["tags"]:
+            self._tags[tag].discard(name)
+
+    def __getitem__(self, name):
+        return self._servers[name]
+
+    def __iter__(self):
+        return iter(self._servers)
+
+    def __len__(self):
+        return len(self._servers)
+
+    def __contains__(self, name):
+        return name in self._servers
+
+    # 按名称或inventory主机名查找服务器
+    def resolve(self, name):
+        return name if name in self._servers else self._aliases.get(name)
+
+    @property
+    def groups(self):
+        return sorted(g for g, members in self._groups.items() if members)
+
+    @property
+    def tags(self):
+        return sorted(t for t, members in self._tags.items() if members)
+
+    def members(self, group):
+        return frozenset(self._groups.get(group, ()))
+
+    def tagged(self, tag):
+        return frozenset(self._tags.get(tag, ()))
+
+    # 服务器清单表格（索引为服务器名），清单未修改时复用；pandas 在首次调用时才导入
+    def frame(self):
+        revision, frame = self._frame
+        if revision != self.revision:
+            import pandas as pd
+
+            configs = self._servers.values()
+            frame = pd.DataFrame({
+                "服务器": list(self._servers),
+                "IP地址": [c["host"] for c in configs],
+                "用户": [c["user"] for c in configs],
+                "分组": [", ".join(c["groups"]) for c in configs],
+                "标签": [", ".join(c["tags"]) for c in configs]
+            }, index=pd.Index(list(self._servers), name="name"))
+            self._frame = (self.revision, frame)
+        return frame
+
+    # 分组成员的长表（服务器, 分组），没有分组的服务器归入 UNGROUPED；用于按分组向量化统计
+    def memberships(self):
+        revision, frame = self._memberships
+        if revision != self.revision:
+            import pandas as pd
+
+            hosts, groups = [], []
+            for group, members in self._groups.items():
+                hosts.extend(members)
+                groups.extend([group] * len(members))
+            ungrouped = [name for name, c in self._servers.items() if not c["groups"]]
+            hosts.extend(ungrouped)
+            groups.extend([UNGROUPED] * len(ungrouped))
+            frame = pd.DataFrame({"name": hosts, "group": pd.Categorical(groups)})
+            self._memberships = (self.revision, frame)
+        return frame
+
+    # 单个模式项：all/*、分组、标签、主机名、通配符（作用于主机名和分组名）、~正则
+    def _match_term(self, term):
+        if term in ("all", "*"):
+            return set(self._servers)
+        if term.startswith("~"):
+            regex = re.compile(term[1:])
+            return {name for name in self._servers if regex.search(name) or regex.search(host_alias(name))}
+        if any(c in term for c in "*?["):
+            matched = {name for name in self._servers
+                       if fnmatch.fnmatchcase(name, term) or fnmatch.fnmatchcase(host_alias(name), term)}
+            for index in (self._groups, self._tags):
+                for group in fnmatch.filter(index, term):
+                    matched |= index[group]
+            return matched
+
+        matched = set(self._groups.get(term, ())) | set(self._tags.get(term, ()))
+        name = self.resolve(term)
+        if name is not None:
+            matched.add(name)
+        return matched
+
+    # 按Ansible主机模式选择服务器，例如 "web:&prod"、"web,db:!db03"、"web*"；返回按加载顺序排列的名称列表
+    def select(self, pattern="all"):
+        included, intersections, exclusions = set(), [], []
+        terms = [t.strip() for t in re.split(r"[:,]", pattern or "all") if t.strip()]
+        for term in terms:
+            if term.startswith("&"):
+                intersections.append(self._match_term(term[1:]))
+            elif term.startswith("!"):
+                exclusions.append(self._match_term(term[1:]))
+            else:
+                included |= self._match_term(term)
+
+        # 只有交集/排除项时以全部服务器为基础
+        if not included and terms and all(t[0] in "&!" for t in terms):
+            included = set(self._servers)
+        for matched in intersections:
+            included &= matched
+        for matched in exclusions:
+            included -= matched
+        return sorted(included, key=self._order.__getitem__)
+
+
+# Ansible inventory的分组结构：分组 -> 主机、子分组、变量；最后展开为每台主机的分组和变量
+class _InventoryData:
+    def __init__(self):
+        self.host_vars = defaultdict(dict)
+        self.group_hosts = defaultdict(set)
+        self.group_vars = defaultdict(dict)
+        self.parents = defaultdict(set)
+        self.order = {}
+
+    def add_host(self, name, group=None, variables=None):
+        self.order.setdefault(name, len(self.order))
+        self.host_vars[name].update(variables or {})
+        if group:
+            self.group_hosts[group].add(name)
+
+    def add_child(self, parent, child):
+        self.parents[child].add(parent)
+
+    def _ancestors(self, group, seen):
+        for parent in self.parents.get(group, ()):
+            if parent not in seen:
+                seen.add(parent)
+                self._ancestors(parent, seen)
+        return seen
+
+    def _depth(self, group, depths, stack=()):
+        if group not in depths:
+            parents = [p for p in self.parents.get(group, ()) if p not in stack]
+            depths[group] = 1 + max((self._depth(p, depths, stack + (group,)) for p in parents), default=-1)
+        return depths[group]
+
+    # 变量优先级：父分组 < 子分组 < 主机变量
+    def servers(self):
+        host_groups = defaultdict(set)
+        for group, hosts in self.group_hosts.items():
+            for name in hosts:
+                host_groups[name].add(group)
+
+        depths = {}
+        servers = {}
+        for name in sorted(self.host_vars, key=self.order.__getitem__):
+            groups = {"all"}
+            for group in host_groups[name]:
+                groups.add(group)
+                self._ancestors(group, groups)
+
+            variables = {}
+            for group in sorted(groups, key=lambda g: (self._depth(g, depths), g)):
+                variables.update(self.group_vars.get(group, {}))
+            variables.update(self.host_vars[name])
+
+            servers[name] = {
+                "host": variables.get("ansible_host", name),
+                "user": variables.get("ansible_user"),
+                "password": variables.get("ansible_password") or variables.get("ansible_ssh_pass"),
+                "groups": groups,
+                "tags": variables.get("tags"),
+                "vars": {k: v for k, v in variables.items() if k not in CONNECTION_VARS}
+            }
+        return servers
+
+
+# 展开主机名中的范围，例如 web[01:20].example.com、db-[a:c]
+def _expand_hosts(pattern):
+    match = re.search(r"\[([0-9a-z]+):([0-9a-z]+)\]", pattern)
+    if not match:
+        return [pattern]
+    start, end = match.groups()
+    prefix, suffix = pattern[:match.start()], pattern[match.end():]
+    if start.isdigit() and end.isdigit():
+        width = len(start) if start.startswith("0") else 0
+        values = [str(i).zfill(width) for i in range(int(start), int(end) + 1)]
+    else:
+        values = [chr(c) for c in range(ord(start), ord(end) + 1)]
+    return [host for value in values for host in _expand_hosts(prefix + value + suffix)]
+
+
+def _parse_ini_value(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _load_ini(path, data):
+    section, kind = "ungrouped", "hosts"
+    with open(path) as f:
+        for raw in f:
+            line = raw.strip()
+            if not line or line[0] in "#;":
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                section, _, kind = line[1:-1].partition(":")
+                kind = kind or "hosts"
+                continue
+
+            if kind == "vars":
+                key, _, value = line.partition("=")
+                data.group_vars[section][key.strip()] = _parse_ini_value(value.strip())
+            elif kind == "children":
+                data.add_child(section, line)
+            else:
+                parts = shlex.split(line, comments=True)
+                variables = {}
+                for item in parts[1:]:
+                    key, _, value = item.partition("=")
+                    variables[key] = _parse_ini_value(value)
+                for name in _expand_hosts(parts[0]):
+                    data.add_host(name, section, variables)
+
+
+def _load_yaml_group(group, node, data):
+    node = node or {}
+    for pattern, variables in (node.get("hosts") or {}).items():
+        for name in _expand_hosts(str(pattern)):
+            data.add_host(name, group, variables)
+    data.group_vars[group].update(node.get("vars") or {})
+    for child, child_node in (node.get("children") or {}).items():
+        data.add_child(group, child)
+        _load_yaml_group(child, child_node, data)
+
+
+def _load_yaml(path, data):
+    import yaml
+
+    with open(path) as f:
+        document = yaml.safe_load(f) or {}
+    for group, node in document.items():
+        _load_yaml_group(group, node, data)
+
+
+# 动态inventory的 --list 输出：{分组: {"hosts": [...], "vars": {...}, "children": [...]}, "_meta": {"hostvars": {...}}}
+def _load_script_output(document, data):
+    hostvars = (document.get("_meta") or {}).get("hostvars") or {}
+    for group, node in document.items():
+        if group == "_meta":
+            continue
+        if isinstance(node, list):
+            node = {"hosts": node}
+        for name in node.get("hosts") or []:
+            data.add_host(name, group, hostvars.get(name))
+        data.group_vars[group].update(node.get("vars") or {})
+        for child in node.get("children") or []:
+            data.add_child(group, child)
+    for name, variables in hostvars.items():
+        data.add_host(name, None, variables)
+
+
+def _load_script(path, data):
+    process = subprocess.run([path, "--list"], capture_output=True, text=True, timeout=120)
+    if process.returncode != 0:
+        raise RuntimeError(f"动态inventory脚本执行失败: {process.stderr.strip() or process.returncode}")
+    _load_script_output(json.loads(process.stdout), data)
+
+
+def _load_path(path, data):
+    if os.path.isdir(path):
+        for entry in sorted(os.listdir(path)):
+            if entry.startswith(".") or entry.endswith(IGNORED_EXTENSIONS) or entry in VARS_DIRS:
+                continue
+            _load_path(os.path.join(path, entry), data)
+    elif os.access(path, os.X_OK):
+        _load_script(path, data)
+    elif path.endswith((".yml", ".yaml", ".json")):
+        _load_yaml(path, data)
+    else:
+        _load_ini(path, data)
+
+
+def _load_vars_file(path):
+    import yaml
+
+    with open(path) as f:
+        variables = yaml.safe_load(f) or {}
+    if not isinstance(variables, dict):
+        raise ValueError(f"变量文件格式错误（应为键值映射）: {path}")
+    return variables
+
+
+# 一个分组或主机的变量：同名文件，或同名目录下按文件名顺序合并的所有文件
+def _read_vars(vars_dir, name):
+    variables = {}
+    for extension in VARS_EXTENSIONS:
+        path = os.path.join(vars_dir, name + extension)
+        if os.path.isfile(path):
+            variables.update(_load_vars_file(path))
+    directory = os.path.join(vars_dir, name)
+    if os.path.isdir(directory):
+        for entry in sorted(os.listdir(directory)):
+            if not entry.startswith(".") and not entry.endswith(IGNORED_EXTENSIONS):
+                variables.update(_load_vars_file(os.path.join(directory, entry)))
+    return variables
+
+
+def _vars_names(vars_dir):
+    names = set()
+    for entry in os.listdir(vars_dir):
+        if entry.startswith(".") or entry.endswith(IGNORED_EXTENSIONS):
+            continue
+        root, extension = os.path.splitext(entry)
+        names.add(root if extension in VARS_EXTENSIONS else entry)
+    return sorted(names)
+
+
+# 合并 group_vars/、host_vars/ 中的变量；优先级高于inventory中同一分组、主机的变量，host_vars 不新增主机
+def _load_vars_dirs(base, data):
+    group_dir = os.path.join(base, "group_vars")
+    if os.path.isdir(group_dir):
+        for group in _vars_names(group_dir):
+            data.group_vars[group].update(_read_vars(group_dir, group))
+    host_dir = os.path.join(base, "host_vars")
+    if os.path.isdir(host_dir):
+        for name in _vars_names(host_dir):
+            if name in data.host_vars:
+                data.host_vars[name].update(_read_vars(host_dir, name))
+
+
+# inventory来源对应的变量目录所在目录：目录本身，或文件、脚本所在的目录
+def _vars_base(path):
+    return path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+
+
+def _sqlite_path(source):
+    return source[len("sqlite:///"):] if source.startswith("sqlite:///") else source
+
+
+def _load_sqlite(path):
+    fleet = Fleet()
+    with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as conn:
+        groups = defaultdict(list)
+        for group, name in conn.execute("SELECT grp, name FROM host_groups"):
+            groups[name].append(group)
+        for name, host, user, password, tags, variables in conn.execute(
+            "SELECT name, host, user, password, tags, vars FROM hosts ORDER BY rowid"
+        ):
+            fleet.add(name, {
+                "host": host, "user": user, "password": password,
+                "groups": groups.get(name), "tags": tags, "vars": json.loads(variables or "{}")
+            })
+    return fleet
+
+
+# 把服务器清单写入SQLite（整体替换），便于从其他系统导入大量服务器
+def write_fleet_db(path, servers):
+    with sqlite3.connect(path) as conn:
+        conn.executescript(FLEET_DB_SCHEMA)
+        conn.execute("DELETE FROM hosts")
+        conn.execute("DELETE FROM host_groups")
+        conn.executemany(
+            "INSERT INTO hosts (name, host, user, password, tags, vars) VALUES (?, ?, ?, ?, ?, ?)",
+            [(name, c["host"], c.get("user") or "root", c.get("password"), ",".join(_as_list(c.get("tags"))),
+              json.dumps(c.get("vars") or {})) for name, c in servers.items()]
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO host_groups (grp, name) VALUES (?, ?)",
+            [(group, name) for name, c in servers.items() for group in _as_list(c.get("groups"))]
+        )
+
+
+# 按来源加载服务器清单；source 默认取 INVENTORY_SOURCE
+def load_fleet(source=None):
+    source = INVENTORY_SOURCE if source is None else source
+    if not source:
+        return Fleet(load_servers_from_env())
+    if source.startswith("sqlite:///") or source.endswith((".db", ".sqlite")):
+        return _load_sqlite(_sqlite_path(source))
+
+    data = _InventoryData()
+    if source.startswith("script:"):
+        path = source[len("script:"):]
+        _load_script(path, data)
+    else:
+        path = source
+        _load_path(path, data)
+    _load_vars_dirs(_vars_base(path), data)
+    return Fleet(data.servers())
+
+
+# 目录下所有文件的修改时间（包括子目录，例如 group_vars/ 中的文件）
+def _tree_signature(path):
+    signature = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            signature.append((os.path.relpath(full, path), os.stat(full).st_mtime_ns))
+    return tuple(signature)
+
+
+# 来源的变化标记：文件和目录按修改时间，脚本按缓存时间分段；标记不变时可以复用已加载的清单
+def fleet_signature(source=None):
+    source = INVENTORY_SOURCE if source is None else source
+    if not source:
+        payload = json.dumps(sorted((k, v) for k, v in os.environ.items() if k.startswith("SERVER_")))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    if source.startswith("script:"):
+        return int(time.time() // max(INVENTORY_SCRIPT_TTL, 1))
+
+    path = _sqlite_path(source)
+    if os.path.isfile(path) and os.access(path, os.X_OK) and not path.endswith((".db", ".sqlite")):
+        return int(time.time() // max(INVENTORY_SCRIPT_TTL, 1))
+    try:
+        if os.path.isdir(path):
+            return _tree_signature(path)
+        base = _vars_base(path)
+        return (os.stat(path).st_mtime_ns,) + tuple(_tree_signature(os.path.join(base, d)) for d in VARS_DIRS)
+    except OSError:
+        return None
+
+
+_current_fleet = {}
+_current_fleet_lock = threading.Lock()
+
+
+# 当前的服务器清单：来源的变化标记改变时重新加载，否则复用（后台线程使用，Web界面会话通过 st.cache_resource 加载）
+def current_fleet(source=None):
+    source = INVENTORY_SOURCE if source is None else source
+    signature = fleet_signature(source)
+    with _current_fleet_lock:
+        cached = _current_fleet.get(source)
+        if cached is None or cached[0] != signature:
+            cached = _current_fleet[source] = (signature, load_fleet(source))
+        return cached[1]
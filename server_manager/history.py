@@ -0,0 +1,310 @@
+"""执行历史：结束的任务压缩归档并写入SQLite索引，按保留期和容量清理
+
+ansible-runner 每次执行都会在任务工作目录的 artifacts/ 下生成一个目录，每个事件一个JSON文件。
+任务结束后事件被合并为一个 gzip 压缩的 JSON Lines 文件，并按时间、主机、模块和状态建立索引，原始目录随工作目录清理；
+未能归档的目录（包括进程中断前的执行）被移到共享的 artifacts/ 下，在宽限期后导入并删除。
+"""
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from .events import iter_archive_events, iter_artifact_events
+
+JOB_HISTORY_DB = os.path.join('ansible_logs', 'job_history.db')
+JOB_ARCHIVE_DIR = os.path.join('ansible_logs', 'job_archive')
+ARTIFACTS_DIR = 'artifacts'
+
+# 原始artifacts目录在任务结束后保留的秒数
+ARTIFACT_GRACE_SECONDS = int(os.getenv("ARTIFACT_GRACE_SECONDS", "600"))
+
+# 合并同一主机多个结果时的严重程度，高的覆盖低的
+HOST_STATUS_SEVERITY = {"skipped": 0, "ok": 1, "changed": 2, "failed": 3, "unreachable": 3}
+
+
+class JobHistory:
+    # 扫描遗留artifacts目录、执行保留策略的最小间隔（秒）
+    MAINTAIN_INTERVAL = 300
+
+    def __init__(self, path=JOB_HISTORY_DB, archive_dir=JOB_ARCHIVE_DIR, artifacts_dir=ARTIFACTS_DIR,
+                 max_age_days=30, max_bytes=500 * 1024 * 1024, artifact_grace=ARTIFACT_GRACE_SECONDS):
+        self.path = path
+        self.archive_dir = archive_dir
+        self.artifacts_dir = artifacts_dir
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.artifact_grace = artifact_grace
+        self._lock = threading.Lock()
+        self._maintain_lock = threading.Lock()  # 同一时间只有一次清理在执行
+        self._last_maintain = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    description TEXT,
+                    kind TEXT,
+                    target TEXT,
+                    host_pattern TEXT,
+                    status TEXT,
+                    rc INTEGER,
+                    started REAL,
+                    finished REAL NOT NULL,
+                    hosts INTEGER,
+                    ok INTEGER,
+                    failed INTEGER,
+                    unreachable INTEGER,
+                    events INTEGER,
+                    archive TEXT,
+                    archive_bytes INTEGER,
+                    artifact_dir TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, finished)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_target ON jobs (target, finished)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_hosts (
+                    host TEXT NOT NULL,
+                    finished REAL NOT NULL,
+                    job_id TEXT NOT NULL,
+                    status TEXT,
+                    PRIMARY KEY (host, finished, job_id)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS job_hosts_job ON job_hosts (job_id)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # 记录一次结束的任务：事件写入压缩归档，汇总写入索引
+    def record(self, job_id, description, kind, target, host_pattern, status, rc, started, events,
+               artifact_dir=None, finished=None):
+        finished = finished or time.time()
+        archive = self._write_archive(job_id, finished, events)
+
+        host_status = {}
+        for event in events:
+            # 同一主机在playbook中有多个任务时，以最差的结果为准
+            if not event.host or not event.status:
+                continue
+            status = "changed" if event.status == "ok" and event.res.get("changed") else event.status
+            if HOST_STATUS_SEVERITY[status] > HOST_STATUS_SEVERITY.get(host_status.get(event.host), -1):
+                host_status[event.host] = status
+        counts = {state: sum(1 for s in host_status.values() if s == state) for state in ("ok", "changed", "failed", "unreachable")}
+        counts["ok"] += counts["changed"]
+
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, description, kind, target, host_pattern, status, rc, started, finished,
+                 len(host_status), counts["ok"], counts["failed"], counts["unreachable"],
+                 len(events), archive, os.path.getsize(archive), artifact_dir)
+            )
+            conn.execute("DELETE FROM job_hosts WHERE job_id = ?", (job_id,))
+            conn.executemany(
+                "INSERT INTO job_hosts VALUES (?, ?, ?, ?)",
+                [(host, finished, job_id, state) for host, state in host_status.items()]
+            )
+
+        self._maintain_in_background()
+
+    def _write_archive(self, job_id, finished, events):
+        day_dir = os.path.join(self.archive_dir, time.strftime("%Y-%m-%d", time.localtime(finished)))
+        os.makedirs(day_dir, exist_ok=True)
+        path = os.path.join(day_dir, f"{job_id}.jsonl.gz")
+        with gzip.open(f"{path}.tmp", "wt", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event.to_dict(), ensure_ascii=False, default=str))
+                f.write("\n")
+        os.replace(f"{path}.tmp", path)
+        return path
+
+    # 逐个读取归档中的主机结果（HostEvent），event_filter 指定保留的字段
+    def load_events(self, job_id, **kwargs):
+        with self._connect() as conn:
+            row = conn.execute("SELECT archive FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or not os.path.exists(row[0]):
+            return iter(())
+        return iter_archive_events(row[0], **kwargs)
+
+    # 按条件查询历史任务（按结束时间倒序），返回 (记录列表, 总数)
+    def query(self, since=None, until=None, host=None, target=None, status=None, limit=50, offset=0):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("j.finished >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("j.finished < ?")
+            params.append(until)
+        if target:
+            clauses.append("j.target = ?")
+            params.append(target)
+        if status:
+            clauses.append("j.status = ?")
+            params.append(status)
+
+        source = "jobs j"
+        if host:
+            source = "job_hosts h JOIN jobs j ON j.id = h.job_id"
+            clauses.append("h.host = ?")
+            params.append(host)
+            clauses = [c.replace("j.finished", "h.finished") for c in clauses]
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        columns = ("id", "description", "kind", "target", "host_pattern", "status", "rc",
+                   "started", "finished", "hosts", "ok", "failed", "unreachable", "events", "archive_bytes")
+
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM {source} {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {', '.join(f'j.{c}' for c in columns)} FROM {source} {where} "
+                f"ORDER BY j.finished DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+
+        return [dict(zip(columns, row)) for row in rows], total
+
+    # 已记录的目标（模块名或playbook）和主机，用于界面筛选
+    def distinct(self, column):
+        table, field = {"target": ("jobs", "target"), "host": ("job_hosts", "host")}[column]
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute(f"SELECT DISTINCT {field} FROM {table} ORDER BY {field}")]
+
+    def stats(self):
+        with self._connect() as conn:
+            jobs, archive_bytes, oldest = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(archive_bytes), 0), MIN(finished) FROM jobs"
+            ).fetchone()
+        pending = len(self._artifact_dirs())
+        return {"jobs": jobs, "archive_bytes": archive_bytes, "oldest": oldest, "artifact_dirs": pending}
+
+    def _artifact_dirs(self):
+        if not os.path.isdir(self.artifacts_dir):
+            return []
+        return [entry.path for entry in os.scandir(self.artifacts_dir) if entry.is_dir()]
+
+    # 清理：删除宽限期已过的原始目录，归档遗留目录，执行保留期和容量限制
+    def maintain(self):
+        with self._maintain_lock:
+            return self._maintain()
+
+    def _maintain(self):
+        self._last_maintain = time.time()
+        compacted = self.compact_artifacts()
+        removed = self.enforce_retention()
+        return {"compacted": compacted, "removed": removed}
+
+    # 任务结束时调用（在 ansible-runner 的回调线程中）：到了清理间隔且没有清理在执行时，在后台线程中清理，不阻塞任务结束
+    def _maintain_in_background(self):
+        if time.time() - self._last_maintain < self.MAINTAIN_INTERVAL or not self._maintain_lock.acquire(blocking=False):
+            return
+        self._last_maintain = time.time()
+
+        def run():
+            try:
+                self._maintain()
+            finally:
+                self._maintain_lock.release()
+
+        threading.Thread(target=run, name="job-history-maintain", daemon=True).start()
+
+    # 处理 artifacts/ 下的目录：已归档的直接删除，未归档的（例如进程中断前的执行）先归档再删除
+    def compact_artifacts(self):
+        cutoff = time.time() - self.artifact_grace
+        with self._connect() as conn:
+            archived = {
+                os.path.basename(row[0])
+                for row in conn.execute("SELECT artifact_dir FROM jobs WHERE artifact_dir IS NOT NULL")
+            }
+
+        compacted = 0
+        for path in self._artifact_dirs():
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+                # rc文件在执行结束时写入；没有rc的目录可能仍在运行，超过一天才视为中断的执行
+                if not os.path.exists(os.path.join(path, "rc")) and os.path.getmtime(path) > time.time() - 86400:
+                    continue
+                if os.path.basename(path) not in archived:
+                    self._import_artifact_dir(path)
+                shutil.rmtree(path)
+                compacted += 1
+            except (OSError, ValueError):
+                continue
+        return compacted
+
+    def _import_artifact_dir(self, path):
+        ident = os.path.basename(path)
+        events = list(iter_artifact_events(path))
+
+        def read(name, default=None):
+            try:
+                with open(os.path.join(path, name)) as f:
+                    return f.read().strip()
+            except OSError:
+                return default
+
+        command = json.loads(read("command", "{}")).get("command", [])
+        if "-m" in command:
+            kind, target = "adhoc", command[command.index("-m") + 1]
+            args = command[command.index("-a") + 1] if "-a" in command else ""
+            description = f"{target} {args}".strip()
+            # 较长的主机列表以 --limit @文件 传入，主机模式为 all
+            host_pattern = command[command.index("--limit") + 1] if "--limit" in command else command[-1]
+        else:
+            kind = "playbook"
+            target = next((arg for arg in command if arg.endswith((".yml", ".yaml"))), "")
+            description = f"playbook {target}"
+            host_pattern = command[command.index("--limit") + 1] if "--limit" in command else "all"
+        rc = read("rc")
+        finished = os.path.getmtime(os.path.join(path, "rc")) if rc is not None else os.path.getmtime(path)
+
+        self.record(
+            ident, description, kind, target, host_pattern,
+            read("status", "unknown"), int(rc) if rc and rc.lstrip("-").isdigit() else None,
+            os.path.getmtime(os.path.join(path, "command")) if os.path.exists(os.path.join(path, "command")) else None,
+            events, artifact_dir=ident, finished=finished
+        )
+
+    # 删除超过保留期的记录，总归档大小超过上限时从最早的开始删除
+    def enforce_retention(self):
+        cutoff = time.time() - self.max_age_days * 86400
+        with self._lock, self._connect() as conn:
+            expired = conn.execute("SELECT id, archive FROM jobs WHERE finished < ?", (cutoff,)).fetchall()
+            total = conn.execute("SELECT COALESCE(SUM(archive_bytes), 0) FROM jobs WHERE finished >= ?", (cutoff,)).fetchone()[0]
+            if total > self.max_bytes:
+                for job_id, archive, size in conn.execute(
+                    "SELECT id, archive, archive_bytes FROM jobs WHERE finished >= ? ORDER BY finished", (cutoff,)
+                ):
+                    expired.append((job_id, archive))
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+
+            for job_id, archive in expired:
+                if archive and os.path.exists(archive):
+                    os.remove(archive)
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id, _ in expired])
+            conn.executemany("DELETE FROM job_hosts WHERE job_id = ?", [(job_id,) for job_id, _ in expired])
+
+        # 删除已清空的日期目录
+        if os.path.isdir(self.archive_dir):
+            for entry in os.scandir(self.archive_dir):
+                if entry.is_dir() and not os.listdir(entry.path):
+                    os.rmdir(entry.path)
+        return len(expired)
+
+
+# 按环境变量配置保留策略创建执行历史
+def job_history_from_env():
+    return JobHistory(
+        JOB_HISTORY_DB,
+        max_age_days=int(os.getenv("JOB_HISTORY_RETENTION_DAYS", "30")),
+        max_bytes=int(os.getenv("JOB_HISTORY_MAX_MB", "500")) * 1024 * 1024
+    )
@@ -0,0 +1,123 @@
+"""Ansible inventory生成：内容哈希不变时不重写hosts.yml"""
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from .config import host_alias
+from .fleet import load_fleet
+
+INVENTORY_PATH = 'ansible_inventory/hosts.yml'
+
+# 连接插件：ssh（默认，配合ControlPersist复用连接）或 paramiko（仅在单次执行内复用连接）
+SSH_CONNECTION_TYPE = os.getenv("ANSIBLE_CONNECTION_TYPE", "ssh")
+
+
+# 构造inventory内容；服务器的分组写为 all 的子分组，便于直接使用Ansible的主机模式
+def build_inventory(servers):
+    inventory = {
+        "all": {
+            "hosts": {},
+            "vars": {
+                "ansible_connection": SSH_CONNECTION_TYPE,
+                "ansible_ssh_common_args": "-o StrictHostKeyChecking=no",
+                "ansible_python_interpreter": "/usr/bin/python3"
+            }
+        }
+    }
+    children = {}
+
+    for name, config in servers.items():
+        # 确保必要信息存在；没有密码时使用SSH密钥（可在 vars 中指定 ansible_ssh_private_key_file）
+        if not config["host"]:
+            continue
+        alias = host_alias(name)
+        host = {"ansible_host": config["host"], "ansible_user": config["user"]}
+        if config.get("password"):
+            host["ansible_password"] = config["password"]
+        host.update(config.get("vars") or {})
+        inventory["all"]["hosts"][alias] = host
+        for group in config.get("groups") or ():
+            children.setdefault(group, {"hosts": {}})["hosts"][alias] = None
+
+    if children:
+        inventory["all"]["children"] = children
+    return inventory
+
+
+# inventory管理：按生成内容的哈希判断是否需要重写hosts.yml
+class InventoryManager:
+    DIGEST_PREFIX = "# inventory-digest: "
+
+    def __init__(self, path=INVENTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._digest = None
+        self._memo = (None, None, None)     # 服务器清单（Fleet）未修改时复用上次的哈希
+
+    # 对生成的inventory取哈希，服务器配置或连接设置（如 ANSIBLE_CONNECTION_TYPE）变化时都会重写
+    @staticmethod
+    def digest(servers):
+        payload = json.dumps(build_inventory(servers), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # 读取已有文件头部记录的哈希（进程重启后避免一次多余的重写）
+    def _digest_on_disk(self):
+        try:
+            with open(self.path) as f:
+                first_line = f.readline().rstrip("\n")
+        except OSError:
+            return None
+        if first_line.startswith(self.DIGEST_PREFIX):
+            return first_line[len(self.DIGEST_PREFIX):]
+        return None
+
+    # 原子写入：先写临时文件，再rename覆盖，其他会话不会读到写了一半的文件
+    def _write(self, servers, digest):
+        import yaml
+
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".hosts-", suffix=".yml")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(f"{self.DIGEST_PREFIX}{digest}\n")
+                yaml.dump(build_inventory(servers), f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    # 确保inventory与服务器配置一致，返回inventory路径
+    def sync(self, servers):
+        revision = getattr(servers, "revision", None)
+        memo_servers, memo_revision, digest = self._memo
+        if revision is None or memo_servers is not servers or memo_revision != revision:
+            digest = self.digest(servers)
+            if revision is not None:
+                self._memo = (servers, revision, digest)
+
+        with self._lock:
+            if self._digest is None:
+                self._digest = self._digest_on_disk()
+            if digest != self._digest or not os.path.exists(self.path):
+                self._write(servers, digest)
+                self._digest = digest
+
+        return self.path
+
+
+# 进程内默认的inventory管理器（命令行和脚本使用）
+@functools.lru_cache(maxsize=None)
+def default_inventory_manager():
+    return InventoryManager(INVENTORY_PATH)
+
+
+# 生成Ansible inventory文件（内容未变化时直接返回已缓存的路径）
+def generate_inventory(servers=None, manager=None):
+    if servers is None:
+        servers = load_fleet()
+    return (manager or default_inventory_manager()).sync(servers)
@@ -0,0 +1,436 @@
+"""后台任务：基于ansible_runner.run_async的任务注册表，支持状态查询和取消
+
+主机列表较长的ad-hoc任务按主机拆分为多个分片，每个分片是一次独立的ansible-runner执行
+（各自的Ansible控制进程和工作目录），同时运行以利用多个CPU核心；分片的事件合并到同一个任务中。
+"""
+import functools
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from .connections import default_connection_manager
+from .events import DEFAULT_FILTER
+from .inventory import default_inventory_manager
+from .perf import JobTiming, default_perf_recorder
+from .workspace import default_workspace_pool
+
+logger = logging.getLogger(__name__)
+
+JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", "100"))
+
+# 分片数上限（默认CPU核心数），以及每个分片至少包含的主机数；主机数不足两个分片时不拆分
+JOB_SHARDS = int(os.getenv("JOB_SHARDS", "0")) or os.cpu_count() or 1
+JOB_SHARD_MIN_HOSTS = int(os.getenv("JOB_SHARD_MIN_HOSTS", "100"))
+
+# 主机列表达到该数量时写入文件，以 --limit @文件 传给Ansible，不受单个命令行参数的长度限制（MAX_ARG_STRLEN）
+JOB_LIMIT_FILE_MIN_HOSTS = int(os.getenv("JOB_LIMIT_FILE_MIN_HOSTS", "100"))
+
+# 结束状态的优先级：任一分片取消/超时/失败时，整个任务即为该状态
+SHARD_STATUS_ORDER = ["canceled", "timeout", "failed", "successful"]
+
+
+# 后台任务：包装一次异步的ansible-runner执行；事件到达时按 event_filter 投影为 HostEvent，不保留完整事件
+class AnsibleJob:
+    def __init__(self, job_id, description, sink=None, event_filter=DEFAULT_FILTER):
+        self.id = job_id
+        self.description = description
+        self.created = datetime.now()
+        self.runner = None
+        self.thread = None
+        self.workspace = None
+        self.limit_file = None
+        self.events = []  # 已到达的主机结果，用于在任务结束前展示部分结果
+        self.sink = sink  # 作为分片时，事件同时追加到所属任务的列表
+        self.event_filter = event_filter
+        self._cancel_requested = threading.Event()
+        # 各阶段的时间点（time.monotonic()），由 JobManager 和事件回调记录
+        self.submitted = time.monotonic()
+        self.started = None
+        self.first_event = None
+        self.last_result = None
+        self.inventory_seconds = None
+        self.host_durations = {}
+
+    # 每个事件到达时由ansible-runner回调，返回True表示仍写入artifacts
+    def _on_event(self, event):
+        now = time.monotonic()
+        if self.first_event is None:
+            self.first_event = now
+        record = self.event_filter.project(event)
+        if record is not None:
+            self.last_result = now
+            # 同一主机在playbook中有多个任务时累加
+            duration = (event.get("event_data") or {}).get("duration")
+            if duration is not None and record.host:
+                self.host_durations[record.host] = self.host_durations.get(record.host, 0.0) + duration
+            self.events.append(record)
+            if self.sink is not None:
+                self.sink.append(record)
+        return True
+
+    def timing(self, status, kind):
+        return _job_timing(self, status, kind)
+
+    def _should_cancel(self):
+        return self._cancel_requested.is_set()
+
+    @property
+    def status(self):
+        if self.runner is None:
+            return "pending"
+        if self._cancel_requested.is_set() and not self.done():
+            return "canceling"
+        return self.runner.status
+
+    def done(self):
+        return self.thread is not None and not self.thread.is_alive()
+
+    def cancel(self):
+        self._cancel_requested.set()
+
+    def wait(self, timeout=None):
+        self.thread.join(timeout)
+        return self.runner
+
+
+# 任务结束时的阶段耗时：提交、启动、首个事件、最后一个主机结果和结束的时间点之间的间隔
+def _job_timing(job, status, kind):
+    finished = time.monotonic()
+    started = job.started or job.submitted
+    first_event = job.first_event or finished
+    last_result = job.last_result or first_event
+    phases = {} if job.inventory_seconds is None else {"inventory": job.inventory_seconds}
+    phases.update(
+        startup=first_event - started,
+        execution=last_result - first_event,
+        finish=finished - last_result,
+        total=finished - job.submitted
+    )
+    return JobTiming(job.id, job.description, kind, status, time.time(), phases, dict(job.host_durations))
+
+
+# 拆分为多个分片同时执行的任务，接口与 AnsibleJob 相同；events 按到达顺序合并所有分片的事件
+# 所有分片结束后整个任务只归档一次、记录一次耗时（由最后结束的分片触发）
+class ShardedJob:
+    def __init__(self, job_id, description, pending=0):
+        self.id = job_id
+        self.description = description
+        self.created = datetime.now()
+        self.shards = []
+        self.events = []
+        self.submitted = time.monotonic()
+        self.inventory_seconds = None
+        self._pending = pending
+        self._pending_lock = threading.Lock()
+
+    # 分片结束（或未能启动）时调用，返回是否所有分片都已结束
+    def _shard_done(self, count=1):
+        with self._pending_lock:
+            self._pending -= count
+            return self._pending == 0
+
+    # 整个任务的时间点：最早的启动和首个事件、最晚的主机结果
+    @property
+    def started(self):
+        return min((shard.started for shard in self.shards if shard.started), default=None)
+
+    @property
+    def first_event(self):
+        return min((shard.first_event for shard in self.shards if shard.first_event), default=None)
+
+    @property
+    def last_result(self):
+        return max((shard.last_result for shard in self.shards if shard.last_result), default=None)
+
+    @property
+    def host_durations(self):
+        return {host: seconds for shard in self.shards for host, seconds in shard.host_durations.items()}
+
+    def timing(self, status, kind):
+        return _job_timing(self, status, kind)
+
+    @property
+    def status(self):
+        if not self.done():
+            return "canceling" if any(shard.status == "canceling" for shard in self.shards) else "running"
+        return JobResult(self).status
+
+    def done(self):
+        return all(shard.done() for shard in self.shards)
+
+    def cancel(self):
+        for shard in self.shards:
+            shard.cancel()
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for shard in self.shards:
+            shard.wait(None if deadline is None else max(0, deadline - time.monotonic()))
+        return JobResult(self)
+
+
+# 任务结束后的结果，与 ansible-runner 的 Runner 有相同的 status、rc、events、stats 和 host_events()；
+# 任务结束时artifacts已归档清理，events 来自任务在内存中保留的主机结果（HostEvent.to_dict()，
+# 只包含 event_filter 保留的字段），不提供 stdout/stderr。分片任务的状态取最差的分片，rc 取最大值
+class JobResult:
+    def __init__(self, job):
+        self.job = job
+        self.runners = [shard.runner for shard in job.shards] if isinstance(job, ShardedJob) else [job.runner]
+
+    @property
+    def status(self):
+        statuses = {runner.status for runner in self.runners}
+        return next((status for status in SHARD_STATUS_ORDER if status in statuses), "failed")
+
+    @property
+    def rc(self):
+        return max((runner.rc or 0 for runner in self.runners), default=0)
+
+    @property
+    def events(self):
+        for event in list(self.job.events):
+            yield event.to_dict()
+
+    def host_events(self, host):
+        return (event for event in self.events if event["event_data"]["host"] == host)
+
+    # 每台主机各结果的次数，格式与 playbook_on_stats 相同
+    @property
+    def stats(self):
+        stats = {key: {} for key in ("skipped", "ok", "dark", "failures", "ignored", "rescued", "processed", "changed")}
+        for event in list(self.job.events):
+            key = {"ok": "ok", "failed": "failures", "unreachable": "dark", "skipped": "skipped"}.get(event.status)
+            if key is None or not event.host:
+                continue
+            stats["processed"][event.host] = 1
+            stats[key][event.host] = stats[key].get(event.host, 0) + 1
+            if event.res.get("changed"):
+                stats["changed"][event.host] = stats["changed"].get(event.host, 0) + 1
+        return stats
+
+
+# 任务注册表：按任务ID保存最近的后台任务
+# 任务执行依赖的inventory和SSH连接管理器由注册表持有，后台线程提交任务时无需访问Streamlit缓存
+# 指定 history 时，任务结束后事件归档到执行历史
+# 指定 workspaces（WorkspacePool）时每个任务使用独立的工作目录，否则所有任务共用当前目录
+# shards 为单个任务最多拆分的分片数（1 表示不拆分）；指定 perf（PerfRecorder）时记录每个任务各阶段的耗时
+# 主机数达到 limit_file_min_hosts 的主机列表通过文件传入
+class JobManager:
+    def __init__(self, inventory, connections, max_jobs=JOB_HISTORY_LIMIT, history=None, workspaces=None,
+                 shards=JOB_SHARDS, shard_min_hosts=JOB_SHARD_MIN_HOSTS, perf=None,
+                 limit_file_min_hosts=JOB_LIMIT_FILE_MIN_HOSTS):
+        self.inventory = inventory
+        self.connections = connections
+        self.max_jobs = max_jobs
+        self.history = history
+        self.workspaces = workspaces
+        self.shards = shards
+        self.shard_min_hosts = shard_min_hosts
+        self.perf = perf
+        self.limit_file_min_hosts = limit_file_min_hosts
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    # shard=None 时只拆分ad-hoc任务；playbook中的 run_once、serial 等按整个主机列表生效，需要调用方明确允许
+    def submit(self, description, servers, shard=None, event_filter=None, **runner_kwargs):
+        job_id = uuid.uuid4().hex[:8]
+        event_filter = event_filter or DEFAULT_FILTER
+        submitted = time.monotonic()
+        inventory = os.path.abspath(self.inventory.sync(servers))
+        inventory_seconds = time.monotonic() - submitted
+
+        if shard is None:
+            shard = "module" in runner_kwargs
+        parts = self._split(runner_kwargs) if shard else []
+        if len(parts) > 1:
+            job = ShardedJob(job_id, description, pending=len(parts))
+            job.submitted = submitted
+            job.inventory_seconds = inventory_seconds
+            # 启动任何分片之前先登记所有分片：先启动的分片可能在后面的分片启动前就已结束
+            for index in range(1, len(parts) + 1):
+                shard_job = AnsibleJob(
+                    f"{job_id}-{index}", f"{description} [分片 {index}/{len(parts)}]", job.events, event_filter
+                )
+                shard_job.submitted = submitted
+                job.shards.append(shard_job)
+            for index, (shard_job, part_kwargs) in enumerate(zip(list(job.shards), parts)):
+                try:
+                    self._start(
+                        shard_job, inventory, part_kwargs,
+                        on_finish=lambda runner, shard=shard_job: self._finish_shard(job, shard, runner, runner_kwargs)
+                    )
+                except BaseException:
+                    # 已启动的分片取消后照常结束；未启动的分片从任务中移除并直接计为结束
+                    job.cancel()
+                    del job.shards[index:]
+                    if job._shard_done(len(parts) - index) and job.shards:
+                        self._finish_sharded(job, runner_kwargs)
+                    raise
+        else:
+            job = AnsibleJob(job_id, description, event_filter=event_filter)
+            job.submitted = submitted
+            job.inventory_seconds = inventory_seconds
+            job = self._start(job, inventory, runner_kwargs)
+
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+
+        return job
+
+    @staticmethod
+    def _hosts(runner_kwargs):
+        key = "host_pattern" if "module" in runner_kwargs else "limit"
+        return key, [host for host in (runner_kwargs.get(key) or "").split(",") if host]
+
+    # 按主机拆分：只拆分明确的主机列表（逗号分隔），不拆分分组和模式；forks 在分片之间分配，总并发数不变
+    def _split(self, runner_kwargs):
+        key, hosts = self._hosts(runner_kwargs)
+        if any(host[0] in "!&~" or ":" in host for host in hosts):
+            return []
+        count = min(self.shards, len(hosts) // self.shard_min_hosts) if self.shard_min_hosts else self.shards
+        if count < 2:
+            return []
+
+        forks = runner_kwargs.get("forks")
+        return [
+            dict(runner_kwargs, **{key: ",".join(hosts[index::count])},
+                 **({"forks": math.ceil(forks / count)} if forks else {}))
+            for index in range(count)
+        ]
+
+    # on_finish 为任务结束时的回调（默认归档、归还工作目录并记录耗时）
+    def _start(self, job, inventory, runner_kwargs, on_finish=None):
+        import ansible_runner
+
+        job.workspace = self.workspaces.acquire() if self.workspaces is not None else '.'
+        job.started = time.monotonic()
+
+        try:
+            runner_kwargs = self._limit_from_file(job, runner_kwargs)
+            job.thread, job.runner = ansible_runner.run_async(
+                private_data_dir=job.workspace,
+                inventory=inventory,
+                envvars=self.connections.runner_envvars(),
+                quiet=True,
+                event_handler=job._on_event,
+                cancel_callback=job._should_cancel,
+                finished_callback=on_finish or (lambda runner: self._finish(job, runner, runner_kwargs)),
+                **runner_kwargs
+            )
+        except BaseException:
+            self._remove_limit_file(job)
+            if self.workspaces is not None:
+                self.workspaces.release(job.workspace, archived=False)
+            raise
+        return job
+
+    # 较长的主机列表写入任务工作目录的 env/（没有工作目录池时为临时文件），ad-hoc 命令改为 all + --limit
+    def _limit_from_file(self, job, runner_kwargs):
+        key, hosts = self._hosts(runner_kwargs)
+        if len(hosts) < self.limit_file_min_hosts:
+            return runner_kwargs
+        directory = os.path.join(job.workspace, "env") if self.workspaces is not None else None
+        fd, job.limit_file = tempfile.mkstemp(dir=directory, prefix="limit-", suffix=".txt")
+        with os.fdopen(fd, "w") as f:
+            f.write("\n".join(hosts) + "\n")
+        runner_kwargs = dict(runner_kwargs, limit=f"@{job.limit_file}")
+        if key == "host_pattern":
+            runner_kwargs["host_pattern"] = "all"
+        return runner_kwargs
+
+    @staticmethod
+    def _remove_limit_file(job):
+        if job.limit_file is not None:
+            try:
+                os.unlink(job.limit_file)
+            except FileNotFoundError:
+                pass
+            job.limit_file = None
+
+    @staticmethod
+    def _describe(runner_kwargs):
+        if "module" in runner_kwargs:
+            return "adhoc", runner_kwargs["module"], runner_kwargs.get("host_pattern")
+        return "playbook", runner_kwargs.get("playbook"), runner_kwargs.get("limit")
+
+    # 在runner线程中执行：归档事件、归还工作目录，最后记录耗时
+    def _finish(self, job, runner, runner_kwargs):
+        self._complete(job, [job], runner.status, runner.rc, os.path.basename(runner.config.artifact_dir), runner_kwargs)
+
+    # 分片结束时只归还计数，最后一个分片结束后按整个任务归档和记录耗时（runner_kwargs 为拆分前的参数）
+    def _finish_shard(self, job, shard, runner, runner_kwargs):
+        shard.runner = runner
+        if job._shard_done():
+            self._finish_sharded(job, runner_kwargs)
+
+    def _finish_sharded(self, job, runner_kwargs):
+        result = JobResult(job)
+        # 各分片的artifacts目录不记入执行历史；归档失败时它们移到共享目录，由执行历史按分片导入
+        self._complete(job, job.shards, result.status, result.rc, None, runner_kwargs)
+
+    def _complete(self, job, parts, status, rc, artifact_dir, runner_kwargs):
+        archived = self._archive(job, status, rc, artifact_dir, runner_kwargs)
+        for part in parts:
+            self._remove_limit_file(part)
+            if self.workspaces is not None:
+                self.workspaces.release(part.workspace, archived=archived)
+        if self.perf is not None:
+            try:
+                self.perf.record_job(job.timing(status, self._describe(runner_kwargs)[0]))
+            except Exception:
+                logger.exception("记录任务 %s 的耗时失败", job.id)
+
+    # 归档失败不影响任务本身的结果；返回是否已归档
+    def _archive(self, job, status, rc, artifact_dir, runner_kwargs):
+        if self.history is None:
+            return False
+        kind, target, host_pattern = self._describe(runner_kwargs)
+        try:
+            self.history.record(
+                job.id, job.description, kind, target, host_pattern, status, rc,
+                job.created.timestamp(), list(job.events), artifact_dir=artifact_dir
+            )
+        except Exception:
+            logger.exception("归档任务 %s 失败", job.id)
+            return False
+        return True
+
+    # 超出上限时丢弃最早的已结束任务
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done()]
+        while len(self._jobs) > self.max_jobs and finished:
+            del self._jobs[finished.pop(0)]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, job_ids=None):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if job_ids is not None:
+            jobs = [job for job in jobs if job.id in job_ids]
+        return jobs
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job:
+            job.cancel()
+        return job
+
+
+# 进程内默认的任务注册表（命令行和脚本使用）
+@functools.lru_cache(maxsize=None)
+def default_job_manager():
+    from .history import job_history_from_env
+
+    return JobManager(
+        default_inventory_manager(), default_connection_manager(),
+        history=job_history_from_env(), workspaces=default_workspace_pool(), perf=default_perf_recorder()
+    )
@@ -0,0 +1,128 @@
+"""全网日志搜索：过滤条件（内容、时间范围、级别）下发到每台主机本地执行，只传回匹配的行
+
+每台主机通过 script 模块运行 search_logs.py（文件日志用 tail 限定扫描范围，
+journal 用 journalctl 的时间、级别和 --grep 过滤），各主机结果按时间合并并限制总条数。
+"""
+import base64
+import heapq
+import itertools
+import json
+import os
+from dataclasses import dataclass, field
+
+from .config import host_alias
+from .runner import collect_host_results, submit_ansible_adhoc
+
+SEARCH_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ansible_scripts', 'search_logs.py')
+
+# 级别与syslog优先级一致
+LOG_LEVELS = ["emerg", "alert", "crit", "err", "warning", "notice", "info", "debug"]
+
+DEFAULT_HOST_LIMIT = 200
+DEFAULT_TOTAL_LIMIT = 1000
+DEFAULT_SCAN_BYTES = 50 * 1024 * 1024
+
+
+@dataclass
+class LogMatch:
+    server: str
+    ts: float
+    level: int
+    line: str
+
+    @property
+    def level_name(self):
+        return LOG_LEVELS[self.level] if self.level is not None else ""
+
+
+@dataclass
+class HostSearchResult:
+    server: str
+    status: str                 # ok / failed / unreachable
+    matches: list = field(default_factory=list)
+    total: int = 0              # 主机上匹配的总行数（返回的只是最新的一部分）
+    scanned_bytes: int = 0
+    error: str = None
+
+    @property
+    def truncated(self):
+        return self.total > len(self.matches)
+
+    @classmethod
+    def from_host_result(cls, server, host_result):
+        res = host_result["res"]
+        try:
+            payload = json.loads(res.get("stdout", ""))
+        except ValueError:
+            return cls(server, host_result["status"], error=res.get("msg") or res.get("stderr") or host_result["status"])
+        if "error" in payload:
+            return cls(server, "failed", error=payload["error"])
+
+        matches = [LogMatch(server, m["ts"], m["level"], m["line"]) for m in payload["matches"]]
+        return cls(server, host_result["status"], matches, payload["total"], payload["scanned_bytes"])
+
+
+# 构造查询；source="journal" 时 path 忽略，unit 可选
+def log_query(path=None, pattern="", regex=False, ignore_case=True, since=None, until=None, severity=None,
+              source="file", unit=None, limit=DEFAULT_HOST_LIMIT, scan_bytes=DEFAULT_SCAN_BYTES):
+    query = {"source": source, "pattern": pattern, "regex": regex, "ignore_case": ignore_case,
+             "limit": limit, "scan_bytes": scan_bytes}
+    if source == "journal":
+        if unit:
+            query["unit"] = unit
+    else:
+        query["path"] = path
+    for key, value in (("since", since), ("until", until), ("severity", severity)):
+        if value is not None:
+            query[key] = value
+    return query
+
+
+def _script_args(query):
+    encoded = base64.b64encode(json.dumps(query).encode("utf-8")).decode("ascii")
+    return f"{SEARCH_SCRIPT} {encoded}"
+
+
+def _describe(query):
+    target = f"journal {query.get('unit', '')}".strip() if query["source"] == "journal" else query["path"]
+    return f"日志搜索 {target}: {query['pattern']}" if query["pattern"] else f"日志搜索 {target}"
+
+
+# 提交日志搜索，立即返回任务对象；每台主机的结果在任务运行期间即可从事件中读取
+def submit_log_search(server_names, query, forks=None, servers=None, job_manager=None):
+    return submit_ansible_adhoc(
+        ",".join(host_alias(name) for name in server_names), "script", _script_args(query), forks=forks,
+        description=_describe(query), servers=servers, job_manager=job_manager
+    )
+
+
+# 按时间合并各主机的匹配（最新的在前），最多返回 total_limit 条；没有时间戳的行排在最后
+def merge_matches(host_results, total_limit=DEFAULT_TOTAL_LIMIT):
+    def key(match):
+        return match.ts if match.ts is not None else float("-inf")
+
+    streams = [sorted(r.matches, key=key, reverse=True) for r in host_results]
+    return list(itertools.islice(heapq.merge(*streams, key=key, reverse=True), total_limit))
+
+
+# 从结束的任务中提取结果，返回 (合并后的匹配列表, {服务器名: HostSearchResult})
+def log_search_results(job, server_names, total_limit=DEFAULT_TOTAL_LIMIT):
+    host_results = collect_host_results(job.events)
+    results = {}
+    for name in server_names:
+        host_result = host_results.get(host_alias(name))
+        if host_result is None:
+            results[name] = HostSearchResult(name, "unreachable", error="无执行结果")
+        else:
+            results[name] = HostSearchResult.from_host_result(name, host_result)
+    return merge_matches(results.values(), total_limit), results
+
+
+# 在多台服务器上搜索日志
+def search_logs(server_names, query, total_limit=DEFAULT_TOTAL_LIMIT, forks=None, servers=None, job_manager=None):
+    server_names = list(server_names)
+    if not server_names:
+        return [], {}
+    job = submit_log_search(server_names, query, forks, servers=servers, job_manager=job_manager)
+    job.wait()
+    return log_search_results(job, server_names, total_limit)
@@ -0,0 +1,115 @@
+"""日志跟踪：为每台主机、每个日志文件记住读取位置（inode + 字节偏移），每次只取新增的内容
+
+首次读取返回末尾若干行；之后每次轮询由 tail_log.py 从上次的位置继续读，
+日志轮转（inode变化）时先读完旧文件的剩余部分，截断时从头读取。
+"""
+import base64
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from .config import host_alias
+from .runner import collect_host_results, submit_ansible_adhoc
+
+TAIL_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ansible_scripts', 'tail_log.py')
+
+DEFAULT_INITIAL_LINES = 50
+DEFAULT_MAX_BYTES = 1024 * 1024     # 单次轮询每台主机最多传回的字节数
+DEFAULT_WINDOW_LINES = 1000         # 每台主机在界面上保留的行数
+
+
+@dataclass
+class LogCursor:
+    inode: int
+    offset: int
+
+
+@dataclass
+class TailChunk:
+    server: str
+    lines: list = field(default_factory=list)
+    bytes: int = 0
+    rotated: bool = False
+    truncated: bool = False
+    skipped: int = 0            # 超过单次上限而跳过的字节数
+    error: str = None
+
+
+# 游标通过 extra vars 传入（保存在任务工作目录的 env/extravars 中，不在命令行上）；
+# 模块参数按主机渲染，每台主机只收到自己的游标 "inode:offset"，没有游标时为 "-"
+CURSOR_VAR = "tail_log_cursors"
+
+
+def _script_args(path, initial_lines, max_bytes):
+    query = {"path": path, "lines": initial_lines, "max_bytes": max_bytes}
+    encoded = base64.b64encode(json.dumps(query).encode("utf-8")).decode("ascii")
+    return f"{TAIL_SCRIPT} {encoded} {{{{ {CURSOR_VAR}[inventory_hostname] | default('-') }}}}"
+
+
+def _cursor_vars(cursors):
+    return {CURSOR_VAR: {host_alias(name): f"{c.inode}:{c.offset}" for name, c in cursors.items()}}
+
+
+# 跟踪一组服务器上的同一个日志文件；保存游标和最近的若干行，可以放在会话状态中跨页面刷新使用
+class LogFollower:
+    def __init__(self, path, server_names, initial_lines=DEFAULT_INITIAL_LINES, max_bytes=DEFAULT_MAX_BYTES,
+                 window_lines=DEFAULT_WINDOW_LINES):
+        self.path = path
+        self.server_names = list(server_names)
+        self.initial_lines = initial_lines
+        self.max_bytes = max_bytes
+        self.cursors = {}                   # 服务器名 -> LogCursor
+        self.windows = {name: deque(maxlen=window_lines) for name in self.server_names}
+        self.errors = {}
+        self.polls = 0
+        self.bytes_transferred = 0
+        self.last_poll = None
+        self._lock = threading.Lock()
+
+    # 读取每台主机自上次以来新增的内容，返回 {服务器名: TailChunk}
+    def poll(self, forks=None, servers=None, job_manager=None):
+        with self._lock:
+            job = submit_ansible_adhoc(
+                ",".join(host_alias(name) for name in self.server_names), "script",
+                _script_args(self.path, self.initial_lines, self.max_bytes), extravars=_cursor_vars(self.cursors),
+                forks=forks, description=f"跟踪日志 {self.path}", servers=servers, job_manager=job_manager
+            )
+            job.wait()
+            host_results = collect_host_results(job.events)
+            chunks = {name: self._apply(name, host_results.get(host_alias(name))) for name in self.server_names}
+            self.polls += 1
+            self.last_poll = time.time()
+            return chunks
+
+    def _apply(self, name, host_result):
+        if host_result is None:
+            chunk = TailChunk(name, error="无执行结果")
+        else:
+            res = host_result["res"]
+            try:
+                payload = json.loads(res.get("stdout", ""))
+            except ValueError:
+                payload = {"error": res.get("msg") or res.get("stderr") or host_result["status"]}
+            if "error" in payload:
+                chunk = TailChunk(name, error=payload["error"])
+            else:
+                data = payload["data"]
+                chunk = TailChunk(
+                    name, data.splitlines(), len(data.encode("utf-8")),
+                    payload["rotated"], payload["truncated"], payload["skipped"]
+                )
+                self.cursors[name] = LogCursor(payload["inode"], payload["offset"])
+                self.bytes_transferred += chunk.bytes
+
+        if chunk.error:
+            self.errors[name] = chunk.error
+        else:
+            self.errors.pop(name, None)
+            self.windows[name].extend(chunk.lines)
+        return chunk
+
+    def lines(self, name):
+        return list(self.windows[name])
@@ -0,0 +1,127 @@
+"""资源指标采集：每台主机执行一次脚本，读取/proc后输出JSON，解析为结构化记录"""
+import json
+import os
+from dataclasses import dataclass, field
+
+from .runner import run_ansible_batch
+
+METRICS_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ansible_scripts', 'collect_metrics.py')
+
+
+@dataclass
+class DiskUsage:
+    mount: str
+    device: str
+    total_gb: float
+    used_gb: float
+    percent: float
+
+
+@dataclass
+class ProcessInfo:
+    pid: int
+    name: str
+    cpu_percent: float
+    rss_mb: float
+
+
+@dataclass
+class HostMetrics:
+    server: str
+    timestamp: float
+    cpu_count: int
+    cpu_percent: float
+    load_1: float
+    load_5: float
+    load_15: float
+    mem_total_mb: float
+    mem_used_mb: float
+    mem_percent: float
+    swap_total_mb: float
+    swap_used_mb: float
+    net_rx_kbps: float
+    net_tx_kbps: float
+    uptime_seconds: float
+    disks: list = field(default_factory=list)
+    processes: list = field(default_factory=list)
+
+    @property
+    def disk_percent(self):
+        return max((disk.percent for disk in self.disks), default=0.0)
+
+    @classmethod
+    def from_json(cls, server, payload):
+        data = json.loads(payload)
+        mb = 1024 * 1024
+        gb = mb * 1024
+        memory = data["memory"]
+        mem_used = memory["total"] - memory["available"]
+
+        disks = []
+        for disk in data["disks"]:
+            # 与df一致：已用 / (已用 + 普通用户可用)
+            capacity = disk["used"] + disk["free"]
+            disks.append(DiskUsage(
+                mount=disk["mount"],
+                device=disk["device"],
+                total_gb=round(disk["total"] / gb, 1),
+                used_gb=round(disk["used"] / gb, 1),
+                percent=round(100.0 * disk["used"] / capacity, 1) if capacity else 0.0
+            ))
+
+        return cls(
+            server=server,
+            timestamp=data["timestamp"],
+            cpu_count=data["cpu_count"],
+            cpu_percent=data["cpu_percent"],
+            load_1=data["load"][0],
+            load_5=data["load"][1],
+            load_15=data["load"][2],
+            mem_total_mb=round(memory["total"] / mb),
+            mem_used_mb=round(mem_used / mb),
+            mem_percent=round(100.0 * mem_used / memory["total"], 1) if memory["total"] else 0.0,
+            swap_total_mb=round(memory["swap_total"] / mb),
+            swap_used_mb=round((memory["swap_total"] - memory["swap_free"]) / mb),
+            net_rx_kbps=round(data["network"]["rx_bytes_per_sec"] / 1024, 1),
+            net_tx_kbps=round(data["network"]["tx_bytes_per_sec"] / 1024, 1),
+            uptime_seconds=data["uptime_seconds"],
+            disks=disks,
+            processes=[
+                ProcessInfo(p["pid"], p["name"], p["cpu_percent"], round(p["rss"] / mb, 1))
+                for p in data["processes"]
+            ]
+        )
+
+
+# 采集资源指标，返回 ({服务器名: HostMetrics}, {服务器名: 错误信息})
+# 指定 cache（ResultCache）时，ttl 秒内的重复采集直接使用缓存的结果，并发的相同采集合并为一次执行
+def collect_metrics(server_names, forks=None, store=None, servers=None, job_manager=None, cache=None, ttl=None):
+    metrics, errors = {}, {}
+    if cache is None:
+        host_results = run_ansible_batch(
+            server_names, "script", METRICS_SCRIPT, forks=forks, servers=servers, job_manager=job_manager
+        )
+    else:
+        host_results = cache.run(
+            list(server_names), "script", METRICS_SCRIPT, ttl=ttl, forks=forks, description="采集资源指标",
+            servers=servers, job_manager=job_manager
+        )
+    fresh = set()
+
+    for name, result in host_results.items():
+        if result["status"] != "ok":
+            errors[name] = result["res"].get("msg", result["status"])
+            continue
+        try:
+            metrics[name] = HostMetrics.from_json(name, result["res"].get("stdout", ""))
+        except (ValueError, KeyError, IndexError) as e:
+            errors[name] = f"指标解析失败: {e}"
+            continue
+        if result.get("cached_at") is None:
+            fresh.add(name)
+
+    # 缓存命中的指标已经写入过时序存储
+    if store is not None and fresh:
+        store.write(metrics[name] for name in fresh)
+
+    return metrics, errors
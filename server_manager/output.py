@@ -0,0 +1,167 @@
+"""命令输出存储：完整输出保存在服务端（超过阈值写入磁盘），界面只按需读取首尾、分页或搜索结果"""
+import array
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+OUTPUT_SPOOL_DIR = os.path.join('ansible_logs', 'output_spool')
+OUTPUT_SPOOL_THRESHOLD = int(os.getenv("OUTPUT_SPOOL_THRESHOLD_KB", "256")) * 1024
+
+
+# 按换行符拆分（与磁盘上按字节偏移的行号一致），忽略末尾的换行
+def _split_lines(text):
+    if not text:
+        return []
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return [line.rstrip("\r") for line in lines]
+
+
+# 一台主机的一次输出；小输出保存在内存，大输出写入磁盘并记录每行的字节偏移，分页时直接定位
+class OutputBuffer:
+    def __init__(self, server, label, text, spool_dir=None, spool_threshold=OUTPUT_SPOOL_THRESHOLD):
+        self.id = uuid.uuid4().hex[:12]
+        self.server = server
+        self.label = label
+        self.run = None
+        self.created = time.time()
+
+        data = text.encode("utf-8", "replace")
+        self.size = len(data)
+        self.path = None
+        self._lines = None
+
+        if spool_dir is None or self.size <= spool_threshold:
+            self._lines = _split_lines(text)
+            self.line_count = len(self._lines)
+            return
+
+        os.makedirs(spool_dir, exist_ok=True)
+        self.path = os.path.join(spool_dir, f"{self.id}.log")
+        with open(self.path, "wb") as f:
+            f.write(data)
+        self._offsets = array.array("q", [0])
+        position = data.find(b"\n")
+        while position != -1:
+            self._offsets.append(position + 1)
+            position = data.find(b"\n", position + 1)
+        if self._offsets[-1] == len(data):
+            self._offsets.pop()
+        self.line_count = len(self._offsets) if data else 0
+
+    @property
+    def spooled(self):
+        return self.path is not None
+
+    # 读取 [start, stop) 行
+    def lines(self, start, stop):
+        start, stop = max(start, 0), min(stop, self.line_count)
+        if start >= stop:
+            return []
+        if self._lines is not None:
+            return self._lines[start:stop]
+
+        end = self._offsets[stop] if stop < self.line_count else self.size
+        with open(self.path, "rb") as f:
+            f.seek(self._offsets[start])
+            chunk = f.read(end - self._offsets[start])
+        return _split_lines(chunk.decode("utf-8", "replace"))
+
+    def head(self, count):
+        return self.lines(0, count)
+
+    def tail(self, count):
+        return self.lines(self.line_count - count, self.line_count)
+
+    def iter_lines(self):
+        if self._lines is not None:
+            yield from self._lines
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                yield line.decode("utf-8", "replace").rstrip("\r\n")
+
+    # 搜索匹配的行，返回 ([(行号, 内容)], 是否因达到上限而截断)；行号从1开始
+    def search(self, pattern, regex=False, ignore_case=True, limit=200):
+        flags = re.IGNORECASE if ignore_case else 0
+        matcher = re.compile(pattern if regex else re.escape(pattern), flags)
+        matches = []
+        for number, line in enumerate(self.iter_lines(), 1):
+            if matcher.search(line):
+                if len(matches) >= limit:
+                    return matches, True
+                matches.append((number, line))
+        return matches, False
+
+    def read_bytes(self):
+        if self._lines is not None:
+            return "\n".join(self._lines).encode("utf-8")
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def discard(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# 进程内的输出存储：输出按所属的执行（run，例如一次命令或一个任务）分组，淘汰时整组删除，
+# 按最近访问排序，超过数量或存活时间时从最久未访问的执行开始淘汰；正在写入或读取的执行不会被淘汰
+class OutputStore:
+    def __init__(self, spool_dir=OUTPUT_SPOOL_DIR, spool_threshold=OUTPUT_SPOOL_THRESHOLD, max_entries=2000, max_age=6 * 3600):
+        self.spool_dir = spool_dir
+        self.spool_threshold = spool_threshold
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._buffers = {}
+        self._runs = OrderedDict()      # 执行 -> (最近访问时间, 输出ID列表)，按最近访问排序
+        self._lock = threading.Lock()
+        # 上次运行遗留的文件不再有对应的索引
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    # run 为输出所属的执行；未指定时每个输出单独成组
+    def put(self, server, text, label="", run=None):
+        buffer = OutputBuffer(server, label, text or "", self.spool_dir, self.spool_threshold)
+        buffer.run = run or buffer.id
+        with self._lock:
+            self._buffers[buffer.id] = buffer
+            self._touch(buffer.run).append(buffer.id)
+            self._evict(buffer.run)
+        return buffer
+
+    def get(self, buffer_id):
+        with self._lock:
+            buffer = self._buffers.get(buffer_id)
+            if buffer is not None:
+                self._touch(buffer.run)
+        return buffer
+
+    def _touch(self, run):
+        _, buffer_ids = self._runs.pop(run, (None, []))
+        self._runs[run] = (time.time(), buffer_ids)
+        return buffer_ids
+
+    def _evict(self, pinned):
+        cutoff = time.time() - self.max_age
+        for run in list(self._runs):
+            accessed, buffer_ids = self._runs[run]
+            if run == pinned or (len(self._buffers) <= self.max_entries and accessed >= cutoff):
+                break
+            for buffer_id in buffer_ids:
+                self._buffers.pop(buffer_id).discard()
+            del self._runs[run]
+
+    def stats(self):
+        with self._lock:
+            buffers = list(self._buffers.values())
+            runs = len(self._runs)
+        return {
+            "runs": runs,
+            "entries": len(buffers),
+            "bytes": sum(b.size for b in buffers),
+            "spooled": sum(1 for b in buffers if b.spooled)
+        }
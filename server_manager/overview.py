@@ -0,0 +1,101 @@
+"""集群概览：主机状态和最新指标保存为按列的类型化数据，分组分位数、排名、异常检测和热力图全部向量化计算
+
+状态为分类类型（online/offline/unknown），指标为 float32 数值列；
+按分组统计时与 Fleet.memberships() 的 (服务器, 分组) 长表连接，一台服务器可以属于多个分组。
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+STATUS_CATEGORIES = ["online", "offline", "unknown"]
+OVERVIEW_METRICS = ["cpu", "mem", "disk", "load1"]
+PERCENTILES = [0.5, 0.9, 0.99]
+
+# 只使用这段时间（秒）内采集的指标，更早的视为没有数据
+OVERVIEW_METRICS_MAX_AGE = int(os.getenv("OVERVIEW_METRICS_MAX_AGE", "600"))
+
+# 稳健z分数的阈值（基于中位数和MAD），超过时视为异常
+OUTLIER_THRESHOLD = 3.5
+
+
+# 由轮询快照和最新指标构造概览表，索引为服务器名
+def build_overview(names, snapshot, latest, now):
+    index = pd.Index(names, name="name")
+    states = pd.DataFrame.from_dict(
+        snapshot, orient="index", columns=["status", "failures", "last_checked", "next_check"]
+    ).reindex(index)
+    metrics = latest.reindex(index)
+
+    overview = pd.DataFrame({
+        "status": pd.Categorical(states["status"].fillna("unknown"), categories=STATUS_CATEGORIES),
+        "failures": states["failures"].fillna(0).astype(np.int32),
+        "last_checked": states["last_checked"].astype(np.float64),
+        "next_check": states["next_check"].astype(np.float64)
+    }, index=index)
+    for column in OVERVIEW_METRICS:
+        overview[column] = metrics[column].astype(np.float32) if column in metrics else np.float32("nan")
+    overview["metrics_age"] = now - metrics["ts"].astype(np.float64) if "ts" in metrics else np.nan
+    return overview
+
+
+def status_counts(overview):
+    return overview["status"].value_counts().reindex(STATUS_CATEGORIES, fill_value=0)
+
+
+def _by_group(overview, memberships):
+    members = memberships[memberships["name"].isin(overview.index)]
+    grouped = overview.loc[members["name"].to_numpy()]
+    return grouped.assign(group=members["group"].to_numpy())
+
+
+# 每个分组的主机数、在线数和指标分位数
+def group_summary(overview, memberships, metric):
+    data = _by_group(overview, memberships)
+    grouped = data.groupby("group", observed=True)
+    status = data["status"]
+
+    summary = pd.DataFrame({
+        "hosts": grouped.size(),
+        "online": (status == "online").groupby(data["group"], observed=True).sum(),
+        "offline": (status == "offline").groupby(data["group"], observed=True).sum(),
+        "reporting": grouped[metric].count()
+    })
+    quantiles = grouped[metric].quantile(PERCENTILES).unstack()
+    quantiles.columns = [f"p{int(q * 100)}" for q in PERCENTILES]
+    summary = summary.join(quantiles)
+    summary["max"] = grouped[metric].max()
+    return summary.sort_values("hosts", ascending=False)
+
+
+def top_n(overview, metric, n=10):
+    return overview.nlargest(n, metric)[[metric, "status"]]
+
+
+# 按分组计算稳健z分数：(值 - 分组中位数) / (1.4826 * MAD)；MAD 为 0 的分组不判定异常
+def outliers(overview, memberships, metric, threshold=OUTLIER_THRESHOLD):
+    data = _by_group(overview, memberships)[["group", metric]].dropna()
+    if data.empty:
+        return data.assign(median=[], score=[])
+
+    by_group = data.groupby("group", observed=True)[metric]
+    median = by_group.transform("median")
+    deviation = (data[metric] - median).abs()
+    mad = deviation.groupby(data["group"], observed=True).transform("median") * 1.4826
+    score = (data[metric] - median) / mad.where(mad > 0)
+
+    result = data.assign(median=median, score=score)
+    return result[result["score"].abs() > threshold].sort_values("score", ascending=False, key=np.abs)
+
+
+# 热力图数据：分组 × 指标 的统计值（长表，便于绘图）
+def heatmap_frame(overview, memberships, statistic="p90"):
+    data = _by_group(overview, memberships)
+    grouped = data.groupby("group", observed=True)[OVERVIEW_METRICS]
+    if statistic == "max":
+        table = grouped.max()
+    elif statistic == "mean":
+        table = grouped.mean()
+    else:
+        table = grouped.quantile(int(statistic[1:]) / 100)
+    return table.reset_index().melt(id_vars="group", var_name="metric", value_name="value")
@@ -0,0 +1,200 @@
+"""性能统计：记录每个任务各阶段和每台主机的耗时，计算最近任务的 p50/p95，输出 Prometheus 文本格式
+
+任务阶段（由 JobManager 记录）：
+  inventory  生成/校验inventory
+  startup    提交到收到第一个事件（ansible-runner 和 Ansible 进程启动、解析playbook）
+  execution  第一个事件到最后一个主机结果（包括SSH连接和远程执行）
+  finish     最后一个主机结果到任务结束（汇总、进程退出、归档）
+  total      提交到任务结束
+每台主机的耗时取自 ansible-runner 主机结果事件的 duration（该主机上任务开始到返回结果）。
+界面渲染的耗时由Web界面记录（render、page）。
+"""
+import functools
+import http.server
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+PERF_WINDOW = int(os.getenv("PERF_WINDOW", "500"))          # 每个阶段保留的最近样本数
+PERF_METRICS_FILE = os.getenv("PERF_METRICS_FILE", "")     # Prometheus textfile 路径（node_exporter textfile collector）
+PERF_METRICS_PORT = int(os.getenv("PERF_METRICS_PORT", "0"))  # 大于0时在该端口提供 /metrics
+# /metrics 监听的地址，默认只在本机提供（指标包含主机名和任务耗时）；需要远程采集时显式设置，例如 0.0.0.0
+PERF_METRICS_BIND = os.getenv("PERF_METRICS_BIND", "127.0.0.1")
+
+JOB_PHASES = ["inventory", "startup", "execution", "finish", "total"]
+QUANTILES = [0.5, 0.95]
+
+
+# 已排序样本的分位数（线性插值）
+def percentile(values, q):
+    if not values:
+        return None
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+@dataclass
+class JobTiming:
+    job_id: str
+    description: str
+    kind: str
+    status: str
+    finished: float
+    phases: dict = field(default_factory=dict)
+    host_durations: dict = field(default_factory=dict)     # 主机 -> 秒
+
+    def host_percentile(self, q):
+        return percentile(sorted(self.host_durations.values()), q)
+
+    @property
+    def slowest_host(self):
+        return max(self.host_durations.items(), key=lambda item: item[1], default=(None, None))
+
+
+class PerfRecorder:
+    def __init__(self, window=PERF_WINDOW, metrics_file=PERF_METRICS_FILE):
+        self.window = window
+        self.metrics_file = metrics_file
+        self.jobs = deque(maxlen=window)
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._totals = defaultdict(lambda: [0, 0.0])     # 阶段 -> [次数, 总秒数]，进程启动以来累计
+        self._job_status = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            self._samples[phase].append(seconds)
+            total = self._totals[phase]
+            total[0] += 1
+            total[1] += seconds
+
+    # 计时上下文：with recorder.timer("render"): ...
+    def timer(self, phase):
+        return _Timer(self, phase)
+
+    # 任务结束时记录各阶段和每台主机的耗时
+    def record_job(self, timing):
+        for phase, seconds in timing.phases.items():
+            self.observe(phase, seconds)
+        for seconds in timing.host_durations.values():
+            self.observe("host", seconds)
+        with self._lock:
+            self.jobs.append(timing)
+            self._job_status[timing.status] += 1
+        if self.metrics_file:
+            self.write_prometheus(self.metrics_file)
+
+    # 每个阶段最近样本的统计，返回 [{"phase", "count", "p50", "p95", "max"}]
+    def summary(self):
+        with self._lock:
+            samples = {phase: sorted(values) for phase, values in self._samples.items()}
+        return [
+            {
+                "phase": phase,
+                "count": len(values),
+                **{f"p{int(q * 100)}": percentile(values, q) for q in QUANTILES},
+                "max": values[-1]
+            }
+            for phase, values in sorted(samples.items(), key=lambda item: _phase_order(item[0]))
+            if values
+        ]
+
+    def recent_jobs(self, limit=50):
+        with self._lock:
+            return list(self.jobs)[-limit:][::-1]
+
+    # Prometheus 文本格式：分位数来自最近的样本，_sum/_count 为累计值
+    def prometheus(self):
+        with self._lock:
+            samples = {phase: sorted(values) for phase, values in self._samples.items()}
+            totals = {phase: tuple(total) for phase, total in self._totals.items()}
+            job_status = dict(self._job_status)
+
+        lines = [
+            "# HELP asm_phase_seconds Duration of job phases, hosts and page rendering (quantiles over recent samples).",
+            "# TYPE asm_phase_seconds summary"
+        ]
+        for phase in sorted(samples, key=_phase_order):
+            values = samples[phase]
+            for q in QUANTILES:
+                if values:
+                    lines.append(f'asm_phase_seconds{{phase="{phase}",quantile="{q}"}} {percentile(values, q):.6f}')
+            count, total = totals[phase]
+            lines.append(f'asm_phase_seconds_sum{{phase="{phase}"}} {total:.6f}')
+            lines.append(f'asm_phase_seconds_count{{phase="{phase}"}} {count}')
+
+        lines.append("# HELP asm_jobs_total Finished Ansible jobs by status.")
+        lines.append("# TYPE asm_jobs_total counter")
+        for status, count in sorted(job_status.items()):
+            lines.append(f'asm_jobs_total{{status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    # 原子写入，采集方不会读到写了一半的文件
+    def write_prometheus(self, path):
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".perf-", suffix=".prom")
+        with os.fdopen(fd, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+    # 在后台线程中提供 http://<host>:<port>/metrics
+    def serve(self, port, host=PERF_METRICS_BIND):
+        recorder = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = recorder.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+class _Timer:
+    def __init__(self, recorder, phase):
+        self.recorder = recorder
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        self.recorder.observe(self.phase, self.seconds)
+
+
+def _phase_order(phase):
+    order = JOB_PHASES + ["host", "render", "page"]
+    return (order.index(phase) if phase in order else len(order), phase)
+
+
+# 按环境变量创建性能统计，配置了端口时启动 /metrics 服务
+def perf_recorder_from_env():
+    recorder = PerfRecorder()
+    if PERF_METRICS_PORT:
+        recorder.serve(PERF_METRICS_PORT, PERF_METRICS_BIND)
+    return recorder
+
+
+# 进程内默认的性能统计（命令行和脚本使用）
+@functools.lru_cache(maxsize=None)
+def default_perf_recorder():
+    return PerfRecorder()
@@ -0,0 +1,164 @@
+"""只读命令的结果缓存：按 (主机, 模块, 参数, 主机配置) 缓存每台主机的结果，相同请求正在执行时合并为一次执行
+
+只用于不改变服务器状态的命令（快捷查看命令、资源指标）。未命中的主机合并为一次提交；
+同一主机的相同请求已在执行中时，后到的请求等待并共用这次执行的结果，不再重复提交。
+主机的地址、用户、密码或变量修改后键随之变化，不会把修改前的结果当作当前结果返回。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .config import host_alias
+from .fleet import load_fleet
+from .runner import collect_host_results, submit_ansible_adhoc
+
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "15"))
+
+NO_RESULT = {"status": "unreachable", "res": {"msg": "无执行结果"}}
+
+
+# 一台主机上一次正在执行的请求，结果到达后唤醒所有等待者
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class ResultCache:
+    def __init__(self, ttl=RESULT_CACHE_TTL, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()       # 键 -> (缓存时间, 主机结果)，按最近使用排序
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    # 键包含主机配置（inventory中该主机的连接信息）的哈希
+    @staticmethod
+    def _key(name, module, args, servers):
+        config = json.dumps(servers.get(name), sort_keys=True, default=str)
+        return host_alias(name), module, args, hashlib.sha256(config.encode("utf-8")).hexdigest()
+
+    # 记录一台主机的结果并唤醒等待者；只缓存成功的结果，失败和不可达的主机下次重新执行
+    def _complete(self, key, host_result):
+        with self._lock:
+            if host_result["status"] == "ok":
+                self._entries[key] = (time.time(), host_result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            flight = self._flights.pop(key, None)
+        if flight is not None:
+            flight.result = host_result
+            flight.event.set()
+
+    # 调用方中途退出（例如页面刷新）时，在后台等任务结束后再完成剩余的请求，避免其他等待者一直等待
+    def _drain(self, job, pending, keys):
+        host_results = {}
+        if job is not None:
+            job.wait()
+            host_results = collect_host_results(job.events)
+        for alias, name in pending.items():
+            self._complete(keys[name], host_results.get(alias, NO_RESULT))
+
+    # 执行只读命令，返回 {服务器名: {"status", "res", "cached_at"}}；cached_at 为缓存时间，新执行的结果为 None。
+    # on_result(服务器名, 结果) 在每台主机的结果可用时立即调用（命中的结果最先返回）
+    def run(self, server_names, module, args="", ttl=None, forks=None, description=None, servers=None,
+            job_manager=None, on_result=None, poll_interval=0.2):
+        server_names = list(server_names)
+        if servers is None:
+            servers = load_fleet()
+        ttl = self.ttl if ttl is None else ttl
+        keys = {name: self._key(name, module, args, servers) for name in server_names}
+        now = time.time()
+        results, waiting, owned = {}, {}, {}
+
+        with self._lock:
+            for name in server_names:
+                key = keys[name]
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[0] <= ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results[name] = dict(entry[1], cached_at=entry[0])
+                elif key in self._flights:
+                    self.coalesced += 1
+                    waiting[name] = self._flights[key]
+                else:
+                    self.misses += 1
+                    self._flights[key] = _Flight()
+                    owned[host_alias(name)] = name
+
+        if on_result is not None:
+            for name, result in results.items():
+                on_result(name, result)
+
+        job = None
+        seen = 0
+        try:
+            if owned:
+                job = submit_ansible_adhoc(
+                    ",".join(owned), module, args, forks=forks, description=description,
+                    servers=servers, job_manager=job_manager
+                )
+
+            while owned or waiting:
+                finished = job is None or job.done()
+                if job is not None:
+                    new_events = job.events[seen:]
+                    seen += len(new_events)
+                    for event in new_events:
+                        if event.host in owned:
+                            name = owned.pop(event.host)
+                            host_result = {"status": event.status, "res": event.res}
+                            self._complete(keys[name], host_result)
+                            results[name] = dict(host_result, cached_at=None)
+                            if on_result is not None:
+                                on_result(name, results[name])
+
+                # 任务结束仍没有事件的主机视为不可达
+                if finished:
+                    for name in owned.values():
+                        self._complete(keys[name], NO_RESULT)
+                        results[name] = dict(NO_RESULT, cached_at=None)
+                        if on_result is not None:
+                            on_result(name, results[name])
+                    owned = {}
+
+                for name, flight in list(waiting.items()):
+                    if flight.event.is_set():
+                        del waiting[name]
+                        results[name] = dict(flight.result, cached_at=None)
+                        if on_result is not None:
+                            on_result(name, results[name])
+
+                if owned or waiting:
+                    time.sleep(poll_interval)
+        finally:
+            if owned:
+                threading.Thread(target=self._drain, args=(job, dict(owned), keys), daemon=True).start()
+
+        return {name: results[name] for name in server_names if name in results}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.coalesced = 0
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "in_flight": len(self._flights),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                # 合并的请求同样没有额外执行
+                "hit_rate": (self.hits + self.coalesced) / requests if requests else 0.0
+            }
@@ -0,0 +1,118 @@
+"""滚动执行：变更类操作按批次执行，批内限制并发，失败比例超限时中止
+
+批次大小与 Ansible 的 serial 一致，可以是主机数、百分比，或逐批递增的列表（最后一项重复使用），
+例如 ["1", "10%", "50%"]：先在1台上验证，再扩大到10%，之后每批50%。
+"""
+import math
+import time
+from dataclasses import dataclass, field
+
+from .composite import CompositeResult, composite_results, step, submit_composite
+from .config import DEFAULT_FORKS
+
+
+# 解析批次大小："25%" 按主机总数的比例（至少1台），"5" 或 5 为主机数
+def parse_batch_size(spec, total):
+    spec = str(spec).strip()
+    if spec.endswith("%"):
+        size = math.floor(total * float(spec[:-1]) / 100)
+    else:
+        size = int(spec)
+    return max(1, min(size, total)) if total else 0
+
+
+# 按批次大小拆分服务器列表
+def plan_batches(server_names, serial="100%"):
+    hosts = list(server_names)
+    specs = serial if isinstance(serial, (list, tuple)) else [serial]
+    batches = []
+    start = 0
+    while start < len(hosts):
+        size = parse_batch_size(specs[min(len(batches), len(specs) - 1)], len(hosts))
+        batches.append(hosts[start:start + size])
+        start += size
+    return batches
+
+
+@dataclass
+class BatchResult:
+    index: int
+    hosts: list
+    results: dict           # {服务器名: CompositeResult}
+    failed: list            # 执行失败、不可达、超时或健康检查未通过的服务器
+    duration: float
+
+    @property
+    def fail_percentage(self):
+        return 100.0 * len(self.failed) / len(self.hosts) if self.hosts else 0.0
+
+
+@dataclass
+class RolloutResult:
+    batches: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)   # 中止后未执行的服务器
+    aborted: bool = False
+
+    @property
+    def results(self):
+        merged = {}
+        for batch in self.batches:
+            merged.update(batch.results)
+        for name in self.skipped:
+            merged[name] = CompositeResult(name, "skipped", error="滚动执行已中止，未执行")
+        return merged
+
+
+# 执行一个批次：操作和健康检查在每台主机上一次执行；超过timeout秒仍未结束时取消，没有结果的服务器记为超时
+def _run_batch(batch, steps, parallel, timeout, servers, job_manager):
+    job = submit_composite(
+        batch, steps, forks=parallel, servers=servers, job_manager=job_manager,
+        description=f"[滚动] {steps[0]['cmd']}"
+    )
+    job.wait(timeout)
+    timed_out = not job.done()
+    if timed_out:
+        job.cancel()
+        job.wait()
+    return composite_results(job, batch, missing="timeout" if timed_out else "unreachable")
+
+
+# 滚动执行：逐批执行变更并做健康检查，单批失败比例超过 max_fail_percentage 时中止后续批次
+# health_check 为操作成功后紧接着执行的shell命令（返回码为0视为健康），例如 systemctl is-active nginx
+# report 为无论成败都执行的信息收集命令（例如查询安装的版本），只展示输出，不影响结果
+def run_rollout(server_names, command, serial="25%", max_parallel=None, max_fail_percentage=0,
+                health_check=None, report=None, batch_timeout=None, pause=0, on_batch=None,
+                servers=None, job_manager=None):
+    rollout = RolloutResult()
+    batches = plan_batches(server_names, serial)
+    steps = [step("action", command)]
+    if health_check:
+        steps.append(step("health", health_check))
+    if report:
+        steps.append(step("report", report, always=True))
+
+    for index, batch in enumerate(batches):
+        started = time.time()
+        parallel = min(max_parallel or DEFAULT_FORKS, len(batch))
+        results = _run_batch(batch, steps, parallel, batch_timeout, servers, job_manager)
+
+        for result in results.values():
+            action, health = result.step("action"), result.step("health")
+            if action and action.ok and health and not health.ok:
+                result.status = "unhealthy"
+
+        failed = [name for name, result in results.items() if result.status != "ok"]
+        batch_result = BatchResult(index, batch, results, failed, time.time() - started)
+        rollout.batches.append(batch_result)
+        if on_batch:
+            on_batch(batch_result, len(batches))
+
+        if failed and batch_result.fail_percentage > max_fail_percentage:
+            rollout.aborted = True
+            rollout.skipped = [name for remaining in batches[index + 1:] for name in remaining]
+            break
+
+        if pause and index < len(batches) - 1:
+            time.sleep(pause)
+
+    return rollout
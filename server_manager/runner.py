@@ -0,0 +1,95 @@
+"""Ansible执行：提交/执行ad-hoc命令和playbook，按主机拆分结果
+
+servers 默认从环境变量读取，job_manager 默认使用进程内的任务注册表；
+Web界面会传入当前会话的服务器配置和共享的注册表。
+"""
+from .config import DEFAULT_FORKS, host_alias
+from .fleet import load_fleet
+from .jobs import JobResult, default_job_manager
+
+
+# 按主机拆分任务的事件（HostEvent），返回 {主机名: {"status": ..., "res": ...}}
+def collect_host_results(events):
+    results = {}
+
+    for event in events:
+        status = event.status
+        if status:
+            results[event.host] = {
+                "status": status,
+                "res": event.res
+            }
+
+    return results
+
+
+def _submit(description, servers, job_manager, **runner_kwargs):
+    if servers is None:
+        servers = load_fleet()
+    return (job_manager or default_job_manager()).submit(description, servers, **runner_kwargs)
+
+
+# 提交后台Ansible命令，立即返回任务对象；event_filter（EventFilter）指定任务保留的事件和结果字段
+# extravars 写入任务工作目录的 env/extravars（不占用命令行长度），模块参数中可按主机引用
+def submit_ansible_adhoc(hosts, module, args="", forks=None, description=None, servers=None, job_manager=None,
+                         event_filter=None, extravars=None):
+    return _submit(
+        description or f"{module} {args}".strip(),
+        servers,
+        job_manager,
+        event_filter=event_filter,
+        host_pattern=hosts,
+        module=module,
+        module_args=args,
+        extravars=extravars,
+        forks=forks or DEFAULT_FORKS
+    )
+
+
+# 执行Ansible命令，返回 JobResult（status、rc、events、stats 与 ansible-runner 的 Runner 相同；
+# 分片执行时合并所有分片的结果）
+def run_ansible_adhoc(hosts, module, args="", forks=None, servers=None, job_manager=None):
+    job = submit_ansible_adhoc(hosts, module, args, forks=forks, servers=servers, job_manager=job_manager)
+    job.wait()
+    return JobResult(job)
+
+
+# 批量执行Ansible命令：一次runner调用覆盖所有服务器，再按服务器拆分结果
+def run_ansible_batch(server_names, module, args="", forks=None, servers=None, job_manager=None):
+    aliases = {host_alias(name): name for name in server_names}
+    if not aliases:
+        return {}
+
+    job = submit_ansible_adhoc(",".join(aliases), module, args, forks=forks, servers=servers, job_manager=job_manager)
+    job.wait()
+    # 使用任务在内存中收到的事件，不依赖artifacts目录（任务结束后会被归档清理）
+    host_results = collect_host_results(job.events)
+
+    # 没有产生任何事件的主机（例如inventory中缺少密码）视为不可达
+    return {
+        name: host_results.get(alias, {"status": "unreachable", "res": {"msg": "无执行结果"}})
+        for alias, name in aliases.items()
+    }
+
+
+# 提交后台Ansible Playbook，立即返回任务对象
+# shard=True 允许按主机分片并行执行（playbook中没有 run_once、serial 等依赖整个主机列表的设置时）
+def submit_ansible_playbook(playbook_path, hosts="all", forks=None, description=None, servers=None, job_manager=None,
+                            shard=False, event_filter=None):
+    return _submit(
+        description or f"playbook {playbook_path}",
+        servers,
+        job_manager,
+        shard=shard,
+        event_filter=event_filter,
+        playbook=playbook_path,
+        limit=hosts,
+        forks=forks or DEFAULT_FORKS
+    )
+
+
+# 执行Ansible Playbook，返回 JobResult
+def run_ansible_playbook(playbook_path, hosts="all", forks=None, servers=None, job_manager=None):
+    job = submit_ansible_playbook(playbook_path, hosts, forks=forks, servers=servers, job_manager=job_manager)
+    job.wait()
+    return JobResult(job)
@@ -0,0 +1,143 @@
+"""后台轮询调度"""
+import logging
+import os
+import random
+import threading
+import time
+
+FLEET_POLL_INTERVAL = int(os.getenv("FLEET_POLL_INTERVAL", "60"))
+METRICS_POLL_INTERVAL = int(os.getenv("METRICS_POLL_INTERVAL", "300"))
+
+logger = logging.getLogger(__name__)
+
+
+# 后台轮询：进程内唯一的调度线程按间隔检查服务器，所有会话读取同一份快照，
+# 服务器负载不随打开页面的人数增加。
+# 每台服务器的下次检查时间带有随机抖动，batch_window 秒内到期的服务器合并为一轮（一次ansible-runner执行），
+# 默认为抖动的范围，避免抖动把一轮检查拆成许多只包含几台服务器的执行
+class FleetPoller:
+    def __init__(self, check, collect=None, interval=60, metrics_interval=0, jitter=0.1, max_backoff=900,
+                 batch_window=None, clock=time.time):
+        self.check = check        # check(服务器名列表) -> {服务器名: 结果}
+        self.collect = collect    # collect(服务器名列表)，采集指标并写入时序存储
+        self.interval = interval  # 0 表示不自动轮询，只响应手动检查
+        self.metrics_interval = metrics_interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.batch_window = 2 * jitter * interval if batch_window is None else batch_window
+        self.clock = clock
+        self._hosts = {}
+        self._cond = threading.Condition()
+        self._rounds = 0
+        self._polling = False
+        self._force_round = False
+        self._last_metrics = 0
+        self._thread = threading.Thread(target=self._run, name="fleet-poller", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    # 同步需要检查的服务器列表：新增的立即检查，删除的不再跟踪
+    def track(self, server_names):
+        with self._cond:
+            names = set(server_names)
+            for name in names - self._hosts.keys():
+                self._hosts[name] = {
+                    "status": "unknown",
+                    "failures": 0,
+                    "last_checked": None,
+                    "last_ok": None,
+                    "error": None,
+                    "next_check": 0
+                }
+                self._cond.notify_all()
+            for name in self._hosts.keys() - names:
+                del self._hosts[name]
+
+    def snapshot(self):
+        with self._cond:
+            return {name: dict(state) for name, state in self._hosts.items()}
+
+    # 立即检查所有服务器，等待本轮检查完成（或超时）
+    def poll_now(self, timeout=None):
+        with self._cond:
+            # 正在进行的一轮结束后会改写下次检查时间，所以用标记强制再检查一轮
+            self._force_round = True
+            target = self._rounds + (2 if self._polling else 1)
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._rounds >= target, timeout)
+
+    def _next_delay(self, failures):
+        if not self.interval:
+            return float("inf")
+        # 不可达的服务器按指数退避，避免反复等待连接超时
+        delay = min(self.interval * (2 ** failures), max(self.max_backoff, self.interval))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    # 本轮需要检查的服务器：最早的服务器到期后，batch_window 内将要到期的一并检查
+    def _due(self, now):
+        if self._force_round:
+            self._force_round = False
+            return list(self._hosts)
+        earliest = min((state["next_check"] for state in self._hosts.values()), default=None)
+        if earliest is None or earliest > now:
+            return []
+        horizon = now + self.batch_window
+        return [name for name, state in self._hosts.items() if state["next_check"] <= horizon]
+
+    def _run(self):
+        while True:
+            self._round()
+
+    # 执行一轮检查；没有到期的服务器时等待到最早的下次检查时间（或有新的服务器、手动检查），返回检查的服务器
+    def _round(self):
+        with self._cond:
+            now = self.clock()
+            due = self._due(now)
+            if not due:
+                next_check = min((state["next_check"] for state in self._hosts.values()), default=now + 60)
+                self._cond.wait(timeout=min(max(next_check - now, 0.5), 60))
+                return []
+            self._polling = True
+
+        try:
+            self._poll(due)
+        except Exception as e:
+            self._record(due, {}, error=str(e))
+        finally:
+            with self._cond:
+                self._polling = False
+                self._rounds += 1
+                self._cond.notify_all()
+        return due
+
+    # 先记录检查结果；指标采集失败只记日志，不影响服务器状态和退避
+    def _poll(self, due):
+        self._record(due, self.check(due))
+
+        now = self.clock()
+        if self.collect and self.metrics_interval and now - self._last_metrics >= self.metrics_interval:
+            self._last_metrics = now
+            online = [name for name, state in self.snapshot().items() if state["status"] == "online"]
+            if online:
+                try:
+                    self.collect(online)
+                except Exception:
+                    logger.exception("采集指标失败")
+
+    def _record(self, due, results, error=None):
+        now = self.clock()
+        with self._cond:
+            for name in due:
+                state = self._hosts.get(name)
+                if state is None:
+                    continue
+                result = results.get(name, {})
+                state["last_checked"] = now
+                if result.get("status") == "ok":
+                    state.update(status="online", failures=0, last_ok=now, error=None)
+                else:
+                    state["status"] = "offline"
+                    state["failures"] += 1
+                    state["error"] = error or result.get("res", {}).get("msg")
+                state["next_check"] = now + self._next_delay(state["failures"])
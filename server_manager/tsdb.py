@@ -0,0 +1,159 @@
+"""指标时序存储（SQLite）"""
+import os
+import sqlite3
+import threading
+import time
+
+METRICS_DB_PATH = os.path.join('ansible_metrics', 'metrics.db')
+
+
+# 原始数据只追加写入；表主键为(host, ts)且不使用rowid，数据按主机、时间聚簇存放，
+# 按主机和时间范围查询时只扫描对应的连续区间。
+# 原始数据按分钟、小时逐级汇总（raw -> 1m -> 1h），各级别按保留期清理。
+# 时间戳使用控制端写入时的时间（不使用远程主机的时钟），与汇总进度（watermark）使用同一个时钟。
+METRIC_COLUMNS = ["cpu", "mem", "disk", "load1", "net_rx", "net_tx"]
+
+
+class MetricsStore:
+    LEVELS = {"raw": 0, "1m": 60, "1h": 3600}
+
+    def __init__(self, path=METRICS_DB_PATH, retention=None):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # 各级别保留时长（秒）
+        self.retention = retention or {"raw": 2 * 86400, "1m": 14 * 86400, "1h": 400 * 86400}
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for level in self.LEVELS:
+                conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS metrics_{level} (
+                        host TEXT NOT NULL,
+                        ts INTEGER NOT NULL,
+                        {", ".join(f"{c} REAL" for c in METRIC_COLUMNS)},
+                        samples INTEGER NOT NULL DEFAULT 1,
+                        PRIMARY KEY (host, ts)
+                    ) WITHOUT ROWID
+                """)
+            conn.execute("CREATE TABLE IF NOT EXISTS rollup_state (level TEXT PRIMARY KEY, watermark INTEGER)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # 写入一批HostMetrics（时间戳为 received，默认当前时间），随后执行汇总和过期清理
+    def write(self, metrics, received=None):
+        ts = int(received or time.time())
+        rows = [(
+            m.server, ts, m.cpu_percent, m.mem_percent, m.disk_percent,
+            m.load_1, m.net_rx_kbps, m.net_tx_kbps
+        ) for m in metrics]
+        if not rows:
+            return
+
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR IGNORE INTO metrics_raw (host, ts, {', '.join(METRIC_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._reopen(conn, ts)
+        self.maintain()
+
+    # 写入的数据早于已汇总的时间桶时（例如汇总在写入之前刚好跨过了时间桶边界），把汇总进度退回到该时间桶，
+    # 下次汇总时重新计算这些时间桶
+    def _reopen(self, conn, ts):
+        for target in ("1m", "1h"):
+            width = self.LEVELS[target]
+            bucket = ts - ts % width
+            conn.execute("UPDATE rollup_state SET watermark = ? WHERE level = ? AND watermark > ?", (bucket, target, bucket))
+
+    # 把上一级别中已经完整结束的时间桶汇总到下一级别
+    def rollup(self, now=None):
+        now = int(now or time.time())
+        averages = ", ".join(f"SUM({c} * samples) / SUM(samples)" for c in METRIC_COLUMNS)
+
+        with self._lock, self._connect() as conn:
+            for source, target in (("raw", "1m"), ("1m", "1h")):
+                width = self.LEVELS[target]
+                row = conn.execute("SELECT watermark FROM rollup_state WHERE level = ?", (target,)).fetchone()
+                start = row[0] if row else 0
+                end = now - now % width
+                if end <= start:
+                    continue
+
+                conn.execute(f"""
+                    INSERT OR REPLACE INTO metrics_{target} (host, ts, {', '.join(METRIC_COLUMNS)}, samples)
+                    SELECT host, ts - ts % {width}, {averages}, SUM(samples)
+                    FROM metrics_{source}
+                    WHERE ts >= ? AND ts < ?
+                    GROUP BY host, ts - ts % {width}
+                """, (start, end))
+                conn.execute("INSERT OR REPLACE INTO rollup_state (level, watermark) VALUES (?, ?)", (target, end))
+
+    def enforce_retention(self, now=None):
+        now = int(now or time.time())
+        with self._lock, self._connect() as conn:
+            for level, seconds in self.retention.items():
+                conn.execute(f"DELETE FROM metrics_{level} WHERE ts < ?", (now - seconds,))
+
+    def maintain(self, now=None):
+        self.rollup(now)
+        self.enforce_retention(now)
+
+    # 根据时间跨度选择汇总级别，保证图表点数有上限
+    @staticmethod
+    def resolution_for(span_seconds):
+        if span_seconds <= 6 * 3600:
+            return "raw"
+        if span_seconds <= 3 * 86400:
+            return "1m"
+        return "1h"
+
+    # 查询时间范围内的指标，返回以时间为索引、主机为列的DataFrame
+    def query(self, column, start, end=None, hosts=None, level=None):
+        import pandas as pd
+
+        if column not in METRIC_COLUMNS:
+            raise ValueError(f"未知指标: {column}")
+        end = end or time.time()
+        level = level or self.resolution_for(end - start)
+
+        sql = f"SELECT host, ts, {column} AS value FROM metrics_{level} WHERE ts >= ? AND ts <= ?"
+        params = [int(start), int(end)]
+        if hosts:
+            sql += f" AND host IN ({', '.join('?' * len(hosts))})"
+            params.extend(hosts)
+
+        with self._connect() as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+
+        df["ts"] = pd.to_datetime(df["ts"], unit="s")
+        return df.pivot_table(index="ts", columns="host", values="value"), level
+
+    # 每台主机在 since 之后的最新一条原始数据，返回以主机为索引的DataFrame
+    def latest(self, since, hosts=None):
+        import pandas as pd
+
+        sql = f"""
+            SELECT m.host, m.ts, {', '.join(f'm.{c}' for c in METRIC_COLUMNS)}
+            FROM metrics_raw m
+            JOIN (SELECT host, MAX(ts) AS ts FROM metrics_raw WHERE ts >= ? GROUP BY host) l
+              ON m.host = l.host AND m.ts = l.ts
+        """
+        with self._connect() as conn:
+            df = pd.read_sql_query(sql, conn, params=[int(since)])
+        if hosts is not None:
+            df = df[df["host"].isin(hosts)]
+        return df.set_index("host")
+
+
+# 按环境变量配置保留期创建指标存储
+def metrics_store_from_env():
+    return MetricsStore(
+        METRICS_DB_PATH,
+        retention={
+            "raw": int(os.getenv("METRICS_RETENTION_RAW_HOURS", "48")) * 3600,
+            "1m": int(os.getenv("METRICS_RETENTION_1M_DAYS", "14")) * 86400,
+            "1h": int(os.getenv("METRICS_RETENTION_1H_DAYS", "400")) * 86400
+        }
+    )
@@ -0,0 +1,148 @@
+"""任务工作目录：每次执行使用独立的 private_data_dir，结束后放回池中复用
+
+ansible-runner 在 private_data_dir 下读取 env/、写入 artifacts/；所有任务共用 '.' 时，并发执行会互相干扰。
+每个工作目录只包含私有的 env/、artifacts/ 和指向应用目录的只读链接 project
+（runner 以 project 为工作目录，playbook 和脚本的相对路径保持不变）；inventory 以绝对路径传入，所有任务共享。
+默认放在 /dev/shm（内存文件系统）中，每个事件一个JSON文件的写入不落盘。
+
+任务结束且事件已归档后 artifacts 直接删除；未归档的移到共享的 artifacts/ 目录，由执行历史稍后导入。
+"""
+import atexit
+import functools
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+
+JOB_WORKSPACE_POOL_SIZE = int(os.getenv("JOB_WORKSPACE_POOL_SIZE", "8"))
+
+
+# 工作目录的根目录：优先使用可写的 /dev/shm
+def default_workspace_root():
+    configured = os.getenv("JOB_WORKSPACE_DIR")
+    if configured:
+        return configured
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return os.path.join("/dev/shm", "asm-workspaces")
+    return os.path.join(tempfile.gettempdir(), "asm-workspaces")
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# 工作目录池：每个进程在根目录下有自己的子目录 pool-<pid>-<id>，空闲的工作目录最多保留 max_idle 个
+class WorkspacePool:
+    def __init__(self, root=None, project_dir=".", artifacts_dir="artifacts", max_idle=JOB_WORKSPACE_POOL_SIZE):
+        self.root = root or default_workspace_root()
+        self.project_dir = os.path.abspath(project_dir)
+        self.artifacts_dir = os.path.abspath(artifacts_dir)
+        self.max_idle = max_idle
+        self.path = os.path.join(self.root, f"pool-{os.getpid()}-{uuid.uuid4().hex[:6]}")
+        self._idle = []
+        self._busy = set()
+        self._created = 0
+        self._reused = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.path, mode=0o700, exist_ok=True)
+        self.recover_stale()
+
+    def _create(self):
+        path = os.path.join(self.path, f"ws-{uuid.uuid4().hex[:8]}")
+        os.makedirs(os.path.join(path, "env"), mode=0o700)
+        os.symlink(self.project_dir, os.path.join(path, "project"))
+        self._created += 1
+        return path
+
+    # 取一个空闲的工作目录，没有时新建
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                path = self._idle.pop()
+                self._reused += 1
+            else:
+                path = self._create()
+            self._busy.add(path)
+        return path
+
+    # 任务结束后归还：已归档的artifacts删除，未归档的移到共享目录；超过空闲上限的工作目录直接删除
+    def release(self, path, archived=True):
+        self._flush_artifacts(path, archived)
+        env_dir = os.path.join(path, "env")
+        for name in os.listdir(env_dir):
+            os.unlink(os.path.join(env_dir, name))
+
+        with self._lock:
+            self._busy.discard(path)
+            if len(self._idle) < self.max_idle:
+                self._idle.append(path)
+                return
+        shutil.rmtree(path, ignore_errors=True)
+
+    def _flush_artifacts(self, path, archived):
+        artifacts = os.path.join(path, "artifacts")
+        if not os.path.isdir(artifacts):
+            return
+        for entry in os.scandir(artifacts):
+            if archived:
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.makedirs(self.artifacts_dir, exist_ok=True)
+                shutil.move(entry.path, os.path.join(self.artifacts_dir, entry.name))
+
+    # 清理已退出进程遗留的工作目录；其中的artifacts移到共享目录，由执行历史导入
+    def recover_stale(self):
+        recovered = 0
+        for entry in os.scandir(self.root):
+            parts = entry.name.split("-")
+            if not entry.is_dir() or parts[0] != "pool" or len(parts) < 3 or not parts[1].isdigit():
+                continue
+            if _pid_alive(int(parts[1])):
+                continue
+            for workspace in os.scandir(entry.path):
+                if workspace.is_dir(follow_symlinks=False):
+                    self._flush_artifacts(workspace.path, archived=False)
+            shutil.rmtree(entry.path, ignore_errors=True)
+            recovered += 1
+        return recovered
+
+    # 进程退出时删除本进程的工作目录（仍在执行的任务的artifacts保留到共享目录）
+    def close(self):
+        with self._lock:
+            busy, self._busy = list(self._busy), set()
+            self._idle = []
+        for path in busy:
+            self._flush_artifacts(path, archived=False)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "root": self.root,
+                "busy": len(self._busy),
+                "idle": len(self._idle),
+                "created": self._created,
+                "reused": self._reused
+            }
+
+
+# 按环境变量创建工作目录池，进程退出时清理
+def workspace_pool_from_env():
+    from .history import ARTIFACTS_DIR
+
+    pool = WorkspacePool(artifacts_dir=ARTIFACTS_DIR)
+    atexit.register(pool.close)
+    return pool
+
+
+# 进程内默认的工作目录池（命令行和脚本使用）
+@functools.lru_cache(maxsize=None)
+def default_workspace_pool():
+    return workspace_pool_from_env()
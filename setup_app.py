@@ -9,6 +9,7 @@ DATA_FILES = [
     ('ansible_inventory', []),
     ('ansible_playbooks', []),
     ('ansible_logs', []),
+    ('ansible_scripts', ['ansible_scripts/collect_metrics.py', 'ansible_scripts/run_steps.py', 'ansible_scripts/search_logs.py', 'ansible_scripts/tail_log.py']),
 ]
 
 OPTIONS = {
@@ -23,7 +24,7 @@ OPTIONS = {
         'CFBundleShortVersionString': "1.0.0",
         'NSHumanReadableCopyright': u"Copyright © 2024, Ansible Server Manager",
     },
-    'packages': ['streamlit', 'ansible_runner', 'pandas', 'yaml', 'dotenv'],
+    'packages': ['server_manager', 'streamlit', 'ansible_runner', 'pandas', 'yaml', 'dotenv'],
     'includes': ['streamlit', 'ansible_runner', 'pandas', 'yaml', 'dotenv'],
     'excludes': ['tkinter', 'PyQt5', 'PyQt4'],
     'iconfile': None,  # 您可以添加.icns图标文件
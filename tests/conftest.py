@@ -0,0 +1,105 @@
+import os
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+
+# 代替ansible-runner的 Runner：记录状态、返回码和artifacts目录
+class StubRunner:
+    def __init__(self, private_data_dir, ident, status, rc):
+        self.status = status
+        self.rc = rc
+        self.config = types.SimpleNamespace(artifact_dir=os.path.join(private_data_dir, "artifacts", ident))
+
+
+# 代替 ansible_runner 模块：run_async 为每台主机产生一个结果事件，results 指定主机的事件类型和结果
+# delay 为每次执行在返回结果前等待的秒数；return_delay 为 run_async 在任务结束后才返回（模拟启动较慢时回调先于返回值到达）
+class StubAnsibleRunner:
+    def __init__(self):
+        self.calls = []
+        self.results = {}
+        self.status = "successful"
+        self.delay = 0
+        self.return_delay = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def hosts(kwargs):
+        pattern = kwargs.get("limit") or kwargs.get("host_pattern") or ""
+        if pattern.startswith("@"):
+            with open(pattern[1:]) as f:
+                return [line.strip() for line in f if line.strip()]
+        return [host for host in pattern.split(",") if host]
+
+    def run_async(self, private_data_dir, event_handler, finished_callback, cancel_callback=None, **kwargs):
+        hosts = self.hosts(kwargs)
+        with self._lock:
+            self.calls.append(dict(kwargs, private_data_dir=private_data_dir, hosts=hosts))
+            ident = f"{len(self.calls):08d}-stub"
+        runner = StubRunner(private_data_dir, ident, self.status, 0 if self.status == "successful" else 2)
+
+        def run():
+            # 等待期间按 cancel_callback 取消，与 ansible-runner 相同
+            deadline = time.monotonic() + self.delay
+            while time.monotonic() < deadline:
+                if cancel_callback is not None and cancel_callback():
+                    runner.status, runner.rc = "canceled", 254
+                    finished_callback(runner)
+                    return
+                time.sleep(0.01)
+            for counter, host in enumerate(hosts, 1):
+                event, res = self.results.get(host, ("runner_on_ok", {"rc": 0, "stdout": f"{host} ok"}))
+                event_handler({"event": event, "counter": counter,
+                               "event_data": {"host": host, "task": "stub", "res": res, "duration": 0.01}})
+            finished_callback(runner)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        if self.return_delay:
+            thread.join()
+        return thread, runner
+
+
+@pytest.fixture
+def stub_runner(monkeypatch):
+    stub = StubAnsibleRunner()
+    monkeypatch.setitem(sys.modules, "ansible_runner", types.SimpleNamespace(run_async=stub.run_async))
+    return stub
+
+
+# 固定的inventory文件，代替按服务器配置生成的inventory
+class StaticInventory:
+    def __init__(self, path):
+        self.path = path
+
+    def sync(self, servers):
+        return self.path
+
+
+class NoConnections:
+    def runner_envvars(self):
+        return {}
+
+
+@pytest.fixture
+def job_manager_factory(tmp_path, stub_runner):
+    from server_manager.jobs import JobManager
+    from server_manager.workspace import WorkspacePool
+
+    inventory = tmp_path / "hosts.yml"
+    inventory.write_text("all: {}\n")
+    pools = []
+
+    def factory(**kwargs):
+        pool = WorkspacePool(root=str(tmp_path / "workspaces"), project_dir=str(tmp_path),
+                             artifacts_dir=str(tmp_path / "artifacts"))
+        pools.append(pool)
+        kwargs.setdefault("workspaces", pool)
+        return JobManager(StaticInventory(str(inventory)), NoConnections(), **kwargs)
+
+    yield factory
+    for pool in pools:
+        pool.close()
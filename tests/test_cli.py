@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from server_manager.cli import _emit_results, _select_servers, build_parser
+from server_manager.fleet import Fleet
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# 导入包和命令行模块不加载 ansible_runner、yaml、pandas、streamlit
+def test_import_skips_heavy_dependencies():
+    code = (
+        "import sys, server_manager, server_manager.cli; server_manager.build_inventory; "
+        "print(sorted(m for m in ('ansible_runner', 'yaml', 'pandas', 'streamlit') if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
+
+
+def fleet():
+    return Fleet({
+        "Server 1": {"host": "10.0.0.1", "groups": ["web"], "tags": ["prod"]},
+        "Server 2": {"host": "10.0.0.2", "groups": ["web"]},
+        "Server 3": {"host": "10.0.0.3", "groups": ["db"], "tags": ["prod"]},
+    })
+
+
+def test_select_servers_by_name_alias_and_pattern():
+    servers = fleet()
+
+    assert _select_servers(servers, None) == ["Server 1", "Server 2", "Server 3"]
+    assert _select_servers(servers, None, "web:&prod") == ["Server 1"]
+    assert _select_servers(servers, ["Server_2", "Server 3"]) == ["Server 2", "Server 3"]
+    assert _select_servers(servers, ["Server_2", "Server 3"], "web") == ["Server 2"]
+    with pytest.raises(SystemExit):
+        _select_servers(servers, ["Server 9"])
+
+
+def test_emit_results_prints_one_json_line_per_host(capsys):
+    failed = _emit_results({
+        "Server 1": {"status": "ok", "res": {"rc": 0, "stdout": "up", "cmd": "uptime"}},
+        "Server 2": {"status": "unreachable", "res": {"msg": "ssh timeout"}},
+    }, ["rc", "stdout"])
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert failed == 1
+    assert lines == [
+        {"server": "Server 1", "status": "ok", "rc": 0, "stdout": "up"},
+        {"server": "Server 2", "status": "unreachable", "error": "ssh timeout"},
+    ]
+
+
+def test_parser_requires_a_command():
+    args = build_parser().parse_args(["exec", "uptime", "--limit", "web", "--forks", "5"])
+    assert (args.command, args.limit, args.forks) == ("uptime", "web", 5)
+    with pytest.raises(SystemExit):
+        build_parser().parse_args([])
@@ -0,0 +1,63 @@
+import subprocess
+import sys
+
+from server_manager.composite import CompositeResult, _script_args, composite_results, step, submit_composite
+
+
+def run_steps(steps):
+    script, encoded = _script_args(steps).split()
+    process = subprocess.run([sys.executable, script, encoded], capture_output=True, text=True)
+    status = "ok" if process.returncode == 0 else "failed"
+    return CompositeResult.from_host_result("web 1", {"status": status, "res": {"stdout": process.stdout}})
+
+
+def test_steps_run_in_order():
+    result = run_steps([step("action", "echo restarted"), step("status", "echo active")])
+
+    assert result.status == "ok"
+    assert result.error is None
+    assert [s.name for s in result.steps] == ["action", "status"]
+    assert result.step("status").stdout == "active\n"
+
+
+# 步骤失败后跳过后续的普通步骤，always 步骤照常执行；错误信息取自失败的步骤
+def test_failed_step_skips_the_rest_except_always():
+    result = run_steps([
+        step("action", "echo broken >&2; exit 3"),
+        step("health", "echo unreachable"),
+        step("report", "echo inactive", always=True),
+    ])
+
+    assert result.status == "failed"
+    assert result.error == "broken"
+    assert result.step("action").rc == 3
+    assert result.step("health").skipped and not result.step("health").ok
+    assert result.step("report").stdout == "inactive\n"
+
+
+def test_unparsable_output_reports_the_module_error():
+    result = CompositeResult.from_host_result("web 1", {"status": "unreachable", "res": {"msg": "ssh timeout"}})
+
+    assert result.steps == []
+    assert result.error == "ssh timeout"
+
+
+def test_missing_hosts_are_unreachable(job_manager_factory, stub_runner):
+    manager = job_manager_factory()
+    job = submit_composite(["web 1"], [step("action", "true")], servers={}, job_manager=manager)
+    job.wait()
+
+    results = composite_results(job, ["web 1", "web 2"])
+    assert [call["module"] for call in stub_runner.calls] == ["script"]
+    assert results["web 2"].status == "unreachable"
+    assert results["web 2"].error == "无执行结果"
+
+
+# 脚本返回没有 steps 的错误结果时，错误作为失败的步骤显示，不会抛出异常
+def test_error_payload_becomes_a_failed_step():
+    process = subprocess.run([sys.executable, _script_args([]).split()[0], "not-base64!"], capture_output=True, text=True)
+    result = CompositeResult.from_host_result("web 1", {"status": "failed", "res": {"rc": process.returncode, "stdout": process.stdout}})
+
+    assert process.returncode == 2
+    assert [(s.name, s.rc, s.ok) for s in result.steps] == [("error", 2, False)]
+    assert result.error.startswith("无效的步骤参数")
@@ -0,0 +1,37 @@
+import socket
+import subprocess
+
+import pytest
+
+from server_manager.connections import SSHConnectionManager
+
+
+def bind(path, listen):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(path))
+    if listen:
+        sock.listen()
+        return sock
+    sock.close()
+
+
+# ssh 不存在或主进程无响应时继续处理其余的套接字，并照常清理残留的套接字文件
+@pytest.mark.parametrize("error", [FileNotFoundError("ssh"), subprocess.TimeoutExpired("ssh", 10)])
+def test_close_all_continues_after_ssh_errors(tmp_path, monkeypatch, error):
+    manager = SSHConnectionManager(str(tmp_path), 60)
+    live = bind(tmp_path / "live", listen=True)
+    bind(tmp_path / "stale", listen=False)
+    calls = []
+
+    def run(command, **kwargs):
+        calls.append(command)
+        raise error
+
+    monkeypatch.setattr(subprocess, "run", run)
+    try:
+        assert manager.close_all() == 1
+    finally:
+        live.close()
+
+    assert len(calls) == 2
+    assert manager.sockets() == [str(tmp_path / "live")]
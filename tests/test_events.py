@@ -0,0 +1,66 @@
+import gzip
+import json
+
+import pytest
+
+from server_manager.events import EventFilter, HostEvent, iter_archive_events, iter_artifact_events
+
+
+def runner_event(counter, event="runner_on_ok", host="web01", **res):
+    return {"event": event, "counter": counter, "uuid": f"uuid-{counter}", "stdout": "verbose",
+            "event_data": {"host": host, "task": "shell", "res": dict(res, invocation={"module_args": {}})}}
+
+
+def write_events(artifact_dir, events):
+    events_dir = artifact_dir / "job_events"
+    events_dir.mkdir(parents=True)
+    for event in events:
+        (events_dir / f"{event['counter']}-{event['uuid']}.json").write_text(json.dumps(event))
+
+
+# 只保留需要的结果字段，记录使用 __slots__
+def test_project_keeps_only_requested_fields():
+    event = EventFilter().project(runner_event(1, rc=0, stdout="hi", stdout_lines=["hi"]))
+
+    assert (event.event, event.counter, event.host, event.task, event.status) == ("runner_on_ok", 1, "web01", "shell", "ok")
+    assert event.res == {"rc": 0, "stdout": "hi"}
+    with pytest.raises(AttributeError):
+        event.extra = True
+
+
+def test_field_converters_and_keeping_all_fields():
+    summary = EventFilter(fields={"ansible_facts": lambda facts: facts["ansible_hostname"]})
+    event = summary.project(runner_event(1, ansible_facts={"ansible_hostname": "web01", "ansible_mounts": []}))
+    assert event.res == {"ansible_facts": "web01"}
+
+    assert "invocation" in EventFilter(fields=None).project(runner_event(1, rc=0)).res
+
+
+# 事件类型不匹配时不解码：原始文本不含保留的事件类型就直接跳过
+def test_decode_skips_unmatched_events_without_parsing():
+    event_filter = EventFilter(events=["runner_on_failed"])
+
+    assert event_filter.decode('{"event": "playbook_on_start", not json') is None
+    assert event_filter.project(runner_event(1)) is None
+    assert event_filter.decode(json.dumps(runner_event(2, "runner_on_failed", msg="boom"))).res == {"msg": "boom"}
+
+
+# 按事件序号（数字顺序）逐个读取，非主机结果的事件被跳过
+def test_artifact_events_stream_in_counter_order(tmp_path):
+    write_events(tmp_path, [runner_event(counter, host=f"web{counter:02d}") for counter in (10, 2, 1)] + [
+        {"event": "playbook_on_stats", "counter": 11, "uuid": "stats", "event_data": {}}
+    ])
+
+    assert [event.host for event in iter_artifact_events(str(tmp_path))] == ["web01", "web02", "web10"]
+    assert list(iter_artifact_events(str(tmp_path / "missing"))) == []
+
+
+def test_archive_round_trip(tmp_path):
+    path = tmp_path / "job.jsonl.gz"
+    original = [HostEvent("runner_on_failed", 3, "web01", "shell", {"rc": 2, "stderr": "no"})]
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for event in original:
+            f.write(json.dumps(event.to_dict()) + "\n")
+
+    [event] = iter_archive_events(str(path), event_filter=EventFilter(fields=["rc"]))
+    assert (event.host, event.status, event.res) == ("web01", "failed", {"rc": 2})
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from server_manager import facts
+from server_manager.facts import gather_system_info, invalidate_cached_facts, load_cached_facts
+
+
+def full_facts(host):
+    return {
+        "ansible_distribution": "Ubuntu", "ansible_distribution_version": "22.04", "ansible_kernel": "5.15",
+        "ansible_architecture": "x86_64", "ansible_processor_cores": 4, "ansible_processor": ["0", "Xeon"],
+        "ansible_memtotal_mb": 8000, "ansible_hostname": host, "ansible_default_ipv4": {"address": "10.0.0.1"},
+        "ansible_uptime_seconds": 86400, "ansible_interfaces": ["eth0", "lo"],
+        "ansible_eth0": {"ipv4": {"address": "10.0.0.1"}}, "ansible_lo": {},
+        "ansible_mounts": [{"mount": "/", "size_total": 1}] * 100,
+    }
+
+
+@pytest.fixture
+def fact_cache(tmp_path, monkeypatch, stub_runner):
+    monkeypatch.setattr(facts, "FACT_CACHE_DIR", str(tmp_path / "facts"))
+    monkeypatch.setattr(facts, "SYSTEM_INFO_PLAYBOOK", str(tmp_path / "system_info.yml"))
+    for host in ("web_1", "web_2"):
+        stub_runner.results[host] = ("runner_on_ok", {"ansible_facts": full_facts(host), "changed": False})
+    stub_runner.results["web_3"] = ("runner_on_unreachable", {"msg": "ssh timeout"})
+    return stub_runner
+
+
+def gathered_hosts(stub_runner):
+    return [call["hosts"] for call in stub_runner.calls]
+
+
+# 只保存系统信息页使用的字段，其余事实不进入缓存
+def test_gathered_facts_are_summarized_and_cached(job_manager_factory, fact_cache):
+    manager = job_manager_factory()
+    entries = gather_system_info(["web_1", "web_3"], servers={}, job_manager=manager)
+
+    summary = entries["web_1"]["facts"]
+    assert summary["distribution"] == "Ubuntu"
+    assert summary["processor"] == "Xeon"
+    assert summary["interfaces"] == {"eth0": "10.0.0.1"}
+    assert "ansible_mounts" not in summary
+    assert entries["web_3"] is None
+    assert load_cached_facts("web_1") == entries["web_1"]
+    assert load_cached_facts("web_3") is None
+
+
+# 有效期内直接使用缓存，只收集缓存缺失、过期或被单独刷新的主机
+def test_only_missing_expired_or_invalidated_hosts_are_gathered(job_manager_factory, fact_cache):
+    manager = job_manager_factory()
+    gather_system_info(["web_1", "web_2"], servers={}, job_manager=manager)
+    gather_system_info(["web_1", "web_2"], servers={}, job_manager=manager)
+    assert gathered_hosts(fact_cache) == [["web_1", "web_2"]]
+
+    invalidate_cached_facts("web_2")
+    gather_system_info(["web_1", "web_2"], servers={}, job_manager=manager)
+    gather_system_info(["web_1", "web_2"], ttl=-1, servers={}, job_manager=manager)
+    assert gathered_hosts(fact_cache)[1:] == [["web_2"], ["web_1", "web_2"]]
+
+    invalidate_cached_facts()
+    assert os.listdir(facts.FACT_CACHE_DIR) == []
+
+
+# 收集任务只请求需要的事实子集
+def test_playbook_limits_the_gather_subset(job_manager_factory, fact_cache):
+    import yaml
+
+    gather_system_info(["web_1"], servers={}, job_manager=job_manager_factory())
+
+    [call] = fact_cache.calls
+    with open(call["playbook"]) as f:
+        [play] = yaml.safe_load(f)
+    assert play["gather_facts"] is False
+    assert play["tasks"][0]["setup"]["gather_subset"] == facts.FACT_GATHER_SUBSET
@@ -0,0 +1,64 @@
+import os
+
+from server_manager.fleet import fleet_signature, load_fleet
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+# 标准的Ansible inventory目录：inventory文件 + group_vars/ + host_vars/
+def make_inventory_dir(root):
+    write(os.path.join(root, "hosts.yml"), """
+all:
+  children:
+    web:
+      hosts:
+        web01: {ansible_host: 10.0.0.1}
+        web02: {ansible_host: 10.0.0.2, ansible_user: admin}
+      vars:
+        role: frontend
+    db:
+      hosts:
+        db01: {ansible_host: 10.0.1.1}
+""")
+    write(os.path.join(root, "group_vars", "all.yml"), "ansible_user: ops\nregion: eu\n")
+    write(os.path.join(root, "group_vars", "web.yml"), "ansible_user: deploy\ntags: [nginx]\n")
+    write(os.path.join(root, "group_vars", "db", "main.yml"), "tags: postgres\n")
+    write(os.path.join(root, "host_vars", "db01.yml"), "ansible_user: dba\n")
+    write(os.path.join(root, "host_vars", "unknown.yml"), "ansible_user: nobody\n")
+    return root
+
+
+def test_inventory_dir_merges_group_and_host_vars(tmp_path):
+    fleet = load_fleet(make_inventory_dir(str(tmp_path)))
+
+    assert list(fleet) == ["web01", "web02", "db01"]
+    assert fleet["web01"]["user"] == "deploy"
+    assert fleet["web02"]["user"] == "admin"
+    assert fleet["db01"]["user"] == "dba"
+    assert fleet["web01"]["vars"] == {"role": "frontend", "region": "eu"}
+    assert fleet["db01"]["vars"] == {"region": "eu"}
+    assert fleet.select("nginx") == ["web01", "web02"]
+    assert fleet.select("postgres") == ["db01"]
+    assert fleet.groups == ["db", "web"]
+
+
+def test_inventory_file_uses_adjacent_vars_dirs(tmp_path):
+    root = make_inventory_dir(str(tmp_path))
+    fleet = load_fleet(os.path.join(root, "hosts.yml"))
+
+    assert fleet["web01"]["user"] == "deploy"
+    assert fleet["db01"]["user"] == "dba"
+
+
+def test_signature_changes_when_group_vars_change(tmp_path):
+    root = make_inventory_dir(str(tmp_path))
+    before = fleet_signature(root)
+    path = os.path.join(root, "group_vars", "web.yml")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert fleet_signature(root) != before
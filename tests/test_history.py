@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+
+from server_manager.events import HostEvent
+from server_manager.history import JobHistory
+
+
+def event(host, status, counter=0, **res):
+    name = {"ok": "runner_on_ok", "failed": "runner_on_failed", "unreachable": "runner_on_unreachable",
+            "skipped": "runner_on_skipped"}[status]
+    return HostEvent(name, counter, host, "task", res)
+
+
+# 测试中手动执行清理，不在记录时自动触发
+def make_history(tmp_path, **kwargs):
+    history = JobHistory(str(tmp_path / "history.db"), archive_dir=str(tmp_path / "archive"),
+                         artifacts_dir=str(tmp_path / "artifacts"), **kwargs)
+    history._last_maintain = time.time()
+    return history
+
+
+def record(history, job_id, events, finished=None):
+    history.record(job_id, "test", "adhoc", "shell", "all", "successful", 0, None, events, finished=finished)
+
+
+# 同一主机的多个结果按严重程度合并：后到的 skipped 不会覆盖 ok/changed
+def test_host_status_keeps_the_most_severe_result(tmp_path):
+    history = make_history(tmp_path)
+    record(history, "job1", [
+        event("web01", "ok"), event("web01", "skipped"),
+        event("web02", "ok", changed=True), event("web02", "ok"), event("web02", "skipped"),
+        event("web03", "failed"), event("web03", "ok"),
+        event("web04", "skipped"),
+    ])
+
+    [job], _ = history.query()
+    assert (job["hosts"], job["ok"], job["failed"]) == (4, 2, 1)
+    assert history.query(host="web01")[1] == 1
+    with history._connect() as conn:
+        statuses = dict(conn.execute("SELECT host, status FROM job_hosts"))
+    assert statuses == {"web01": "ok", "web02": "changed", "web03": "failed", "web04": "skipped"}
+
+
+def test_archive_round_trips_events(tmp_path):
+    history = make_history(tmp_path)
+    record(history, "job1", [event("web01", "ok", 1, stdout="hello")])
+
+    [loaded] = list(history.load_events("job1"))
+    assert (loaded.host, loaded.status, loaded.res) == ("web01", "ok", {"stdout": "hello"})
+
+
+def test_retention_removes_expired_and_oversized_jobs(tmp_path):
+    history = make_history(tmp_path, max_age_days=1)
+    record(history, "old", [event("web01", "ok")], finished=time.time() - 3 * 86400)
+    for index in range(3):
+        record(history, f"job{index}", [event("web01", "ok", stdout="x" * 1000)], finished=time.time() - 10 + index)
+    old_archive = os.path.join(str(tmp_path / "archive"), time.strftime("%Y-%m-%d", time.localtime(time.time() - 3 * 86400)))
+
+    assert history.enforce_retention() == 1
+    assert not os.path.exists(old_archive)
+
+    sizes = [job["archive_bytes"] for job in history.query()[0]]
+    history.max_bytes = sum(sizes) - 1
+    assert history.enforce_retention() == 1
+    assert [job["id"] for job in history.query()[0]] == ["job2", "job1"]
+    assert history.query(host="web01")[1] == 2
+
+
+# 任务结束时清理在后台线程中执行，同一时间只有一次
+def test_record_runs_maintenance_in_background_once(tmp_path):
+    history = make_history(tmp_path)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compact_artifacts():
+        calls.append(threading.current_thread().name)
+        started.set()
+        release.wait(5)
+        return 0
+
+    history.compact_artifacts = compact_artifacts
+    history._last_maintain = 0
+    record(history, "job1", [event("web01", "ok")])
+    assert started.wait(5)
+    history._last_maintain = 0
+    record(history, "job2", [event("web01", "ok")])
+    release.set()
+    history.maintain()
+
+    assert calls[0] == "job-history-maintain"
+    assert len(calls) == 2
+
+
+# 遗留的artifacts目录以完整的ident导入，前缀相同的执行不会互相覆盖
+def test_imported_artifact_dirs_keep_their_full_ident(tmp_path):
+    history = make_history(tmp_path, artifact_grace=0)
+    for ident in ("abcdef01-0000-4000-8000-000000000001", "abcdef01-0000-4000-8000-000000000002"):
+        path = tmp_path / "artifacts" / ident
+        path.mkdir(parents=True)
+        (path / "command").write_text(json.dumps({"command": ["ansible", "-m", "ping", "web01"]}))
+        (path / "status").write_text("successful")
+        (path / "rc").write_text("0")
+        old = time.time() - 60
+        for name in ("command", "status", "rc", ""):
+            os.utime(path / name, (old, old))
+
+    assert history.maintain()["compacted"] == 2
+    jobs, total = history.query()
+    assert total == 2
+    assert sorted(job["id"] for job in jobs) == ["abcdef01-0000-4000-8000-000000000001",
+                                                 "abcdef01-0000-4000-8000-000000000002"]
+    assert {job["host_pattern"] for job in jobs} == {"web01"}
@@ -0,0 +1,73 @@
+import os
+
+import yaml
+
+from server_manager.fleet import Fleet
+from server_manager.inventory import InventoryManager, build_inventory
+
+
+def servers():
+    return {
+        "web 1": {"host": "10.0.0.1", "user": "root", "password": "secret", "groups": ["web"]},
+        "db 1": {"host": "10.0.1.1", "user": "dba", "vars": {"ansible_port": 2222}},
+        "no host": {"host": None, "user": "root"},
+    }
+
+
+def test_inventory_contains_hosts_groups_and_credentials():
+    inventory = build_inventory(servers())
+
+    assert set(inventory["all"]["hosts"]) == {"web_1", "db_1"}
+    assert inventory["all"]["hosts"]["web_1"]["ansible_password"] == "secret"
+    assert inventory["all"]["hosts"]["db_1"]["ansible_port"] == 2222
+    assert inventory["all"]["children"] == {"web": {"hosts": {"web_1": None}}}
+
+
+# 内容不变时不重写文件；配置变化时原子替换，不留下临时文件
+def test_sync_rewrites_only_when_the_content_changes(tmp_path):
+    path = str(tmp_path / "inventory" / "hosts.yml")
+    manager = InventoryManager(path)
+    config = servers()
+
+    assert manager.sync(config) == path
+    first = os.stat(path)
+    manager.sync(servers())
+    assert os.stat(path).st_ino == first.st_ino
+
+    config["db 1"]["host"] = "10.0.1.2"
+    manager.sync(config)
+    assert os.stat(path).st_ino != first.st_ino
+    with open(path) as f:
+        assert yaml.safe_load(f)["all"]["hosts"]["db_1"]["ansible_host"] == "10.0.1.2"
+    assert os.listdir(tmp_path / "inventory") == ["hosts.yml"]
+
+
+# 进程重启后从文件头部读取哈希，内容一致时不重写；文件被删除时重新生成
+def test_digest_on_disk_survives_a_restart(tmp_path):
+    path = str(tmp_path / "hosts.yml")
+    InventoryManager(path).sync(servers())
+    inode = os.stat(path).st_ino
+
+    InventoryManager(path).sync(servers())
+    assert os.stat(path).st_ino == inode
+
+    os.remove(path)
+    InventoryManager(path).sync(servers())
+    assert os.path.exists(path)
+
+
+# Fleet 未修改（revision 不变）时复用上次的哈希，不重新生成inventory内容
+def test_unchanged_fleet_is_not_hashed_again(tmp_path, monkeypatch):
+    manager = InventoryManager(str(tmp_path / "hosts.yml"))
+    fleet = Fleet(servers())
+    digests = []
+    original = InventoryManager.digest
+    monkeypatch.setattr(InventoryManager, "digest", staticmethod(lambda s: digests.append(1) or original(s)))
+
+    for _ in range(3):
+        manager.sync(fleet)
+    assert len(digests) == 1
+
+    fleet.add("web 2", {"host": "10.0.0.2"})
+    manager.sync(fleet)
+    assert len(digests) == 2
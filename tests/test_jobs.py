@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from server_manager.jobs import JobResult, ShardedJob
+from server_manager.perf import PerfRecorder
+
+
+def hosts(count):
+    return ",".join(f"host{i:03d}" for i in range(count))
+
+
+def test_adhoc_job_collects_events_and_releases_workspace(job_manager_factory):
+    manager = job_manager_factory()
+    job = manager.submit("ping", {}, host_pattern=hosts(3), module="ping")
+    job.wait()
+
+    result = JobResult(job)
+    assert result.status == "successful"
+    assert sorted(result.stats["ok"]) == ["host000", "host001", "host002"]
+    assert manager.workspaces.stats()["busy"] == 0
+
+
+def test_sharded_job_splits_hosts_and_forks(job_manager_factory, stub_runner):
+    manager = job_manager_factory(shards=3, shard_min_hosts=2)
+    job = manager.submit("ping", {}, host_pattern=hosts(9), module="ping", forks=9)
+    job.wait()
+
+    assert isinstance(job, ShardedJob)
+    assert len(stub_runner.calls) == 3
+    assert all(call["forks"] == 3 for call in stub_runner.calls)
+    assert sorted(host for call in stub_runner.calls for host in call["hosts"]) == hosts(9).split(",")
+    assert len(job.events) == 9
+
+
+# 分片在 run_async 返回之前就已结束：所有分片仍然计入结果，工作目录全部归还，耗时只记录一次
+def test_sharded_job_completes_once_when_shards_finish_before_start_returns(job_manager_factory, stub_runner):
+    stub_runner.return_delay = True
+    stub_runner.status = "failed"
+    perf = PerfRecorder()
+    manager = job_manager_factory(shards=2, shard_min_hosts=1, perf=perf)
+    job = manager.submit("ping", {}, host_pattern=hosts(4), module="ping")
+    job.wait()
+
+    assert len(job.shards) == 2
+    assert all(shard.runner is not None for shard in job.shards)
+    assert JobResult(job).status == "failed"
+    assert JobResult(job).rc == 2
+    assert manager.workspaces.stats()["busy"] == 0
+    assert len(perf.recent_jobs()) == 1
+
+
+def test_small_host_list_is_not_sharded(job_manager_factory, stub_runner):
+    manager = job_manager_factory(shards=4, shard_min_hosts=100)
+    job = manager.submit("ping", {}, host_pattern=hosts(50), module="ping")
+    job.wait()
+
+    assert not isinstance(job, ShardedJob)
+    assert len(stub_runner.calls) == 1
+
+
+# 较长的主机列表通过 --limit @文件 传入，任务结束后文件随工作目录清理
+@pytest.mark.parametrize("pooled", [True, False])
+def test_long_host_list_is_passed_as_limit_file(job_manager_factory, stub_runner, pooled):
+    manager = job_manager_factory(shards=1, limit_file_min_hosts=10, **({} if pooled else {"workspaces": None}))
+    job = manager.submit("ping", {}, host_pattern=hosts(12), module="ping")
+    job.wait()
+
+    [call] = stub_runner.calls
+    assert call["host_pattern"] == "all"
+    assert call["limit"].startswith("@")
+    assert call["hosts"] == hosts(12).split(",")
+    assert not os.path.exists(call["limit"][1:])
+    assert len(job.events) == 12
+
+
+def test_cancel_stops_a_running_job(job_manager_factory, stub_runner):
+    stub_runner.delay = 5
+    manager = job_manager_factory()
+    job = manager.submit("sleep", {}, host_pattern=hosts(2), module="shell", module_args="sleep 60")
+
+    assert not job.done()
+    assert manager.cancel(job.id) is job
+    assert job.status in ("canceling", "canceled")
+    job.wait(5)
+
+    assert job.done()
+    assert job.status == "canceled"
+    assert JobResult(job).status == "canceled"
+    assert job.events == []
+
+
+# 注册表超过上限时只丢弃已结束的任务，按提交顺序从最早的开始
+def test_registry_prunes_oldest_finished_jobs(job_manager_factory, stub_runner):
+    manager = job_manager_factory(max_jobs=2)
+    finished = [manager.submit("ping", {}, host_pattern=hosts(1), module="ping") for _ in range(2)]
+    for job in finished:
+        job.wait()
+    stub_runner.delay = 5
+    running = manager.submit("ping", {}, host_pattern=hosts(1), module="ping")
+
+    assert manager.get(finished[0].id) is None
+    assert [job.id for job in manager.list()] == [finished[1].id, running.id]
+    assert manager.list([running.id]) == [running]
+    running.cancel()
+    running.wait(5)
@@ -0,0 +1,71 @@
+import json
+import subprocess
+import sys
+import time
+
+from server_manager.logsearch import HostSearchResult, LogMatch, _script_args, log_query, merge_matches
+
+
+def search(query):
+    script, encoded = _script_args(query).split()
+    process = subprocess.run([sys.executable, script, encoded], capture_output=True, text=True)
+    return HostSearchResult.from_host_result(
+        "web 1", {"status": "ok" if process.returncode == 0 else "failed", "res": {"stdout": process.stdout}}
+    )
+
+
+def write_log(path):
+    path.write_text(
+        "2024-05-01 10:00:00 INFO service started\n"
+        "2024-05-01 11:00:00 ERROR connection failed\n"
+        "2024-05-01 12:00:00 WARNING disk almost full\n"
+        "2024-05-01 13:00:00 ERROR connection reset\n"
+        "no timestamp error line\n"
+    )
+    return str(path)
+
+
+# 内容、时间范围和级别都在主机本地过滤，只返回最新的 limit 条，total 为全部匹配数
+def test_file_search_filters_on_the_host(tmp_path):
+    path = write_log(tmp_path / "app.log")
+    since = time.mktime((2024, 5, 1, 10, 30, 0, 0, 0, -1))
+
+    result = search(log_query(path, "connection", since=since, severity=3, limit=1))
+
+    assert result.error is None
+    assert result.total == 2 and result.truncated
+    assert [m.line for m in result.matches] == ["2024-05-01 13:00:00 ERROR connection reset"]
+    assert result.matches[0].level_name == "err"
+    assert result.scanned_bytes == (tmp_path / "app.log").stat().st_size
+
+
+def test_regex_and_case_sensitivity(tmp_path):
+    path = write_log(tmp_path / "app.log")
+
+    assert search(log_query(path, "error", ignore_case=False)).total == 1
+    assert search(log_query(path, r"connection (failed|reset)", regex=True)).total == 2
+
+
+def test_missing_file_is_reported_as_error(tmp_path):
+    result = search(log_query(str(tmp_path / "missing.log"), "x"))
+
+    assert result.status == "failed"
+    assert "No such file" in result.error
+
+
+def test_merge_keeps_newest_matches_across_hosts():
+    hosts = [
+        HostSearchResult("a", "ok", [LogMatch("a", 1.0, 3, "a1"), LogMatch("a", 5.0, 3, "a5")]),
+        HostSearchResult("b", "ok", [LogMatch("b", None, None, "b?"), LogMatch("b", 3.0, 4, "b3")]),
+    ]
+
+    assert [m.line for m in merge_matches(hosts, 3)] == ["a5", "b3", "a1"]
+    assert [m.line for m in merge_matches(hosts)][-1] == "b?"
+
+
+def test_query_only_includes_given_filters():
+    assert log_query(source="journal", unit="nginx", pattern="x") == {
+        "source": "journal", "pattern": "x", "regex": False, "ignore_case": True,
+        "limit": 200, "scan_bytes": 50 * 1024 * 1024, "unit": "nginx"
+    }
+    assert json.loads(json.dumps(log_query("/var/log/syslog", since=1.0)))["since"] == 1.0
@@ -0,0 +1,73 @@
+import json
+import subprocess
+import sys
+
+from server_manager.logtail import CURSOR_VAR, TAIL_SCRIPT, LogFollower, _script_args
+
+
+def tail(path, cursor="-", lines=2, max_bytes=1024 * 1024):
+    query = _script_args(str(path), lines, max_bytes).split()[1]
+    output = subprocess.run([sys.executable, TAIL_SCRIPT, query, cursor], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout)
+
+
+def test_tail_script_reads_only_new_complete_lines(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("one\ntwo\nthree\npartial")
+
+    first = tail(log)
+    assert first["data"] == "two\nthree\n"
+
+    with open(log, "a") as f:
+        f.write(" line\nfour\n")
+    second = tail(log, f"{first['inode']}:{first['offset']}")
+    assert second["data"] == "partial line\nfour\n"
+    assert not second["truncated"]
+
+    log.write_text("new\n")
+    third = tail(log, f"{second['inode']}:{second['offset']}")
+    assert third["truncated"] and third["data"] == "new\n"
+
+
+# 新增内容超过 max_bytes 时只读取末尾部分：跳过的字节数计入 skipped，保留的内容从完整的行开始
+def test_large_append_keeps_only_the_newest_lines(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("start\n")
+    first = tail(log)
+    cursor = f"{first['inode']}:{first['offset']}"
+
+    with open(log, "a") as f:
+        f.write("".join(f"line {i:04d}\n" for i in range(1000)))
+    result = tail(log, cursor, max_bytes=25)
+    assert result["data"] == "line 0998\nline 0999\n"
+    assert result["skipped"] == 998 * 10
+    assert result["offset"] == log.stat().st_size
+
+    # 单行超过 max_bytes 时直接截断
+    with open(log, "a") as f:
+        f.write("x" * 100 + "\n")
+    result = tail(log, f"{result['inode']}:{result['offset']}", max_bytes=25)
+    assert result["data"] == "x" * 24 + "\n"
+    assert result["skipped"] == 76
+    assert result["offset"] == log.stat().st_size
+
+
+# 每台主机只收到自己的游标：游标放在 extra vars 中，模块参数不随主机数增长
+def test_follower_passes_each_host_only_its_cursor(job_manager_factory, stub_runner):
+    manager = job_manager_factory()
+    names = ["web 01", "web 02"]
+    for offset, host in enumerate(["web_01", "web_02"], 1):
+        stub_runner.results[host] = ("runner_on_ok", {"stdout": json.dumps({
+            "rotated": False, "truncated": False, "skipped": 0, "inode": 7, "offset": offset * 10, "data": f"{host}\n"
+        })})
+    follower = LogFollower("/var/log/syslog", names)
+
+    follower.poll(servers={}, job_manager=manager)
+    follower.poll(servers={}, job_manager=manager)
+
+    first, second = stub_runner.calls
+    assert first["extravars"] == {CURSOR_VAR: {}}
+    assert second["extravars"] == {CURSOR_VAR: {"web_01": "7:10", "web_02": "7:20"}}
+    assert first["module_args"] == second["module_args"]
+    assert f"{CURSOR_VAR}[inventory_hostname]" in second["module_args"]
+    assert follower.lines("web 01") == ["web_01", "web_01"]
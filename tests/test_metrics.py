@@ -0,0 +1,66 @@
+import json
+import subprocess
+import sys
+
+from server_manager.metrics import METRICS_SCRIPT, HostMetrics, collect_metrics
+
+GB = 1024 ** 3
+
+PAYLOAD = {
+    "timestamp": 1700000000.0,
+    "cpu_count": 4,
+    "cpu_percent": 12.5,
+    "load": [0.5, 0.4, 0.3],
+    "memory": {"total": 8 * GB, "available": 6 * GB, "swap_total": GB, "swap_free": GB // 2},
+    "disks": [
+        {"mount": "/", "device": "/dev/sda1", "total": 100 * GB, "used": 40 * GB, "free": 40 * GB},
+        {"mount": "/data", "device": "/dev/sdb1", "total": 10 * GB, "used": 9 * GB, "free": GB},
+    ],
+    "network": {"rx_bytes_per_sec": 2048, "tx_bytes_per_sec": 1024},
+    "uptime_seconds": 86400,
+    "processes": [{"pid": 1, "name": "init", "cpu_percent": 0.1, "rss": 1024 * 1024}],
+}
+
+
+def test_from_json_derives_percentages():
+    metrics = HostMetrics.from_json("web 1", json.dumps(PAYLOAD))
+
+    assert metrics.mem_used_mb == 2048
+    assert metrics.mem_percent == 25.0
+    assert metrics.swap_used_mb == 512
+    # 与df一致：已用 / (已用 + 普通用户可用)，取最满的磁盘
+    assert [disk.percent for disk in metrics.disks] == [50.0, 90.0]
+    assert metrics.disk_percent == 90.0
+    assert (metrics.net_rx_kbps, metrics.net_tx_kbps) == (2.0, 1.0)
+    assert metrics.processes[0].rss_mb == 1.0
+
+
+def test_collect_script_output_parses_on_this_host():
+    output = subprocess.run([sys.executable, METRICS_SCRIPT], capture_output=True, text=True, check=True).stdout
+    metrics = HostMetrics.from_json("local", output)
+
+    assert metrics.cpu_count >= 1
+    assert 0.0 <= metrics.cpu_percent <= 100.0
+    assert metrics.mem_total_mb > 0
+
+
+# 执行失败和输出无法解析的主机记为错误，只有成功的指标写入时序存储
+def test_collect_metrics_separates_errors(job_manager_factory, stub_runner):
+    manager = job_manager_factory()
+    stub_runner.results = {
+        "web_1": ("runner_on_ok", {"stdout": json.dumps(PAYLOAD)}),
+        "web_2": ("runner_on_ok", {"stdout": "not json"}),
+        "web_3": ("runner_on_unreachable", {"msg": "ssh timeout"}),
+    }
+    written = []
+
+    class Store:
+        def write(self, metrics):
+            written.extend(m.server for m in metrics)
+
+    metrics, errors = collect_metrics(["web 1", "web 2", "web 3"], store=Store(), servers={}, job_manager=manager)
+
+    assert list(metrics) == ["web 1"]
+    assert errors["web 2"].startswith("指标解析失败")
+    assert errors["web 3"] == "ssh timeout"
+    assert written == ["web 1"]
@@ -0,0 +1,48 @@
+from server_manager.output import OutputBuffer, OutputStore
+
+
+def test_small_output_stays_in_memory():
+    buffer = OutputBuffer("web01", "cmd", "a\nb\nc\n")
+
+    assert not buffer.spooled
+    assert buffer.line_count == 3
+    assert buffer.lines(1, 10) == ["b", "c"]
+
+
+def test_large_output_is_spooled_and_paged_by_offset(tmp_path):
+    text = "".join(f"line {i}\r\n" for i in range(1000))
+    buffer = OutputBuffer("web01", "cmd", text, spool_dir=str(tmp_path), spool_threshold=100)
+
+    assert buffer.spooled
+    assert buffer.line_count == 1000
+    assert buffer.lines(500, 502) == ["line 500", "line 501"]
+    assert buffer.tail(1) == ["line 999"]
+    assert buffer.search("line 99", limit=5) == ([(100, "line 99"), *[(991 + i, f"line {990 + i}") for i in range(4)]], True)
+    buffer.discard()
+    assert not list(tmp_path.iterdir())
+
+
+# 超过容量时整组淘汰最久未访问的执行，正在写入的执行即使超过容量也完整保留
+def test_store_evicts_whole_runs(tmp_path):
+    store = OutputStore(spool_dir=str(tmp_path / "spool"), max_entries=10)
+    first = [store.put(f"host{i}", "out", run="run-1") for i in range(8)]
+    second = [store.put(f"host{i}", "out", run="run-2") for i in range(8)]
+
+    assert all(store.get(buffer.id) is None for buffer in first)
+    assert all(store.get(buffer.id) is not None for buffer in second)
+
+    large = [store.put(f"host{i}", "out", run="run-3") for i in range(50)]
+    assert all(store.get(buffer.id) is not None for buffer in large)
+    assert store.stats()["runs"] == 1
+
+
+def test_reading_a_run_keeps_it_from_eviction(tmp_path):
+    store = OutputStore(spool_dir=str(tmp_path / "spool"), max_entries=10)
+    kept = store.put("host0", "out", run="viewed")
+    store.put("host0", "out", run="stale")
+    store.get(kept.id)
+    for i in range(9):
+        store.put(f"host{i}", "out", run="new")
+
+    assert store.get(kept.id) is not None
+    assert store.stats()["runs"] == 2
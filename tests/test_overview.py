@@ -0,0 +1,56 @@
+import math
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from server_manager.fleet import UNGROUPED, Fleet  # noqa: E402
+from server_manager.overview import build_overview, group_summary, outliers, status_counts  # noqa: E402
+
+NOW = 1_700_000_000.0
+
+
+def make_overview():
+    names = [f"web{i}" for i in range(6)] + ["db0", "lone"]
+    fleet = Fleet({name: {"host": name, "groups": ["web"] if name.startswith("web") else
+                          (["db", "web"] if name == "db0" else [])} for name in names})
+    snapshot = {name: ("online", 0, NOW - 10, NOW + 50) for name in names[:6]}
+    snapshot["db0"] = ("offline", 3, NOW - 10, NOW + 50)
+    latest = pd.DataFrame({
+        "ts": [NOW - 30] * 6 + [NOW - 30],
+        "cpu": [10.0, 11.0, 12.0, 10.0, 11.0, 95.0, 50.0],
+        "mem": [40.0] * 7,
+        "disk": [20.0] * 7,
+        "load1": [0.5] * 7,
+    }, index=pd.Index(names[:7], name="host"))
+    return fleet, build_overview(names, snapshot, latest, NOW)
+
+
+def test_overview_fills_missing_hosts():
+    _, overview = make_overview()
+
+    assert overview.loc["lone", "status"] == "unknown"
+    assert math.isnan(overview.loc["lone", "cpu"])
+    assert overview.loc["db0", "failures"] == 3
+    assert overview.loc["web0", "metrics_age"] == 30
+    assert status_counts(overview).to_dict() == {"online": 6, "offline": 1, "unknown": 1}
+
+
+# 一台服务器可以属于多个分组；没有分组的服务器归入 UNGROUPED
+def test_group_summary_counts_each_membership():
+    fleet, overview = make_overview()
+    summary = group_summary(overview, fleet.memberships(), "cpu")
+
+    assert summary.loc["web", ["hosts", "online", "offline", "reporting"]].tolist() == [7, 6, 1, 7]
+    assert summary.loc["db", "max"] == 50.0
+    assert summary.loc[UNGROUPED, "reporting"] == 0
+
+
+def test_outliers_use_robust_z_score_per_group():
+    fleet, overview = make_overview()
+    found = outliers(overview, fleet.memberships(), "cpu")
+
+    assert found.index.tolist() == ["web5", "db0"]
+    assert found["group"].tolist() == ["web", "web"]
+    assert found.loc["web5", "median"] == 11.0
+    assert outliers(overview, fleet.memberships(), "mem").empty
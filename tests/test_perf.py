@@ -0,0 +1,18 @@
+import urllib.request
+
+from server_manager.perf import PerfRecorder
+
+
+# /metrics 默认只监听本机
+def test_metrics_endpoint_binds_loopback_by_default():
+    recorder = PerfRecorder(metrics_file="")
+    recorder.observe("total", 1.5)
+    server = recorder.serve(0)
+    try:
+        host, port = server.server_address
+        assert host == "127.0.0.1"
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert b"total" in response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from server_manager.resultcache import ResultCache
+
+
+def run(cache, manager, names, **kwargs):
+    return cache.run(names, "shell", "uptime", servers={}, job_manager=manager, poll_interval=0.01, **kwargs)
+
+
+def test_results_are_cached_within_ttl(job_manager_factory, stub_runner):
+    manager = job_manager_factory()
+    cache = ResultCache(ttl=60)
+
+    first = run(cache, manager, ["web 1", "web 2"])
+    second = run(cache, manager, ["web 1", "web 2", "web 3"])
+
+    assert first["web 1"]["cached_at"] is None
+    assert second["web 1"]["cached_at"] is not None
+    assert second["web 3"]["cached_at"] is None
+    assert [call["hosts"] for call in stub_runner.calls] == [["web_1", "web_2"], ["web_3"]]
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_expired_and_failed_results_are_executed_again(job_manager_factory, stub_runner):
+    manager = job_manager_factory()
+    cache = ResultCache(ttl=60)
+    stub_runner.results["web_2"] = ("runner_on_failed", {"rc": 1, "msg": "boom"})
+
+    run(cache, manager, ["web 1", "web 2"])
+    run(cache, manager, ["web 1", "web 2"])
+    run(cache, manager, ["web 1"], ttl=-1)
+
+    assert [call["hosts"] for call in stub_runner.calls] == [["web_1", "web_2"], ["web_2"], ["web_1"]]
+
+
+# 相同请求正在执行时，后到的请求等待并共用这次执行的结果
+def test_concurrent_requests_are_coalesced(job_manager_factory, stub_runner):
+    manager = job_manager_factory()
+    cache = ResultCache(ttl=60)
+    stub_runner.delay = 0.2
+    results = {}
+
+    owner = threading.Thread(target=lambda: results.setdefault("owner", run(cache, manager, ["web 1"])))
+    owner.start()
+    while not cache.stats()["in_flight"]:
+        time.sleep(0.01)
+    results["waiter"] = run(cache, manager, ["web 1"])
+    owner.join()
+
+    assert len(stub_runner.calls) == 1
+    assert cache.coalesced == 1
+    assert results["waiter"]["web 1"]["res"] == results["owner"]["web 1"]["res"]
+    assert cache.stats()["in_flight"] == 0
+
+
+# 主机的地址或凭据修改后不再返回修改前缓存的结果
+def test_changed_host_config_is_not_served_from_cache(job_manager_factory, stub_runner):
+    manager = job_manager_factory()
+    cache = ResultCache(ttl=60)
+    servers = {"web 1": {"host": "10.0.0.1", "user": "root"}}
+
+    cache.run(["web 1"], "shell", "uptime", servers=servers, job_manager=manager, poll_interval=0.01)
+    cached = cache.run(["web 1"], "shell", "uptime", servers=servers, job_manager=manager, poll_interval=0.01)
+    servers["web 1"] = {"host": "10.0.0.2", "user": "root"}
+    moved = cache.run(["web 1"], "shell", "uptime", servers=servers, job_manager=manager, poll_interval=0.01)
+
+    assert cached["web 1"]["cached_at"] is not None
+    assert moved["web 1"]["cached_at"] is None
+    assert len(stub_runner.calls) == 2
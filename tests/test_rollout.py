@@ -0,0 +1,48 @@
+import json
+
+from server_manager.rollout import parse_batch_size, plan_batches, run_rollout
+
+
+def test_parse_batch_size():
+    assert parse_batch_size("25%", 10) == 2
+    assert parse_batch_size("1%", 10) == 1
+    assert parse_batch_size(5, 3) == 3
+    assert parse_batch_size("50%", 0) == 0
+
+
+def test_plan_batches_repeats_the_last_size():
+    names = [f"web{i}" for i in range(10)]
+
+    assert plan_batches(names, "100%") == [names]
+    assert plan_batches(names, ["1", "20%", "50%"]) == [names[:1], names[1:3], names[3:8], names[8:]]
+    assert plan_batches([], "25%") == []
+    assert plan_batches((name for name in names), "50%") == [names[:5], names[5:]]
+
+
+def steps_output(*steps):
+    return json.dumps({"steps": [
+        {"name": name, "cmd": name, "rc": rc, "stdout": "", "stderr": "", "duration": 0.0} for name, rc in steps
+    ]})
+
+
+# 健康检查未通过的主机记为 unhealthy；失败比例超过上限后中止，剩余的主机记为跳过
+def test_rollout_aborts_after_unhealthy_batch(job_manager_factory, stub_runner):
+    manager = job_manager_factory()
+    stub_runner.results["web_1"] = ("runner_on_failed", {"stdout": steps_output(("action", 0), ("health", 3))})
+    for host in ("web_0", "web_2", "web_3"):
+        stub_runner.results[host] = ("runner_on_ok", {"stdout": steps_output(("action", 0), ("health", 0))})
+    batches = []
+
+    rollout = run_rollout(
+        ["web 0", "web 1", "web 2", "web 3"], "systemctl restart nginx", serial=2, max_fail_percentage=0,
+        health_check="systemctl is-active nginx", on_batch=lambda batch, total: batches.append(total),
+        servers={}, job_manager=manager
+    )
+
+    assert rollout.aborted
+    assert batches == [2]
+    assert rollout.skipped == ["web 2", "web 3"]
+    assert rollout.results["web 0"].status == "ok"
+    assert rollout.results["web 1"].status == "unhealthy"
+    assert rollout.results["web 3"].status == "skipped"
+    assert [call["hosts"] for call in stub_runner.calls] == [["web_0", "web_1"]]
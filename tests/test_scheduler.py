@@ -0,0 +1,77 @@
+from server_manager.scheduler import FleetPoller
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_poller(clock, offline=(), **kwargs):
+    rounds = []
+
+    def check(names):
+        rounds.append(sorted(names))
+        return {name: {"status": "unreachable" if name in offline else "ok", "res": {"msg": "timeout"}} for name in names}
+
+    poller = FleetPoller(check, clock=clock, **kwargs)
+    return poller, rounds
+
+
+# 抖动把下次检查时间分散在间隔附近，抖动范围内到期的服务器仍在同一轮中检查
+def test_jittered_hosts_are_polled_in_one_round():
+    clock = FakeClock()
+    poller, rounds = make_poller(clock, interval=60, jitter=0.1)
+    names = [f"web{i:02d}" for i in range(50)]
+    poller.track(names)
+
+    assert sorted(poller._round()) == names
+    next_checks = [state["next_check"] for state in poller.snapshot().values()]
+    assert len(set(next_checks)) > 1
+    assert all(clock.now + 54 <= t <= clock.now + 66 for t in next_checks)
+
+    clock.now = min(next_checks) - 1
+    assert poller._due(clock.now) == []
+    clock.now = min(next_checks)
+    poller._round()
+    assert rounds == [names, names]
+
+
+# 不可达的服务器按指数退避，间隔不超过 max_backoff；恢复后回到正常间隔
+def test_unreachable_hosts_back_off_up_to_the_cap():
+    clock = FakeClock()
+    offline = {"db01"}
+    poller, rounds = make_poller(clock, offline, interval=60, jitter=0, max_backoff=300)
+    poller.track(["db01"])
+
+    delays = []
+    for _ in range(5):
+        poller._round()
+        state = poller.snapshot()["db01"]
+        delays.append(state["next_check"] - clock.now)
+        clock.now = state["next_check"]
+    assert delays == [120, 240, 300, 300, 300]
+    assert (state["status"], state["failures"], state["error"]) == ("offline", 5, "timeout")
+
+    offline.clear()
+    poller._round()
+    state = poller.snapshot()["db01"]
+    assert (state["status"], state["failures"], state["next_check"] - clock.now) == ("online", 0, 60)
+
+
+# 快照是副本，修改不影响调度状态；check 抛出异常时本轮的服务器记为离线
+def test_snapshot_is_a_copy_and_check_errors_mark_hosts_offline():
+    clock = FakeClock()
+
+    def check(names):
+        raise RuntimeError("runner failed")
+
+    poller = FleetPoller(check, interval=60, jitter=0, clock=clock)
+    poller.track(["web01"])
+    poller.snapshot()["web01"]["status"] = "online"
+    poller._round()
+
+    state = poller.snapshot()["web01"]
+    assert (state["status"], state["error"], state["last_checked"]) == ("offline", "runner failed", clock.now)
@@ -0,0 +1,63 @@
+import sqlite3
+from types import SimpleNamespace
+
+from server_manager.tsdb import MetricsStore
+
+HOUR = 1_700_000_000 - 1_700_000_000 % 3600     # 整点，便于核对时间桶
+
+
+def sample(cpu, server="web01"):
+    return SimpleNamespace(server=server, cpu_percent=cpu, mem_percent=50.0, disk_percent=10.0,
+                           load_1=1.0, net_rx_kbps=0.0, net_tx_kbps=0.0)
+
+
+def make_store(tmp_path):
+    forever = 10 ** 10
+    return MetricsStore(str(tmp_path / "metrics.db"), retention={"raw": forever, "1m": forever, "1h": forever})
+
+
+def rows(store, level):
+    with sqlite3.connect(store.path) as conn:
+        return conn.execute(f"SELECT host, ts, cpu, samples FROM metrics_{level} ORDER BY host, ts").fetchall()
+
+
+def test_rollup_averages_complete_buckets(tmp_path):
+    store = make_store(tmp_path)
+    store.write([sample(10.0), sample(30.0, "db01")], received=HOUR + 5)
+    store.write([sample(20.0)], received=HOUR + 50)
+    store.write([sample(60.0)], received=HOUR + 70)
+
+    store.rollup(now=HOUR + 3600 + 1)
+
+    assert rows(store, "1m") == [
+        ("db01", HOUR, 30.0, 1), ("web01", HOUR, 15.0, 2), ("web01", HOUR + 60, 60.0, 1)
+    ]
+    # 小时级别按分钟级别的样本数加权
+    assert rows(store, "1h") == [("db01", HOUR, 30.0, 1), ("web01", HOUR, 30.0, 3)]
+
+
+# 写入早于汇总进度的数据时，汇总进度退回到该时间桶并重新计算
+def test_late_write_rerolls_closed_buckets(tmp_path):
+    store = make_store(tmp_path)
+    store.write([sample(10.0)], received=HOUR + 5)
+    store.rollup(now=HOUR + 3600 + 1)
+    assert rows(store, "1m") == [("web01", HOUR, 10.0, 1)]
+
+    store.write([sample(30.0)], received=HOUR + 30)
+    store.rollup(now=HOUR + 3600 + 2)
+
+    assert rows(store, "1m") == [("web01", HOUR, 20.0, 2)]
+    assert rows(store, "1h") == [("web01", HOUR, 20.0, 2)]
+
+
+def test_retention_per_level(tmp_path):
+    store = make_store(tmp_path)
+    store.write([sample(10.0)], received=HOUR)
+    store.rollup(now=HOUR + 3600)
+    store.retention = {"raw": 60, "1m": 3600 * 2, "1h": 3600 * 24}
+
+    store.enforce_retention(now=HOUR + 3600 * 3)
+
+    assert rows(store, "raw") == []
+    assert rows(store, "1m") == []
+    assert rows(store, "1h") == [("web01", HOUR, 10.0, 1)]
@@ -0,0 +1,69 @@
+import os
+
+from server_manager.workspace import WorkspacePool
+
+
+def make_pool(tmp_path, **kwargs):
+    return WorkspacePool(root=str(tmp_path / "workspaces"), project_dir=str(tmp_path),
+                         artifacts_dir=str(tmp_path / "artifacts"), **kwargs)
+
+
+def write_artifacts(workspace, ident):
+    os.makedirs(os.path.join(workspace, "artifacts", ident))
+    with open(os.path.join(workspace, "env", "extravars"), "w") as f:
+        f.write("{}")
+
+
+def test_workspaces_are_private_and_reused(tmp_path):
+    pool = make_pool(tmp_path)
+    first, second = pool.acquire(), pool.acquire()
+
+    assert first != second
+    assert os.path.realpath(os.path.join(first, "project")) == str(tmp_path)
+    assert pool.stats()["busy"] == 2
+
+    pool.release(first)
+    assert pool.acquire() == first
+    assert pool.stats()["reused"] == 1
+    pool.close()
+
+
+# 已归档的artifacts直接删除，未归档的移到共享目录；env/ 中的文件不会带到下一个任务
+def test_release_flushes_artifacts_and_clears_env(tmp_path):
+    pool = make_pool(tmp_path)
+    archived, pending = pool.acquire(), pool.acquire()
+    write_artifacts(archived, "job-a")
+    write_artifacts(pending, "job-b")
+
+    pool.release(archived, archived=True)
+    pool.release(pending, archived=False)
+
+    assert os.listdir(tmp_path / "artifacts") == ["job-b"]
+    assert os.listdir(os.path.join(archived, "env")) == []
+    assert os.listdir(os.path.join(archived, "artifacts")) == []
+    pool.close()
+
+
+def test_idle_workspaces_are_capped(tmp_path):
+    pool = make_pool(tmp_path, max_idle=1)
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+
+    assert pool.stats()["idle"] == 1
+    assert not os.path.exists(second)
+    pool.close()
+
+
+# 已退出进程遗留的工作目录被清理，其中未归档的artifacts移到共享目录
+def test_stale_pools_are_recovered(tmp_path):
+    stale = tmp_path / "workspaces" / "pool-999999999-abcdef" / "ws-1"
+    os.makedirs(stale / "env")
+    write_artifacts(str(stale), "job-c")
+
+    pool = make_pool(tmp_path)
+
+    assert not stale.exists()
+    assert os.listdir(tmp_path / "artifacts") == ["job-c"]
+    pool.close()
+    assert not os.path.exists(pool.path)